@@ -7,7 +7,7 @@ from flask_cors import CORS
 cache = Cache()
 
 
-def create_app():
+def create_app(refresh_thread=True):
     # Create Flask instance
     app = Flask(__name__)
 
@@ -18,12 +18,17 @@ def create_app():
 
     redis_url = app.config.get("REDIS_URL")
     if redis_url:
+        # Large values (the feeds) are kept in process and revalidated by a small version key
+        l1_max_bytes = app.config.get("CACHE_L1_MAX_BYTES", 0)
         cache.init_app(
             app,
             config={
-                "CACHE_TYPE": "RedisCache",
+                "CACHE_TYPE": "app.utils.l1_cache.L1RedisCache" if l1_max_bytes else "RedisCache",
                 "CACHE_DEFAULT_TIMEOUT": 300,
                 "CACHE_REDIS_URL": redis_url,
+                "CACHE_L1_MAX_BYTES": l1_max_bytes,
+                "CACHE_L1_POLICY": app.config.get("CACHE_L1_POLICY", "lru"),
+                "CACHE_L1_MIN_BYTES": app.config.get("CACHE_L1_MIN_BYTES", 8 * 1024),
             },
         )
         redis_url = app.config.get("REDIS_URL")
@@ -66,17 +71,11 @@ def create_app():
         load_hdb_carpark_info()
         # HDB info loaded
 
-        # Warm up cache by fetching initial data
-        try:
-            from app.services.carpark_service import fetch_all_carparks
-            from app.services.hdb_service import fetch_hdb_availability
-
-            fetch_all_carparks()
-            # LTA data cached
-            fetch_hdb_availability()
-            # HDB availability cached
-            # Cache warm-up complete
-        except Exception as e:
-            app.logger.warning(f"⚠️ Cache warm-up failed: {e}")
+        # Feeds are warmed by the refresh scheduler's first tick (non-blocking).
+        # The async app runs the scheduler on its event loop instead.
+        if refresh_thread and app.config.get("BACKGROUND_REFRESH"):
+            from app.services.refresh_service import refresh_scheduler
+
+            refresh_scheduler.start(app)
 
     return app
@@ -0,0 +1,244 @@
+"""
+Async App - Quart front end for the request paths that wait on upstreams.
+
+/carparks, /carparks/<carpark_num> and /geocode/reverse (plus /health) run on
+one event loop: Google, Anthropic and, on a cold cache, the LTA and
+data.gov.sg feeds are awaited on httpx / AsyncAnthropic clients, so a slow
+upstream holds a coroutine instead of a worker thread. Cache reads and writes
+(Redis round trips) and the CPU-heavy steps (snapshot build, gazetteer,
+ranking, local pricing, JSON encoding, compression) run on worker threads.
+Responses, ETags and cache entries are the same as the Flask routes', and the
+feed refresh scheduler runs as a task on the same loop.
+
+The batch, changes and stream endpoints stay on the Flask app (run.py).
+
+Run from the backend/ directory:
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+"""
+
+import asyncio
+import functools
+import math
+
+from quart import Quart, Response, jsonify, request
+
+from app import create_app
+from app.routes.geocode import REVERSE_GEOCODE_MAX_AGE
+from app.routes.health import l1_cache_stats
+from app.services import geocoding_service
+from app.services.async_upstream import async_upstream_client
+from app.services.carpark_service import (
+    fetch_carpark_by_id,
+    get_carparks_async,
+    get_search_snapshot_async,
+    get_snapshot_async,
+)
+from app.services.geocoding_service import quantize_coordinates
+from app.services.ranking_service import SORT_MODES
+from app.services.refresh_service import refresh_scheduler
+from app.services.response_service import costs_complete, encode_response, parse_fields
+from app.services.tariff_engine import clamp_duration
+from app.services.upstream_client import upstream_client
+from app.utils.compression import compress_body, negotiate_encoding
+from app.utils.http_cache import make_etag, normalized_query, not_modified, with_cache_headers, without_caching
+
+
+def create_async_app() -> Quart:
+    # The Flask app carries the config, the cache and the startup data loads;
+    # handlers run inside its app context so the services work unchanged
+    flask_app = create_app(refresh_thread=False)
+    app = Quart(__name__)
+
+    def in_flask_context(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            with flask_app.app_context():
+                return await handler(*args, **kwargs)
+
+        return wrapper
+
+    @app.before_serving
+    async def start_refresh():
+        if flask_app.config.get("BACKGROUND_REFRESH"):
+            refresh_scheduler.start_async(flask_app)
+
+    @app.after_serving
+    async def close_clients():
+        refresh_scheduler.stop()
+        await async_upstream_client.aclose()
+
+    @app.after_request
+    async def add_cors_headers(response):
+        cors_origins = flask_app.config.get("CORS_ORIGINS", "*")
+        origin = request.headers.get("Origin")
+        if cors_origins == "*":
+            response.headers["Access-Control-Allow-Origin"] = "*"
+        elif origin and origin in [o.strip() for o in cors_origins.split(",")]:
+            response.headers["Access-Control-Allow-Origin"] = origin
+            response.vary.add("Origin")
+        response.headers["Access-Control-Expose-Headers"] = "Content-Type"
+        return response
+
+    @app.route("/health", methods=["GET"])
+    @in_flask_context
+    async def health():
+        return {
+            "status": "ok",
+            "datasets": await asyncio.to_thread(refresh_scheduler.status),
+            "upstreams": upstream_client.stats(),
+            "l1_cache": l1_cache_stats(),
+        }
+
+    @app.route("/carparks", methods=["GET"])
+    @in_flask_context
+    async def search():
+        """Async /carparks; see app.routes.carparks.search for the query params."""
+        try:
+            projection = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        sort = request.args.get('sort', 'distance')
+        duration = request.args.get('duration', type=float)
+        if sort not in SORT_MODES:
+            return jsonify({'error': f"sort must be one of: {', '.join(SORT_MODES)}"}), 400
+        # NaN, inf and negative stays can't be priced (nor ranked)
+        if duration is not None and not (math.isfinite(duration) and duration > 0):
+            return jsonify({'error': 'duration must be a positive number of hours'}), 400
+        if sort == 'cost' and duration is None:
+            return jsonify({'error': 'sort=cost requires a duration'}), 400
+        if duration is not None:
+            duration = clamp_duration(duration)
+
+        # On a cold cache the feeds and the geocode are awaited concurrently
+        search_term = request.args.get('search', '')
+        snapshot, centre_task = await get_search_snapshot_async(search_term)
+        etag = make_etag(snapshot.version, request.path, normalized_query(req=request))
+        max_age = await asyncio.to_thread(refresh_scheduler.seconds_until_refresh)
+        cached = not_modified(etag, max_age, req=request, response_class=Response)
+        if cached is not None:
+            return cached
+
+        day_type = request.args.get('day_type', 'weekday')
+        user_lat = request.args.get('lat', type=float)
+        user_lng = request.args.get('lng', type=float)
+        radius_m = request.args.get('radius', default=1000, type=int)
+
+        carparks, search_centre = await get_carparks_async(
+            search_term, user_lat, user_lng,
+            radius_m=radius_m,
+            snapshot=snapshot,
+            sort=sort,
+            duration=duration,
+            day_type=day_type,
+            centre_task=centre_task,
+        )
+
+        if duration and duration > 0:
+            try:
+                from app.services.ai_rate_calculator import calculate_costs_async
+                carparks = await calculate_costs_async(
+                    carparks,
+                    duration_hours=duration,
+                    day_type=day_type,
+                )
+            except Exception as e:
+                flask_app.logger.error(f"AI calculation error: {e}")
+                for cp in carparks:
+                    if 'calculated_cost' not in cp:
+                        cp['calculated_cost'] = None
+                        cp['cost_breakdown'] = 'AI service unavailable'
+
+        body = await asyncio.to_thread(
+            encode_response,
+            snapshot, carparks, projection,
+            search_centre=search_centre,
+            version=snapshot.version,
+        )
+
+        response = Response(body, status=200, mimetype='application/json')
+        if not costs_complete(carparks):
+            # Neither ETagged nor compress-cached, so the next request retries the failed costs
+            return await _compress(without_caching(response))
+        return await _compress(with_cache_headers(response, etag, max_age), cache_key=etag)
+
+    @app.route("/carparks/<carpark_num>", methods=["GET"])
+    @in_flask_context
+    async def get_single_carpark(carpark_num):
+        """Async /carparks/<carpark_num>; see app.routes.carparks.get_single_carpark."""
+        snapshot = await get_snapshot_async()
+        etag = make_etag(snapshot.version, request.path, normalized_query(req=request))
+        max_age = await asyncio.to_thread(refresh_scheduler.seconds_until_refresh)
+        cached = not_modified(etag, max_age, req=request, response_class=Response)
+        if cached is not None:
+            return cached
+
+        duration = request.args.get('duration', default=2, type=float)
+        day_type = request.args.get('day_type', default='weekday', type=str)
+        if not math.isfinite(duration):
+            return jsonify({'error': 'duration must be a finite number of hours'}), 400
+        duration = clamp_duration(duration)
+
+        carpark = fetch_carpark_by_id(carpark_num, snapshot=snapshot)
+        if not carpark:
+            return jsonify({'error': 'Carpark not found'}), 404
+
+        if duration and duration > 0:
+            try:
+                from app.services.ai_rate_calculator import calculate_costs_async
+                results = await calculate_costs_async(
+                    [carpark],
+                    duration_hours=duration,
+                    day_type=day_type,
+                    max_calculate=1
+                )
+                carpark = results[0]
+            except Exception as e:
+                flask_app.logger.error(f"AI calculation error: {e}")
+                carpark['calculated_cost'] = None
+                carpark['cost_breakdown'] = 'Calculation error'
+
+        if not costs_complete([carpark]):
+            return await _compress(without_caching(jsonify({'carpark': carpark})))
+        response = with_cache_headers(jsonify({'carpark': carpark}), etag, max_age)
+        return await _compress(response, cache_key=etag)
+
+    @app.route("/geocode/reverse", methods=["GET"])
+    @in_flask_context
+    async def reverse_geocode():
+        """Async /geocode/reverse; see app.routes.geocode.reverse_geocode."""
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+
+        if lat is None or lng is None:
+            return jsonify({'error': 'lat and lng are required'}), 400
+
+        lat, lng = quantize_coordinates(lat, lng, flask_app.config['REVERSE_GEOCODE_GRID_M'])
+        etag = make_etag(request.path, lat, lng)
+        cached = not_modified(etag, REVERSE_GEOCODE_MAX_AGE, req=request, response_class=Response)
+        if cached is not None:
+            return cached
+
+        result = await geocoding_service.reverse_geocode_async(lat, lng)
+        if result['address'] is None:
+            return without_caching(jsonify(result))
+        return with_cache_headers(jsonify(result), etag, REVERSE_GEOCODE_MAX_AGE)
+
+    return app
+
+
+async def _compress(response: Response, cache_key=None) -> Response:
+    """compress_response for Quart responses (whose bodies are read asynchronously)."""
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+
+    encoding = negotiate_encoding(request)
+    # On a thread: a cache miss runs brotli/gzip over the whole body
+    compressed = await asyncio.to_thread(compress_body, await response.get_data(), encoding, cache_key)
+    if compressed is None:
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -15,18 +15,43 @@ class Config:
     GOV_API_KEY = os.getenv('GOV_API_KEY')
     DATA_GOV_API_KEY = os.getenv('DATA_GOV_API_KEY')
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
+    # In-process L1 in front of Redis for large values (0 disables it); policy: lru, lfu or fifo
+    CACHE_L1_MAX_BYTES = int(os.getenv('CACHE_L1_MAX_BYTES', str(64 * 1024 * 1024)))
+    CACHE_L1_POLICY = os.getenv('CACHE_L1_POLICY', 'lru')
+    CACHE_L1_MIN_BYTES = int(os.getenv('CACHE_L1_MIN_BYTES', str(8 * 1024)))
     # AI settings
     ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
 
     # Google Maps (server-side geocoding)
     GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
     
+    # Budget for concurrent upstream fetches on a cold cache; slower ones are left out
+    UPSTREAM_DEADLINE_SECONDS = float(os.getenv('UPSTREAM_DEADLINE_SECONDS', '8'))
+
+    # Reverse geocoding: cache cell size, and how close an HDB block must be to answer locally
+    REVERSE_GEOCODE_GRID_M = float(os.getenv('REVERSE_GEOCODE_GRID_M', '20'))
+    REVERSE_GEOCODE_LOCAL_M = float(os.getenv('REVERSE_GEOCODE_LOCAL_M', '50'))
+
+    # sort=score weights: closeness, available car lots, cheapness for the stay
+    RANKING_WEIGHTS = {
+        'distance': float(os.getenv('RANKING_WEIGHT_DISTANCE', '0.4')),
+        'lots': float(os.getenv('RANKING_WEIGHT_LOTS', '0.2')),
+        'cost': float(os.getenv('RANKING_WEIGHT_COST', '0.4')),
+    }
+
     # CORS settings
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
 
     # Logging
     DEBUG_LOGS = os.getenv('DEBUG_LOGS', 'False') == 'True'
     
+    # Refresh LTA/HDB feeds in a background thread instead of inside requests
+    BACKGROUND_REFRESH = os.getenv('BACKGROUND_REFRESH', 'True') == 'True'
+
+    # Open /carparks/stream connections per worker; each holds a gthread worker thread
+    # (gunicorn --threads 32), so keep this well below the thread count
+    MAX_STREAMS_PER_WORKER = int(os.getenv('MAX_STREAMS_PER_WORKER', '16'))
+
     # External API settings
     GOV_API_URL = 'https://datamall2.mytransport.sg/ltaodataservice/CarParkAvailabilityv2'
     
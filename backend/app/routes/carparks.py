@@ -1,6 +1,28 @@
-from flask import Blueprint, jsonify, request, current_app
+import math
 
-from app.services.carpark_service import fetch_carpark_by_id, get_carparks
+from flask import Blueprint, Response, jsonify, request, current_app
+
+from app.services.carpark_service import (
+    carpark_nums_within,
+    fetch_carpark_by_id,
+    fetch_carparks_by_ids,
+    get_carparks,
+    get_changes,
+    get_search_snapshot,
+    get_snapshot,
+)
+from app.services.ranking_service import SORT_MODES
+from app.services.refresh_service import refresh_scheduler
+from app.services.response_service import costs_complete, encode_response, parse_fields
+from app.services.tariff_engine import clamp_duration
+from app.services.stream_service import (
+    MAX_STREAM_IDS,
+    STREAM_RETRY_AFTER_SECONDS,
+    change_broker,
+    event_stream,
+)
+from app.utils.compression import compress_response
+from app.utils.http_cache import make_etag, normalized_query, not_modified, with_cache_headers, without_caching
 
 carparks_bp = Blueprint('carparks', __name__)
 
@@ -11,14 +33,46 @@ def search():
 
     Query params:
     - search: Search term for carpark filtering
-    - duration: Parking duration in hours (triggers AI calculation)
+    - duration: Parking duration in hours (adds a cost to every result; priced
+                as at most MAX_DURATION_H)
     - day_type: weekday/saturday/sunday (default: weekday)
     - lat: User latitude (for distance sorting)
     - lng: User longitude (for distance sorting)
     - radius: Radius in metres for place name searches (default 1000)
+    - sort: distance (default), cost (cheapest for the duration; needs duration)
+            or score (weighted distance, available lots and cost)
+    - fields: Comma-separated fields to return per carpark (default: all)
+
+    The response carries the snapshot `version`; pass it to /carparks/changes.
+    Responses carry an ETag (snapshot version + query); If-None-Match gets a 304.
+    A response with a failed cost calculation is sent no-store, without an ETag.
     """
-    search_term = request.args.get('search', '')
+    try:
+        projection = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    sort = request.args.get('sort', 'distance')
     duration = request.args.get('duration', type=float)
+    if sort not in SORT_MODES:
+        return jsonify({'error': f"sort must be one of: {', '.join(SORT_MODES)}"}), 400
+    # NaN, inf and negative stays can't be priced (nor ranked)
+    if duration is not None and not (math.isfinite(duration) and duration > 0):
+        return jsonify({'error': 'duration must be a positive number of hours'}), 400
+    if sort == 'cost' and duration is None:
+        return jsonify({'error': 'sort=cost requires a duration'}), 400
+    if duration is not None:
+        duration = clamp_duration(duration)
+
+    # On a cold cache the feeds and the geocode are fetched concurrently
+    search_term = request.args.get('search', '')
+    snapshot, centre_future = get_search_snapshot(search_term)
+    etag = make_etag(snapshot.version, request.path, normalized_query())
+    max_age = refresh_scheduler.seconds_until_refresh()
+    cached = not_modified(etag, max_age)
+    if cached is not None:
+        return cached
+
     day_type = request.args.get('day_type', 'weekday')
     user_lat = request.args.get('lat', type=float)
     user_lng = request.args.get('lng', type=float)
@@ -27,10 +81,15 @@ def search():
     # Special handling for "near me" — treat as empty search with distance sort
     carparks, search_centre = get_carparks(
         search_term, user_lat, user_lng,
-        radius_m=radius_m
+        radius_m=radius_m,
+        snapshot=snapshot,
+        sort=sort,
+        duration=duration,
+        day_type=day_type,
+        centre_future=centre_future,
     )
 
-    # If duration provided, calculate costs using AI (top 10 only)
+    # If duration provided, calculate costs for every result (AI only for unparsed tariffs)
     if duration and duration > 0:
         try:
             from app.services.ai_rate_calculator import calculate_costs
@@ -38,7 +97,6 @@ def search():
                 carparks,
                 duration_hours=duration,
                 day_type=day_type,
-                max_calculate=10
             )
         except Exception as e:
             current_app.logger.error(f"AI calculation error: {e}")
@@ -47,12 +105,148 @@ def search():
                     cp['calculated_cost'] = None
                     cp['cost_breakdown'] = 'AI service unavailable'
 
-    response = {
-        'carparks': carparks,
-        'search_centre': search_centre,
-    }
+    body = encode_response(
+        snapshot, carparks, projection,
+        search_centre=search_centre,
+        version=snapshot.version,
+    )
+
+    response = Response(body, status=200, mimetype='application/json')
+    if not costs_complete(carparks):
+        # Neither ETagged nor compress-cached, so the next request retries the failed costs
+        return compress_response(without_caching(response))
+    return compress_response(with_cache_headers(response, etag, max_age), cache_key=etag)
+
+
+@carparks_bp.route("/carparks/changes", methods=["GET"])
+def changes():
+    """
+    Lot counts that changed since a snapshot version, for polling clients.
+
+    Query params:
+    - since: Snapshot version from a previous /carparks or /carparks/changes response
+    - ids: Comma-separated carpark numbers to limit the delta to (optional)
+
+    If `reset` is true the version is unknown here; reload /carparks instead.
+    """
+    since = request.args.get('since', '')
+    ids = request.args.get('ids')
+    carpark_nums = [i.strip() for i in ids.split(',') if i.strip()] if ids else None
+
+    return jsonify(get_changes(since, carpark_nums)), 200
+
+
+@carparks_bp.route("/carparks/batch", methods=["POST"])
+def batch():
+    """
+    Fetch several carparks by ID from one snapshot, with costs calculated together.
+
+    JSON body:
+    - ids: List of carpark numbers (at most MAX_CARPARKS_RETURN)
+    - duration: Parking duration in hours (optional; no cost calculation if omitted;
+                priced as at most MAX_DURATION_H)
+    - day_type: weekday/saturday/sunday (default "weekday")
+    - fields: List of fields to return per carpark (optional, default: all)
+    """
+    body = request.get_json(silent=True) or {}
+    ids = body.get('ids')
+    duration = body.get('duration')
+    day_type = body.get('day_type', 'weekday')
+
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        return jsonify({'error': 'ids must be a list of carpark numbers'}), 400
+    if len(ids) > current_app.config['MAX_CARPARKS_RETURN']:
+        return jsonify({'error': f"At most {current_app.config['MAX_CARPARKS_RETURN']} ids per request"}), 400
+    # bool is an int subclass; `true` is not a duration
+    if duration is not None and (isinstance(duration, bool) or not isinstance(duration, (int, float))):
+        return jsonify({'error': 'duration must be a number'}), 400
+    if duration is not None:
+        # JSON NaN / Infinity parse to floats
+        if not math.isfinite(duration):
+            return jsonify({'error': 'duration must be a finite number of hours'}), 400
+        duration = clamp_duration(duration)
+    fields = body.get('fields')
+    if isinstance(fields, list) and all(isinstance(f, str) for f in fields):
+        fields = ','.join(fields)
+    elif fields is not None and not isinstance(fields, str):
+        return jsonify({'error': 'fields must be a list of field names'}), 400
+    try:
+        projection = parse_fields(fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    return jsonify(response), 200
+    snapshot = get_snapshot()
+    carparks, missing = fetch_carparks_by_ids(ids, snapshot=snapshot)
+
+    if carparks and duration and duration > 0:
+        try:
+            from app.services.ai_rate_calculator import calculate_costs
+            carparks = calculate_costs(
+                carparks,
+                duration_hours=duration,
+                day_type=day_type,
+            )
+        except Exception as e:
+            current_app.logger.error(f"AI calculation error: {e}")
+            for cp in carparks:
+                cp['calculated_cost'] = None
+                cp['cost_breakdown'] = 'Calculation error'
+
+    payload = encode_response(
+        snapshot, carparks, projection,
+        missing=missing,
+        version=snapshot.version,
+    )
+
+    return compress_response(Response(payload, status=200, mimetype='application/json'))
+
+
+@carparks_bp.route("/carparks/stream", methods=["GET"])
+def stream():
+    """
+    Server-Sent Events stream of lot-count changes.
+
+    Query params (one of):
+    - ids: Comma-separated carpark numbers to watch
+    - lat, lng, radius: Watch the nearest carparks within radius metres (default 1000)
+
+    Sends a `snapshot` event with the current lots, then a `lots` event whenever
+    a feed refresh changes a watched carpark. At most 200 carparks per stream.
+    When this worker already holds MAX_STREAMS_PER_WORKER streams, answers 503
+    with Retry-After.
+    """
+    ids = request.args.get('ids')
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    radius_m = request.args.get('radius', default=1000, type=int)
+
+    if ids:
+        carpark_nums = [i.strip() for i in ids.split(',') if i.strip()][:MAX_STREAM_IDS]
+    elif lat is not None and lng is not None:
+        carpark_nums = carpark_nums_within(get_snapshot(), lat, lng, radius_m, MAX_STREAM_IDS)
+    else:
+        return jsonify({'error': 'ids or lat/lng required'}), 400
+
+    # Subscribe before reading the snapshot so no publish falls in between
+    subscription = change_broker.subscribe(carpark_nums, limit=current_app.config['MAX_STREAMS_PER_WORKER'])
+    if subscription is None:
+        return jsonify({'error': 'Too many open streams, retry later'}), 503, {
+            'Retry-After': str(STREAM_RETRY_AFTER_SECONDS)
+        }
+    try:
+        snapshot = get_snapshot()
+        response = Response(
+            event_stream(change_broker, subscription, snapshot),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+    except BaseException:
+        change_broker.unsubscribe(subscription)
+        raise
+    # event_stream unsubscribes once iterated; this covers a body that never starts
+    # (unsubscribe is idempotent)
+    response.call_on_close(lambda: change_broker.unsubscribe(subscription))
+    return response
 
 
 @carparks_bp.route("/carparks/<carpark_num>", methods=["GET"])
@@ -61,13 +255,23 @@ def get_single_carpark(carpark_num):
     Fetch a single carpark by ID with live availability, pricing, and AI cost calculation.
 
     Query params:
-    - duration: Parking duration in hours (default 2)
+    - duration: Parking duration in hours (default 2; priced as at most MAX_DURATION_H)
     - day_type: weekday/saturday/sunday (default "weekday")
     """
+    snapshot = get_snapshot()
+    etag = make_etag(snapshot.version, request.path, normalized_query())
+    max_age = refresh_scheduler.seconds_until_refresh()
+    cached = not_modified(etag, max_age)
+    if cached is not None:
+        return cached
+
     duration = request.args.get('duration', default=2, type=float)
     day_type = request.args.get('day_type', default='weekday', type=str)
+    if not math.isfinite(duration):
+        return jsonify({'error': 'duration must be a finite number of hours'}), 400
+    duration = clamp_duration(duration)
 
-    carpark = fetch_carpark_by_id(carpark_num)
+    carpark = fetch_carpark_by_id(carpark_num, snapshot=snapshot)
     if not carpark:
         return jsonify({'error': 'Carpark not found'}), 404
 
@@ -86,4 +290,7 @@ def get_single_carpark(carpark_num):
             carpark['calculated_cost'] = None
             carpark['cost_breakdown'] = 'Calculation error'
 
-    return jsonify({'carpark': carpark}), 200
+    if not costs_complete([carpark]):
+        return compress_response(without_caching(jsonify({'carpark': carpark})))
+    response = with_cache_headers(jsonify({'carpark': carpark}), etag, max_age)
+    return compress_response(response, cache_key=etag)
@@ -1,12 +1,15 @@
 from flask import Blueprint, jsonify, request, current_app
-import requests
-from app import cache
+from app.services import geocoding_service
+from app.services.geocoding_service import quantize_coordinates
+from app.utils.http_cache import make_etag, not_modified, with_cache_headers, without_caching
 
 geocode_bp = Blueprint('geocode', __name__)
 
 
+REVERSE_GEOCODE_MAX_AGE = 86400  # Browser/CDN cache; addresses rarely change
+
+
 @geocode_bp.route("/geocode/reverse", methods=["GET"])
-@cache.memoize(timeout=604800)
 def reverse_geocode():
     """
     Reverse geocode coordinates to address + postal code.
@@ -21,34 +24,15 @@ def reverse_geocode():
     if lat is None or lng is None:
         return jsonify({'error': 'lat and lng are required'}), 400
 
-    api_key = current_app.config.get('GOOGLE_MAPS_API_KEY')
-    if not api_key:
-        return jsonify({'address': None, 'postalCode': None}), 200
-
-    try:
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
-        response = requests.get(url, params={
-            "latlng": f"{lat},{lng}",
-            "key": api_key,
-        }, timeout=5)
-        data = response.json()
-
-        if data.get("status") == "OK" and data.get("results"):
-            address = data["results"][0].get("formatted_address")
-            postal_code = None
-
-            for result in data["results"]:
-                for component in result.get("address_components", []):
-                    if "postal_code" in component.get("types", []):
-                        postal_code = component["long_name"]
-                        break
-                if postal_code:
-                    break
-
-            return jsonify({'address': address, 'postalCode': postal_code}), 200
-
-        return jsonify({'address': None, 'postalCode': None}), 200
-
-    except Exception as e:
-        current_app.logger.error(f"Reverse geocoding error: {e}")
-        return jsonify({'address': None, 'postalCode': None}), 200
+    # Lookups within one grid cell share the cache entry, ETag and answer
+    lat, lng = quantize_coordinates(lat, lng, current_app.config['REVERSE_GEOCODE_GRID_M'])
+    etag = make_etag(request.path, lat, lng)
+    cached = not_modified(etag, REVERSE_GEOCODE_MAX_AGE)
+    if cached is not None:
+        return cached
+
+    result = geocoding_service.reverse_geocode(lat, lng)
+    if result['address'] is None:
+        # A failed lookup (Google down or timing out) must not be cached for a day
+        return without_caching(jsonify(result))
+    return with_cache_headers(jsonify(result), etag, REVERSE_GEOCODE_MAX_AGE)
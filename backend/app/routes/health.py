@@ -1,7 +1,22 @@
 from flask import Blueprint, request
 
+from app import cache
+from app.services.refresh_service import refresh_scheduler
+from app.services.upstream_client import upstream_client
+
 health_bp = Blueprint('health', __name__)
 
 @health_bp.route("/health", methods=["GET"])
 def health():
-    return { "status": "ok" }
\ No newline at end of file
+    return {
+        "status": "ok",
+        "datasets": refresh_scheduler.status(),
+        "upstreams": upstream_client.stats(),
+        "l1_cache": l1_cache_stats(),
+    }
+
+
+def l1_cache_stats():
+    """Stats of the in-process L1 in front of Redis (None when it isn't in use)."""
+    stats = getattr(cache.cache, 'stats', None)
+    return stats() if stats is not None else None
@@ -3,15 +3,18 @@ AI-powered rate calculator using Claude API.
 Calculates parking costs based on complex rate structures.
 """
 
+import asyncio
 import os
 
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from flask import current_app
 from typing import List, Dict, Optional
 import json
 import hashlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from app import cache
+from app.services.tariff_engine import canonical_rate_string, select_rate_string, tariff_engine
+from app.utils.singleflight import async_singleflight, singleflight
 
 
 """
@@ -28,56 +31,38 @@ if not api_key:
     raise ValueError("ANTHROPIC_API_KEY not configured")
 
 _client = Anthropic(api_key=api_key)
+_async_client = AsyncAnthropic(api_key=api_key)
+
+MAX_CONCURRENT_AI_CALLS = 5
 
 
 def calculate_costs(
     carparks: List[Dict],
     duration_hours: float,
     day_type: str = "weekday",
-    max_calculate: int = 5,  # Only calculate top 5 to save time/cost
+    max_calculate: Optional[int] = None,
 ) -> List[Dict]:
     """
-    Calculate parking costs for multiple carparks using AI with parallel processing.
+    Calculate parking costs for multiple carparks. Rates the local tariff engine
+    can parse are looked up in its precomputed cost curves; the rest go to
+    Claude in parallel, one call per distinct tariff.
 
     Args:
         carparks: List of carpark dicts with pricing info
         duration_hours: Parking duration (e.g., 2.5 hours)
         day_type: Type of day for rate calculation (weekday/saturday/sunday)
-        max_calculate: Maximum number of carparks to calculate (default 5)
+        max_calculate: Maximum number of carparks to calculate (default: all)
 
     Returns:
-        List of carparks enriched with calculated_cost and cost_breakdown
+        The carparks, in input order, enriched with calculated_cost and cost_breakdown.
+        The input dicts are enriched in place (callers pass per-request dicts).
     """
-    results = []
-    carparks_to_calculate = []
+    carparks_for_ai = _price_locally(carparks, duration_hours, day_type, max_calculate)
 
-    # Separate carparks that need calculation
-    for carpark in carparks:
-        if not carpark.get("has_pricing") or not carpark.get("pricing"):
-            results.append(
-                {
-                    **carpark,
-                    "calculated_cost": None,
-                    "cost_breakdown": "Pricing data unavailable",
-                    "ai_explanation": None,
-                }
-            )
-        elif len(carparks_to_calculate) < max_calculate:
-            carparks_to_calculate.append(carpark)
-        else:
-            results.append(
-                {
-                    **carpark,
-                    "calculated_cost": None,
-                    "cost_breakdown": "Calculate top results only",
-                    "ai_explanation": None,
-                }
-            )
-
-    # Calculate costs in parallel using ThreadPoolExecutor
-    if carparks_to_calculate:
+    # Calculate remaining costs in parallel using ThreadPoolExecutor
+    if carparks_for_ai:
         app = current_app._get_current_object()
-        with ThreadPoolExecutor(max_workers=5) as executor:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_AI_CALLS) as executor:
             # Wrap with app context so threads can access Flask/cache
             def _calc_with_context(cp, dur, day):
                 with app.app_context():
@@ -88,36 +73,116 @@ def calculate_costs(
                 executor.submit(
                     _calc_with_context, carpark, duration_hours, day_type
                 ): carpark
-                for carpark in carparks_to_calculate
+                for carpark in carparks_for_ai
             }
 
             # Collect results as they complete
-            calculated_results = {}
             for future in as_completed(future_to_carpark):
                 carpark = future_to_carpark[future]
                 try:
-                    cost_info = future.result()
-                    calculated_results[carpark["carpark_num"]] = {
-                        **carpark,
-                        **cost_info,
-                    }
+                    carpark.update(future.result())
                 except Exception as e:
                     current_app.logger.error(
                         f"Error calculating cost for {carpark['carpark_num']}: {e}"
                     )
-                    calculated_results[carpark["carpark_num"]] = {
-                        **carpark,
-                        "calculated_cost": None,
-                        "cost_breakdown": "Calculation error",
-                        "ai_explanation": str(e),
-                    }
+                    carpark.update(
+                        calculated_cost=None,
+                        cost_breakdown="Calculation error",
+                        ai_explanation=str(e),
+                    )
+
+    # Every dict was enriched in place, so the input list is already in order
+    return carparks
+
+
+async def calculate_costs_async(
+    carparks: List[Dict],
+    duration_hours: float,
+    day_type: str = "weekday",
+    max_calculate: Optional[int] = None,
+) -> List[Dict]:
+    """
+    calculate_costs for the async app: AI calls are awaited instead of run on
+    threads; local pricing (cost-curve lookups) runs on a thread.
+    """
+    carparks_for_ai = await asyncio.to_thread(
+        _price_locally, carparks, duration_hours, day_type, max_calculate
+    )
+    if not carparks_for_ai:
+        return carparks
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_AI_CALLS)
+
+    async def _calc(carpark):
+        async with semaphore:
+            try:
+                carpark.update(await _calculate_single_carpark_async(carpark, duration_hours, day_type))
+            except Exception as e:
+                current_app.logger.error(
+                    f"Error calculating cost for {carpark['carpark_num']}: {e}"
+                )
+                carpark.update(
+                    calculated_cost=None,
+                    cost_breakdown="Calculation error",
+                    ai_explanation=str(e),
+                )
+
+    await asyncio.gather(*(_calc(carpark) for carpark in carparks_for_ai))
+    return carparks
+
+
+def _price_locally(
+    carparks: List[Dict], duration_hours: float, day_type: str, max_calculate: Optional[int]
+) -> List[Dict]:
+    """
+    Enrich every carpark the tariff engine (or missing pricing) can settle, in place.
+    Returns the carparks that still need an AI calculation.
+    """
+    carparks_to_calculate = []
 
-            # Add calculated results in original order
-            for carpark in carparks_to_calculate:
-                results.append(calculated_results[carpark["carpark_num"]])
+    # Separate carparks that need calculation
+    for carpark in carparks:
+        if not carpark.get("has_pricing") or not carpark.get("pricing"):
+            carpark.update(
+                calculated_cost=None,
+                cost_breakdown="Pricing data unavailable",
+                ai_explanation=None,
+            )
+        elif max_calculate is None or len(carparks_to_calculate) < max_calculate:
+            carparks_to_calculate.append(carpark)
+        else:
+            carpark.update(
+                calculated_cost=None,
+                cost_breakdown="Calculate top results only",
+                ai_explanation=None,
+            )
 
-    # Results are already in original order (no sorting needed)
-    return results
+    # Evaluate parseable tariffs locally; only the rest need an AI round trip
+    carparks_for_ai = []
+    for carpark in carparks_to_calculate:
+        local_result = _calculate_locally(carpark, duration_hours, day_type)
+        if local_result is not None:
+            carpark.update(local_result)
+        else:
+            carparks_for_ai.append(carpark)
+    return carparks_for_ai
+
+
+def _calculate_locally(
+    carpark: Dict, duration_hours: float, day_type: str
+) -> Optional[Dict]:
+    """Evaluate the carpark's tariff in-process, or None if the rate string isn't parseable."""
+    rate_string = select_rate_string(carpark["pricing"], day_type)
+    if not rate_string:
+        return None
+    return tariff_engine.calculate(rate_string, duration_hours)
+
+
+_NO_RATE = {
+    "calculated_cost": None,
+    "cost_breakdown": "No rate information for this day",
+    "ai_explanation": None,
+}
 
 
 def _calculate_single_carpark(
@@ -125,108 +190,149 @@ def _calculate_single_carpark(
 ) -> Dict:
     """Calculate cost for a single carpark using Claude with caching."""
 
-    pricing = carpark["pricing"]
-
     # Select appropriate rate based on day type
-    rate_string = _select_rate_string(pricing, day_type)
+    rate_string = select_rate_string(carpark["pricing"], day_type)
 
     if not rate_string:
-        return {
-            "calculated_cost": None,
-            "cost_breakdown": "No rate information for this day",
-            "ai_explanation": None,
-        }
+        return dict(_NO_RATE)
 
-    # Call the cached function with only hashable primitive args
+    # Keyed on the tariff, not the carpark: every carpark with this tariff shares the result
     return _calculate_with_claude(
-        carpark_num=carpark["carpark_num"],
-        carpark_name=carpark["development"],
-        rate_string=rate_string,
-        duration_hours=duration_hours,
+        rate_string=canonical_rate_string(rate_string),
+        duration_hours=float(duration_hours),
         day_type=day_type,
     )
 
 
-CACHE_VERSION = 2  # Bump this to invalidate all cached AI calculations
+async def _calculate_single_carpark_async(
+    carpark: Dict, duration_hours: float, day_type: str
+) -> Dict:
+    rate_string = select_rate_string(carpark["pricing"], day_type)
+
+    if not rate_string:
+        return dict(_NO_RATE)
+
+    return await _calculate_with_claude_async(
+        rate_string=canonical_rate_string(rate_string),
+        duration_hours=float(duration_hours),
+        day_type=day_type,
+    )
+
+
+CACHE_VERSION = 4  # Bump this to invalidate all cached AI calculations
+
+
+def _is_success(result: Dict) -> bool:
+    """Cache only real answers; a failed call is retried by the next request."""
+    return result.get("calculated_cost") is not None
 
 
-@cache.memoize(timeout=86400)
+@cache.memoize(timeout=86400, response_filter=_is_success)
+@singleflight  # Concurrent misses for one tariff share one Claude call
 def _calculate_with_claude(
-    carpark_num: str,
-    carpark_name: str,
     rate_string: str,
     duration_hours: float,
     day_type: str,
     _v: int = CACHE_VERSION,  # Cache buster — changing CACHE_VERSION invalidates all entries
 ) -> Dict:
-    """Cached Claude API call — only takes hashable primitive args for reliable cache keys."""
+    """
+    Cached Claude API call — only takes hashable primitive args for reliable cache keys.
+    rate_string should be canonical (canonical_rate_string) so equal tariffs share an entry.
+    Errors are returned but not cached.
+    """
 
     prompt = _build_calculation_prompt(
-        carpark_name=carpark_name,
         rate_string=rate_string,
         duration_hours=duration_hours,
         day_type=day_type,
     )
 
     try:
-        # Call Claude API
-        response = _client.messages.create(
-            model="claude-3-haiku-20240307",  # Claude Haiku (fast & cheap)
-            max_tokens=500,
-            temperature=0,  # Deterministic for math
-            messages=[{"role": "user", "content": prompt}],
-        )
-
-        # Parse JSON response
-        result_text = response.content[0].text  # type: ignore
-
-        # Extract JSON from markdown code blocks if present
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-
-        result = json.loads(result_text)
-
-        return {
-            "calculated_cost": float(result["total_cost"]),
-            "cost_breakdown": result["breakdown"],
-            "ai_explanation": result.get("explanation"),
-            "ai_confidence": result.get("confidence", "high"),
-        }
+        response = _client.messages.create(**_claude_request(prompt))
+        return _parse_claude_result(response.content[0].text)  # type: ignore
+    except Exception as e:
+        return _claude_error(rate_string, e)
 
+
+@async_singleflight
+async def _calculate_with_claude_async(
+    rate_string: str,
+    duration_hours: float,
+    day_type: str,
+) -> Dict:
+    """_calculate_with_claude for the async app; reads and fills the same cache entries."""
+    # Cache calls go to a thread: with Redis each is a network round trip
+    # (make_cache_key too, it reads the memoize version)
+    key = await asyncio.to_thread(
+        _calculate_with_claude.make_cache_key,
+        _calculate_with_claude.uncached,
+        rate_string=rate_string,
+        duration_hours=duration_hours,
+        day_type=day_type,
+    )
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return cached
+
+    prompt = _build_calculation_prompt(
+        rate_string=rate_string,
+        duration_hours=duration_hours,
+        day_type=day_type,
+    )
+
+    try:
+        response = await _async_client.messages.create(**_claude_request(prompt))
+        result = _parse_claude_result(response.content[0].text)  # type: ignore
     except Exception as e:
-        current_app.logger.error(f"AI calculation failed for {carpark_num}: {str(e)}")
-        return {
-            "calculated_cost": None,
-            "cost_breakdown": "Calculation error",
-            "ai_explanation": str(e),
-        }
-
-
-def _select_rate_string(pricing: Dict, day_type: str) -> Optional[str]:
-    """Select appropriate rate string based on day type."""
-    if day_type == "saturday":
-        return pricing.get("saturday_rate") or pricing.get("weekday_rate")
-    elif day_type == "sunday":
-        return pricing.get("sunday_rate") or pricing.get("weekday_rate")
-    else:
-        # Weekday - check if there's time-based variation
-        rate1 = pricing.get("weekday_rate", "")
-        rate2 = pricing.get("weekday_rate_after_hours", "")
-        if rate2:
-            return f"{rate1} | After hours: {rate2}"
-        return rate1
+        return _claude_error(rate_string, e)
+
+    if _is_success(result):
+        await asyncio.to_thread(cache.set, key, result, timeout=86400)
+    return result
+
+
+def _claude_request(prompt: str) -> Dict:
+    return dict(
+        model="claude-3-haiku-20240307",  # Claude Haiku (fast & cheap)
+        max_tokens=500,
+        temperature=0,  # Deterministic for math
+        messages=[{"role": "user", "content": prompt}],
+    )
+
+
+def _parse_claude_result(result_text: str) -> Dict:
+    # Extract JSON from markdown code blocks if present
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].split("```")[0].strip()
+
+    result = json.loads(result_text)
+
+    return {
+        "calculated_cost": float(result["total_cost"]),
+        "cost_breakdown": result["breakdown"],
+        "ai_explanation": result.get("explanation"),
+        "ai_confidence": result.get("confidence", "high"),
+    }
+
+
+def _claude_error(rate_string: str, e: Exception) -> Dict:
+    current_app.logger.error(f"AI calculation failed for rate '{rate_string}': {str(e)}")
+    return {
+        "calculated_cost": None,
+        "cost_breakdown": "Calculation error",
+        "ai_explanation": str(e),
+    }
 
 
 def _build_calculation_prompt(
-    carpark_name: str, rate_string: str, duration_hours: float, day_type: str
+    rate_string: str, duration_hours: float, day_type: str
 ) -> str:
     """Build prompt for Claude to calculate parking cost."""
 
-    return f"""You are a parking cost calculator. Calculate the EXACT cost to park at this carpark.You are calculating for EXACTLY {duration_hours} hours. Your breakdown MUST use {duration_hours} hours, not any other number.
+    return f"""You are a parking cost calculator. Calculate the EXACT cost to park at a carpark with this rate structure.You are calculating for EXACTLY {duration_hours} hours. Your breakdown MUST use {duration_hours} hours, not any other number.
 
-CARPARK: {carpark_name}
 RATE STRUCTURE: {rate_string}
 PARKING DURATION: {duration_hours} hours
 DAY TYPE: {day_type}
@@ -0,0 +1,85 @@
+"""
+Async Upstream Client - Non-blocking counterpart of upstream_client for the async app.
+
+One pooled httpx.AsyncClient per upstream, with the same timeouts, retry
+policy (connection errors and 429/5xx, exponential backoff, Retry-After
+honoured) and total deadlines as the sync sessions. Latencies are recorded in upstream_client's
+stats, so /health covers both serving modes.
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+import httpx
+
+from app.services.upstream_client import CONNECT_TIMEOUT, POOL_MAXSIZE, UPSTREAMS, upstream_client
+
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+BACKOFF_FACTOR = 0.3
+MAX_RETRY_AFTER_SECONDS = 10
+
+
+class AsyncUpstreamClient:
+    """Per-upstream AsyncClients; create and use on one event loop."""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def client(self, upstream: str) -> httpx.AsyncClient:
+        client = self._clients.get(upstream)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(UPSTREAMS[upstream][0], connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=POOL_MAXSIZE, max_keepalive_connections=POOL_MAXSIZE),
+            )
+            self._clients[upstream] = client
+        return client
+
+    async def get(self, upstream: str, url: str, **kwargs) -> httpx.Response:
+        """
+        GET with this upstream's retries; the last response is returned even if
+        it failed. Past the upstream's deadline, raises httpx.TimeoutException.
+        """
+        deadline = upstream_client.deadline(upstream)
+        with upstream_client.timed(upstream):
+            if deadline is None:
+                return await self._get(upstream, url, **kwargs)
+            try:
+                return await asyncio.wait_for(self._get(upstream, url, **kwargs), deadline)
+            except asyncio.TimeoutError:
+                raise httpx.TimeoutException(f'{upstream} took longer than {deadline}s')
+
+    async def _get(self, upstream: str, url: str, **kwargs) -> httpx.Response:
+        retries = UPSTREAMS[upstream][1]
+        for attempt in range(retries + 1):
+            try:
+                response = await self.client(upstream).get(url, **kwargs)
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            await asyncio.sleep(_retry_after(response) or _backoff(attempt))
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+def _backoff(attempt: int) -> float:
+    # Exponential, like the sync sessions; the first retry goes at once
+    return 0.0 if attempt == 0 else BACKOFF_FACTOR * (2 ** attempt)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return min(float(response.headers['Retry-After']), MAX_RETRY_AFTER_SECONDS)
+    except (KeyError, ValueError):
+        return None
+
+
+# Singleton instance
+async_upstream_client = AsyncUpstreamClient()
@@ -1,32 +1,132 @@
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from flask import current_app
+import httpx
+import numpy as np
 import requests
 from app import cache  # Import cache from __init__.py
 from app.services.pricing_service import pricing_service
-from app.services.hdb_service import get_hdb_carparks
-from app.services.geocoding_service import geocode_place
+from app.services import ranking_service
+from app.services.async_upstream import async_upstream_client
+from app.services.hdb_service import fetch_hdb_availability_async, get_hdb_carparks
+from app.services.gazetteer import gazetteer_for
+from app.services.geocoding_service import geocode_place, geocode_place_async
+from app.services.upstream_client import upstream_client
+from app.services.snapshot_service import (
+    LOT_FIELDS,
+    CarparkRecord,
+    CarparkSnapshot,
+    mark_source_refreshed,
+    snapshot_store,
+    source_versions,
+)
 from app.logging_utils import log_info
-from app.utils.svy21 import wgs84_to_svy21, svy21_distance_km
+from app.utils.singleflight import async_flights, async_singleflight, singleflight
+from app.utils.svy21 import wgs84_to_svy21
 
 
-def calculate_distance(n1: float, e1: float, n2: float, e2: float) -> float:
-    """Calculate distance in km between two SVY21 points (northing, easting)."""
-    return svy21_distance_km(n1, e1, n2, e2)
+LTA_CARPARKS_TTL = 300
 
 
-@cache.memoize(timeout=300)  # Cache for 5 minutes
+LTA_REFRESH_INTERVAL = 240  # Background refresh, ahead of the TTL
+
+
+@cache.memoize(timeout=LTA_CARPARKS_TTL)  # Cache for 5 minutes
+@singleflight  # Concurrent misses share one fetch
 def fetch_all_carparks():
     """Fetch carparks from LTA API"""
+    carparks = _fetch_lta_carparks()
+    mark_source_refreshed('lta', timeout=LTA_CARPARKS_TTL)
+    return carparks
+
+
+@async_singleflight
+async def fetch_all_carparks_async():
+    """fetch_all_carparks for the async app; reads and fills the same cache entry."""
+    # Cache calls go to a thread: with Redis each is a network round trip
+    # (make_cache_key too, it reads the memoize version)
+    key = await asyncio.to_thread(fetch_all_carparks.make_cache_key, fetch_all_carparks.uncached)
+    carparks = await asyncio.to_thread(cache.get, key)
+    if carparks is None:
+        carparks = await _fetch_lta_carparks_async()
+        await asyncio.to_thread(cache.set, key, carparks, timeout=LTA_CARPARKS_TTL)
+        await asyncio.to_thread(mark_source_refreshed, 'lta', timeout=LTA_CARPARKS_TTL)
+    return carparks
+
+
+LTA_PAGE_SIZE = 500  # DataMall pages this feed in blocks of 500 ($skip)
+LTA_MIN_WAVE = 4  # Pages requested concurrently before we know the feed size
+
+# Pages the last full fetch needed; sizes the first wave of the next one
+_lta_page_count = 0
+
+
+def _fetch_lta_carparks():
+    """
+    Fetch every page of the LTA feed. Pages are requested concurrently in
+    waves and merged in $skip order; the fetch ends at the first short page.
+    """
+    api_url = current_app.config['GOV_API_URL']
+    headers = {"AccountKey": current_app.config['GOV_API_KEY']}
+
+    def fetch_page(page):
+        response = upstream_client.get(
+            'lta', api_url, headers=headers, params={"$skip": page * LTA_PAGE_SIZE}
+        )
+        response.raise_for_status()
+        return response.json()["value"]
+
+    carparks = []
+    first_page = 0
+    wave = max(_lta_page_count + 1, LTA_MIN_WAVE)  # One spare page to detect the end
+    try:
+        with ThreadPoolExecutor(max_workers=wave) as executor:
+            while True:
+                pages = executor.map(fetch_page, range(first_page, first_page + wave))
+                if _merge_pages(carparks, pages, first_page):
+                    return carparks
+                first_page += wave
+    except (requests.RequestException, KeyError, ValueError) as e:
+        raise Exception(f"Failed to fetch carpark data: {str(e)}")
+
+
+async def _fetch_lta_carparks_async():
+    """_fetch_lta_carparks on the async client: each wave is one asyncio.gather."""
     api_url = current_app.config['GOV_API_URL']
-    timeout = current_app.config.get('REQUEST_TIMEOUT', 10)
-    print("DEBUG: hitting LTA API")
+    headers = {"AccountKey": current_app.config['GOV_API_KEY']}
+
+    async def fetch_page(page):
+        response = await async_upstream_client.get(
+            'lta', api_url, headers=headers, params={"$skip": page * LTA_PAGE_SIZE}
+        )
+        response.raise_for_status()
+        return response.json()["value"]
+
+    carparks = []
+    first_page = 0
+    wave = max(_lta_page_count + 1, LTA_MIN_WAVE)
     try:
-        headers = {"AccountKey": current_app.config['GOV_API_KEY']}
-        response = requests.get(api_url, timeout=timeout, headers=headers)
-        data = response.json()
-        return data["value"]
-    except requests.RequestException as e:
+        while True:
+            pages = await asyncio.gather(*(fetch_page(p) for p in range(first_page, first_page + wave)))
+            if _merge_pages(carparks, pages, first_page):
+                return carparks
+            first_page += wave
+    except (httpx.HTTPError, KeyError, ValueError) as e:
         raise Exception(f"Failed to fetch carpark data: {str(e)}")
 
+
+def _merge_pages(carparks, pages, first_page) -> bool:
+    """Append one wave of pages in $skip order; True once a short page ends the feed."""
+    global _lta_page_count
+    for i, page in enumerate(pages):
+        carparks.extend(page)
+        if len(page) < LTA_PAGE_SIZE:
+            _lta_page_count = first_page + i + 1
+            log_info(f"📄 LTA: {len(carparks)} rows in {_lta_page_count} pages")
+            return True
+    return False
+
 def fetch_all_hdb_carparks():
     """Fetch carparks from HDB API"""
     try:
@@ -35,31 +135,251 @@ def fetch_all_hdb_carparks():
         current_app.logger.error(f"Failed to fetch HDB carpark data: {str(e)}")
         return []
     
-def fetch_carpark_by_id(carpark_num):
-    """Fetch a single carpark by ID with live availability and pricing."""
-    lta_carparks = []
-    hdb_carparks = []
+# Upstream fan-out for cold requests. A fetch that misses its deadline keeps
+# running here and fills its cache entry for the next request.
+_upstream_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix='upstream')
 
+
+def _submit_upstream(fn, *args) -> Future:
+    """Run fn(*args) on the upstream pool, inside this app's context."""
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return fn(*args)
+
+    return _upstream_pool.submit(run)
+
+
+def _result_by(future: Future, deadline: float, name: str, default):
+    """future's result if it arrives before `deadline` (monotonic), else `default`."""
     try:
-        lta_carparks = fetch_all_carparks()
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeout:
+        current_app.logger.warning(f"⏱️ {name} missed the upstream deadline; continuing without it")
     except Exception as e:
-        current_app.logger.error(f"LTA fetch failed: {e}")
+        current_app.logger.error(f"❌ {name} fetch failed: {e}")
+    return default
+
+
+def _upstream_deadline() -> float:
+    return time.monotonic() + current_app.config['UPSTREAM_DEADLINE_SECONDS']
 
+
+async def _result_by_async(task: asyncio.Task, deadline: float, name: str, default):
+    """_result_by for tasks; a task that misses the deadline keeps running (it isn't cancelled)."""
     try:
-        hdb_carparks = fetch_all_hdb_carparks()
+        return await asyncio.wait_for(asyncio.shield(task), max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        current_app.logger.warning(f"⏱️ {name} missed the upstream deadline; continuing without it")
     except Exception as e:
-        current_app.logger.error(f"HDB fetch failed: {e}")
+        current_app.logger.error(f"❌ {name} fetch failed: {e}")
+    return default
+
+
+def get_snapshot() -> CarparkSnapshot:
+    """
+    Return the shared carpark snapshot, rebuilding it only when the LTA or HDB
+    feed has produced new data since the last build.
+    """
+    return snapshot_store.get(source_versions(), _build_snapshot)
+
+
+def get_search_snapshot(search_term=None):
+    """
+    (snapshot, centre_future) for a search request. When the snapshot has to be
+    rebuilt (cold cache), geocoding the search term starts first and runs
+    alongside the feed fetches; pass centre_future on to get_carparks.
+    centre_future is None when the snapshot was already current.
+    """
+    source_key = source_versions()
+    snapshot = snapshot_store.peek(source_key)
+    if snapshot is not None:
+        return snapshot, None
+
+    term = (search_term or '').strip()
+    centre_future = None
+    if term and term.lower() != "near me":
+        centre_future = _submit_upstream(_locate_ahead, term)
+    return snapshot_store.get(source_key, _build_snapshot), centre_future
+
+
+async def get_search_snapshot_async(search_term=None):
+    """
+    get_search_snapshot for the async app: (snapshot, centre_task). On a cold
+    cache the feeds and the geocode are awaited together and the snapshot is
+    built on a worker thread, so the event loop keeps serving. While one
+    request rebuilds, the others get the previous snapshot.
+    """
+    snapshot = snapshot_store.peek(await asyncio.to_thread(source_versions))
+    if snapshot is not None:
+        return snapshot, None
+    previous = snapshot_store.current
+    if previous is not None and async_flights.in_flight(_ASYNC_BUILD_KEY):
+        return previous, None
+
+    term = (search_term or '').strip()
+    centre_task = None
+    if term and term.lower() != "near me":
+        centre_task = asyncio.create_task(_locate_ahead_async(term))
+
+    snapshot = await async_flights.do(_ASYNC_BUILD_KEY, _rebuild_snapshot_async)
+    return snapshot, centre_task
+
+
+_ASYNC_BUILD_KEY = 'snapshot-build-async'
+
+
+async def _rebuild_snapshot_async():
+    """Await both feeds under one deadline, then build (or reuse) the snapshot on a thread."""
+    deadline = _upstream_deadline()
+    lta_task = asyncio.create_task(fetch_all_carparks_async())
+    hdb_task = asyncio.create_task(fetch_hdb_availability_async())
+    lta_carparks = await _result_by_async(lta_task, deadline, 'LTA', [])
+    availability = await _result_by_async(hdb_task, deadline, 'HDB', {})
+
+    app = current_app._get_current_object()
+
+    def build():
+        with app.app_context():
+            return snapshot_store.get(
+                source_versions(),
+                lambda: _snapshot_from(lta_carparks, get_hdb_carparks(availability)),
+            )
+
+    return await asyncio.to_thread(build)
+
+
+async def get_snapshot_async() -> CarparkSnapshot:
+    """get_snapshot for the async app."""
+    snapshot, _ = await get_search_snapshot_async()
+    return snapshot
+
+
+def _locate_ahead(term):
+    """Geocode while the snapshot rebuilds; the previous snapshot's gazetteer spares most Google calls."""
+    previous = snapshot_store.current
+    if previous is not None:
+        centre = gazetteer_for(previous).lookup(term)
+        if centre is not None:
+            return centre
+    return geocode_place(term)
+
+
+async def _locate_ahead_async(term):
+    previous = snapshot_store.current
+    if previous is not None:
+        # On a thread: the first lookup on a snapshot builds its gazetteer
+        centre = await asyncio.to_thread(_gazetteer_lookup, previous, term)
+        if centre is not None:
+            return centre
+    return await geocode_place_async(term)
+
+
+def _build_snapshot():
+    """
+    Fetch both feeds, then consolidate, transform and price every carpark once.
+    Runs outside the snapshot store's lock: requests that arrive meanwhile get
+    the previous snapshot instead of queueing behind the upstream deadline.
+    """
+    # Both feeds at once, under one deadline; a feed that misses it is left out of this build
+    deadline = _upstream_deadline()
+    lta_future = _submit_upstream(fetch_all_carparks)
+    hdb_future = _submit_upstream(fetch_all_hdb_carparks)
+
+    lta_carparks = _result_by(lta_future, deadline, 'LTA', [])
+    hdb_carparks = _result_by(hdb_future, deadline, 'HDB', [])
+    return _snapshot_from(lta_carparks, hdb_carparks)
+
+
+def _snapshot_from(lta_carparks, hdb_carparks):
+    """Consolidate, transform and price fetched feed rows into (source_key, records)."""
+    log_info(f"✅ LTA: {len(lta_carparks)} carparks")
+    log_info(f"✅ HDB: {len(hdb_carparks)} carparks")
+
+    # Read versions after fetching so the snapshot is stamped with what it was built from
+    source_key = source_versions()
 
     consolidated = consolidate_carparks(lta_carparks + hdb_carparks)
+    # Resolve pricing for any carpark identities we haven't seen before
+    pricing_service.build_resolution_index(
+        (cp["CarParkID"], cp["Development"]) for cp in consolidated
+    )
+    records = [transform_carpark(cp) for cp in consolidated]
+    records = [r for r in records if r is not None]
 
-    for cp in consolidated:
-        if cp['CarParkID'] == carpark_num:
-            return transform_carpark(cp)
-    return None
+    log_info(f"🧱 Built carpark snapshot: {len(records)} carparks")
+    return source_key, records
+
+
+def get_changes(since, carpark_nums=None):
+    """
+    Lot counts that changed since snapshot version `since`.
+
+    Returns a dict with the current `version` and the `changes` / `removed`
+    carparks (optionally limited to `carpark_nums`). `reset` is True when
+    `since` is unknown to this worker; the client should reload /carparks.
+    """
+    snapshot = get_snapshot()
+    result = snapshot_store.changes_since(since) if since else None
+    if result is None:
+        return {'version': snapshot.version, 'reset': True, 'changes': [], 'removed': []}
+
+    snapshot, changes, removed = result
+    if carpark_nums is not None:
+        wanted = set(carpark_nums)
+        changes = {k: v for k, v in changes.items() if k in wanted}
+        removed = [k for k in removed if k in wanted]
+
+    return {
+        'version': snapshot.version,
+        'reset': False,
+        'changes': [
+            {'carpark_num': carpark_num, **dict(zip(LOT_FIELDS, lots))}
+            for carpark_num, lots in changes.items()
+        ],
+        'removed': list(removed),
+    }
+
+
+def carpark_nums_within(snapshot, lat, lng, radius_m, limit):
+    """Numbers of the `limit` nearest carparks within radius_m of (lat, lng)."""
+    centre_n, centre_e = wgs84_to_svy21(lat, lng)
+    positions, _ = snapshot.index.query_radius(centre_n, centre_e, radius_m)
+    return [snapshot.layout[i][0] for i in positions[:limit].tolist()]
+
+
+def fetch_carpark_by_id(carpark_num, snapshot=None):
+    """Fetch a single carpark by ID with live availability and pricing."""
+    if snapshot is None:
+        snapshot = get_snapshot()
+    record = snapshot.get(carpark_num)
+    # Fresh dict, so callers can enrich the result without touching the snapshot
+    return record.to_dict() if record is not None else None
+
+
+def fetch_carparks_by_ids(carpark_nums, snapshot=None):
+    """
+    Fetch several carparks from one snapshot (one ID-index probe each).
+
+    Returns (carparks, missing): carparks in the order requested (duplicates
+    dropped) and the numbers that aren't in the snapshot.
+    """
+    if snapshot is None:
+        snapshot = get_snapshot()
+
+    carparks, missing = [], []
+    for carpark_num in dict.fromkeys(carpark_nums):
+        record = snapshot.get(carpark_num)
+        if record is None:
+            missing.append(carpark_num)
+        else:
+            carparks.append(record.to_dict())
+    return carparks, missing
 
 
 def transform_carpark(cp):
-    """Transform single carpark to frontend format with pricing info."""
+    """Transform single carpark to a snapshot record (frontend fields) with pricing info."""
     
     # Handle both LTA format (Location as string) and HDB format (Location as dict)
     if isinstance(cp["Location"], str):
@@ -76,9 +396,8 @@ def transform_carpark(cp):
     carpark_id = cp["CarParkID"]
     development = cp["Development"]
     
-    # Get pricing info
-    pricing_info = pricing_service.get_pricing_info(carpark_id, development)
-    has_specific_pricing = pricing_service.has_pricing(carpark_id, development)
+    # Get pricing info (single probe into the pricing resolution index)
+    pricing_info, has_specific_pricing = pricing_service.resolve(carpark_id, development)
     
     # Extract address if available (HDB carparks have detailed address info)
     address = cp.get("Address", development)  # Fallback to development name
@@ -93,32 +412,24 @@ def transform_carpark(cp):
     else:
         northing, easting = wgs84_to_svy21(lat_f, lng_f)
 
-    return {
-        "carpark_num": carpark_id,
-        "area": cp["Area"],
-        "development": development,
-        "address": address,
-        "latitude": lat_f,
-        "longitude": lng_f,
-        "northing": northing,
-        "easting": easting,
-        "car_lots": cp.get("CarLots", 0),
-        "motorcycle_lots": cp.get("MotorcycleLots", 0),
-        "heavy_vehicle_lots": cp.get("HeavyVehicleLots", 0),
-        "has_pricing": pricing_info is not None,
-        "has_specific_pricing": has_specific_pricing,
-        "pricing": pricing_info,
-        "agency": cp.get("Agency", "LTA")  # Track data source
-    }
+    return CarparkRecord(
+        carpark_num=carpark_id,
+        area=cp["Area"],
+        development=development,
+        address=address,
+        latitude=lat_f,
+        longitude=lng_f,
+        northing=northing,
+        easting=easting,
+        car_lots=cp.get("CarLots", 0),
+        motorcycle_lots=cp.get("MotorcycleLots", 0),
+        heavy_vehicle_lots=cp.get("HeavyVehicleLots", 0),
+        has_pricing=pricing_info is not None,
+        has_specific_pricing=has_specific_pricing,
+        pricing=pricing_info,
+        agency=cp.get("Agency", "LTA")  # Track data source
+    )
 
-def filter_by_radius(carparks: list, centre_n: float, centre_e: float, radius_m: float) -> list:
-    """Filter transformed carparks to those within radius_m metres of centre (SVY21)."""
-    candidates = []
-    for cp in carparks:
-        if svy21_distance_km(centre_n, centre_e, cp["northing"], cp["easting"])*1000 <= radius_m:
-            candidates.append(cp)
-    return candidates
-        
 def consolidate_carparks(carparks):
     """
     Consolidate carparks by ID, summing up available lots by type.
@@ -160,7 +471,10 @@ def consolidate_carparks(carparks):
     return [consolidated[carpark_id] for carpark_id in order]
                 
 
-def get_carparks(search_term=None, user_lat=None, user_lng=None, radius_m=2000):
+def get_carparks(
+    search_term=None, user_lat=None, user_lng=None, radius_m=2000, snapshot=None,
+    sort='distance', duration=None, day_type='weekday', centre_future=None,
+):
     """
     Get carparks from both LTA and HDB sources, merged and filtered.
     Uses smart search with aliases and intelligent ranking.
@@ -170,77 +484,106 @@ def get_carparks(search_term=None, user_lat=None, user_lng=None, radius_m=2000):
         user_lat: User latitude for distance-based sorting (optional)
         user_lng: User longitude for distance-based sorting (optional)
         radius_m: Radius in metres for place name searches (default 1000m)
+        snapshot: Snapshot to search (default: the current one)
+        sort: 'distance', 'cost' (needs duration) or 'score' (see ranking_service)
+        duration: Stay in hours, for cost ranking (optional)
+        day_type: weekday/saturday/sunday, for cost ranking
+        centre_future: Geocode already in flight, from get_search_snapshot (optional)
 
     Returns:
         (carparks, search_centre) tuple:
           - carparks: list of carpark dicts
           - search_centre: (lat, lng) centre used for radius search, or None
     """
-    max_results = current_app.config['MAX_CARPARKS_RETURN']
-    search_centre = None  # (lat, lng) — set when radius search runs
+    # 1. Shared snapshot (consolidated + transformed once per upstream refresh)
+    if snapshot is None:
+        snapshot = get_snapshot()
 
-    # 1. Fetch from BOTH sources
-    log_info("🔍 Fetching carparks from LTA and HDB APIs...")
+    # 2. Radius search for place name queries
+    term = (search_term or '').strip()
+    if term and term.lower() != "near me":
+        # Known place names resolve in-process; Google only for the rest
+        centre = gazetteer_for(snapshot).lookup(term)
+        if centre is None and centre_future is not None:
+            centre = _result_by(centre_future, _upstream_deadline(), 'Geocoding', None)
+        elif centre is None:
+            centre = geocode_place(term)
+    else:
+        centre = _user_centre(term, user_lat, user_lng)
+    return carparks_around(snapshot, centre, term, user_lat, user_lng, radius_m, sort, duration, day_type)
 
-    lta_carparks = []
-    hdb_carparks = []
 
-    try:
-        lta_carparks = fetch_all_carparks()
-        log_info(f"✅ LTA: {len(lta_carparks)} carparks")
-    except Exception as e:
-        current_app.logger.error(f"❌ LTA fetch failed: {e}")
+async def get_carparks_async(
+    search_term=None, user_lat=None, user_lng=None, radius_m=2000, snapshot=None,
+    sort='distance', duration=None, day_type='weekday', centre_task=None,
+):
+    """
+    get_carparks for the async app: the centre is geocoded without blocking the
+    loop, and the gazetteer and ranking work runs on a thread.
+    """
+    term = (search_term or '').strip()
+    if term and term.lower() != "near me":
+        centre = await asyncio.to_thread(_gazetteer_lookup, snapshot, term)
+        if centre is None and centre_task is not None:
+            centre = await _result_by_async(centre_task, _upstream_deadline(), 'Geocoding', None)
+        elif centre is None:
+            centre = await geocode_place_async(term)
+    else:
+        centre = _user_centre(term, user_lat, user_lng)
+    return await asyncio.to_thread(
+        carparks_around, snapshot, centre, term, user_lat, user_lng, radius_m, sort, duration, day_type
+    )
 
-    try:
-        hdb_carparks = fetch_all_hdb_carparks()
-        log_info(f"✅ HDB: {len(hdb_carparks)} carparks")
-    except Exception as e:
-        current_app.logger.error(f"❌ HDB fetch failed: {e}")
 
-    all_carparks = lta_carparks + hdb_carparks
+def _gazetteer_lookup(snapshot, term):
+    return gazetteer_for(snapshot).lookup(term)
 
-    # 4. Consolidate (sum up lots by carpark ID)
-    consolidated_carparks = consolidate_carparks(all_carparks)
 
-    # 5. Transform carparks
-    transformed = [transform_carpark(cp) for cp in consolidated_carparks]
-    transformed = [cp for cp in transformed if cp is not None]
+def _user_centre(term, user_lat, user_lng):
+    """The user's location for "near me"; no centre for an empty search."""
+    if term and user_lat is not None and user_lng is not None:
+        return user_lat, user_lng
+    return None
+
+
+def carparks_around(
+    snapshot, centre, term='', user_lat=None, user_lng=None, radius_m=2000,
+    sort='distance', duration=None, day_type='weekday',
+):
+    """Steps 3-5 of get_carparks, once the search centre ((lat, lng) or None) is known."""
+    max_results = current_app.config['MAX_CARPARKS_RETURN']
+    search_centre = None  # (lat, lng) — set when radius search runs
 
-    # 6. Radius search for place name queries
-    term = (search_term or '').strip()
-    is_near_me = term.lower() == "near me" if term else False
-    if is_near_me:
-        centre = (user_lat, user_lng) if user_lat is not None and user_lng is not None else None
-    elif term:
-        centre = geocode_place(term)
-    else:
-        centre = None
     if not centre:
         return [], None
     centre_lat, centre_lng = centre
     centre_n, centre_e = wgs84_to_svy21(centre_lat, centre_lng)
-    # Add distances relative to geocoded centre
-    for cp in transformed:
-        cp['distance'] = calculate_distance(centre_n, centre_e, cp['northing'], cp['easting'])
-    # Filter to radius
-    in_radius = filter_by_radius(transformed, centre_n, centre_e, radius_m)
-    if in_radius:
-        # Sort by distance within radius
-        in_radius.sort(key=lambda x: x.get('distance', float('inf')))
-        transformed = in_radius
-        search_centre = {'lat': centre_lat, 'lng': centre_lng}
-        log_info(f"📍 Radius search: {len(transformed)} carparks within {radius_m}m of '{term}'")
-
-    # 7. If user location provided (and not already set by radius search), add distance
-    if user_lat is not None and user_lng is not None:
-        user_n, user_e = wgs84_to_svy21(user_lat, user_lng)
-        for cp in transformed:
-            if 'distance' not in cp:
-                cp['distance'] = calculate_distance(user_n, user_e, cp['northing'], cp['easting'])
 
-        transformed.sort(key=lambda x: x.get('distance', float('inf')))
+    # Grid lookup gathers nearby cells; distance, mask and ordering run column-wise
+    positions, distances = snapshot.index.query_radius(centre_n, centre_e, radius_m)
+    if len(positions):
+        search_centre = {'lat': centre_lat, 'lng': centre_lng}
+        log_info(f"📍 Radius search: {len(positions)} carparks within {radius_m}m of '{term}'")
+    else:
+        # 3. Nothing in radius — return everything, in distance order when user location is known
+        distances = snapshot.index.distances_km(centre_n, centre_e)
+        if user_lat is not None and user_lng is not None:
+            positions = np.argsort(distances, kind='stable')
+        else:
+            positions = np.arange(len(distances))
+        distances = distances[positions]
 
-    # 8. Limit results
-    result = transformed[:max_results]
+    # 4. Cost/score ranking runs over every candidate, before the limit
+    positions, distances, scores = ranking_service.rank(
+        snapshot, positions, distances, sort,
+        duration_hours=duration, day_type=day_type,
+        weights=current_app.config['RANKING_WEIGHTS'],
+    )
 
-    return result, search_centre
+    # 5. Limit results; the response dicts are the only per-request row objects
+    records = snapshot.records
+    top = zip(positions[:max_results].tolist(), distances[:max_results].tolist())
+    if scores is None:
+        return [records[i].to_dict(distance=d) for i, d in top], search_centre
+    top_scores = np.round(scores[:max_results], 4).tolist()
+    return [records[i].to_dict(distance=d, score=s) for (i, d), s in zip(top, top_scores)], search_centre
@@ -0,0 +1,185 @@
+"""
+Gazetteer - Offline place-name index consulted before Google Geocoding.
+
+Built from data we already hold:
+  - HDB carpark addresses (hdb_carpark_info.json): street names and towns,
+    placed at the centroid of their carparks
+  - LTA developments in the current snapshot (malls, offices, attractions),
+    plus the matched rate name from carpark_rates.json
+  - search_aliases.json: short names ("ion", "taka") for those developments
+
+Only exact matches on normalized names count, and only for places whose
+points are tight enough around their centroid to be one place. Anything
+else falls through to Google.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from math import hypot
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.hdb_service import _extract_area_from_address, load_hdb_carpark_info
+from app.utils.svy21 import wgs84_to_svy21
+
+logger = logging.getLogger(__name__)
+
+ALIASES_PATH = os.path.join(os.path.dirname(__file__), '../data/search_aliases.json')
+
+# Kind -> max distance (m) from centroid to any point; looser for larger places
+MAX_SPREAD_M = {
+    'development': 500,
+    'street': 3000,
+    'area': 6000,
+}
+# When one name is several kinds, the most specific wins
+KIND_PRIORITY = ('development', 'street', 'area')
+
+_ABBREVIATIONS = {
+    'ave': 'avenue', 'av': 'avenue', 'st': 'street', 'rd': 'road', 'dr': 'drive',
+    'cres': 'crescent', 'ctr': 'centre', 'center': 'centre', 'cl': 'close',
+    'ln': 'lane', 'pk': 'park', 'blvd': 'boulevard', 'ctrl': 'central',
+    'nth': 'north', 'sth': 'south', 'upp': 'upper', 'jln': 'jalan', 'bt': 'bukit',
+    'tg': 'tanjong', 'kg': 'kampong', 'mt': 'mount',
+}
+_STREET_TYPES = {
+    'street', 'avenue', 'road', 'crescent', 'drive', 'lane', 'close', 'walk',
+    'link', 'way', 'place', 'ring', 'central', 'rise', 'view', 'terrace', 'loop',
+}
+# Words that end the place part of an HDB address ("... CAR PARK", "... MSCP")
+_ADDRESS_STOP_WORDS = {'car', 'mscp', 'multi', 'storey', 'basement', 'surface', 'carpark'}
+_BLOCK_PREFIX_RE = re.compile(r'^(?:blks?|blocks?)\s+(?:(?:\S*\d\S*|to|and)\s+)*')
+
+
+def normalize_place(text: str) -> str:
+    """Lowercase, strip punctuation and block numbers, expand street abbreviations."""
+    text = text.lower().replace('&', ' and ').replace('@', ' ')
+    text = re.sub(r"[^a-z0-9\s]", ' ', text)
+    words = [_ABBREVIATIONS.get(w, w) for w in text.split()]
+    text = _BLOCK_PREFIX_RE.sub('', ' '.join(words))
+    text = re.sub(r'\s+singapore$', '', text)
+    return text.strip()
+
+
+def hdb_street_name(address: str) -> Optional[str]:
+    """'BLK 125/126 ANG MO KIO STREET 12 CAR PARK' -> 'ang mo kio street 12'."""
+    words = normalize_place(address).split()
+    street = []
+    for i, word in enumerate(words):
+        if word in _ADDRESS_STOP_WORDS:
+            break
+        street.append(word)
+        if word in _STREET_TYPES:
+            if i + 1 < len(words) and words[i + 1].isdigit():
+                street.append(words[i + 1])
+            break
+    return ' '.join(street) or None
+
+
+class Gazetteer:
+    """Normalized place name -> (lat, lng) for confidently located places."""
+
+    def __init__(self):
+        self._points: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        self._places: Dict[str, Tuple[float, float]] = {}
+        self._aliases: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def add(self, name: str, lat: float, lng: float, kind: str) -> None:
+        key = normalize_place(name)
+        if key:
+            self._points.setdefault((key, kind), []).append((lat, lng))
+
+    def add_aliases(self, aliases: Dict[str, Iterable[str]]) -> None:
+        for alias, names in aliases.items():
+            self._aliases[normalize_place(alias)] = [normalize_place(n) for n in names]
+
+    def build(self) -> 'Gazetteer':
+        """Resolve each name to a centroid, dropping names spread over several places."""
+        by_name: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        for (name, kind), points in self._points.items():
+            lat = sum(p[0] for p in points) / len(points)
+            lng = sum(p[1] for p in points) / len(points)
+            centre_n, centre_e = wgs84_to_svy21(lat, lng)
+            spread = max(
+                hypot(n - centre_n, e - centre_e)
+                for n, e in (wgs84_to_svy21(*p) for p in points)
+            )
+            if spread <= MAX_SPREAD_M[kind]:
+                by_name.setdefault(name, {})[kind] = (lat, lng)
+
+        for name, kinds in by_name.items():
+            kind = next(k for k in KIND_PRIORITY if k in kinds)
+            self._places[name] = kinds[kind]
+
+        # An alias resolves to the first of its names we can place
+        for alias, names in self._aliases.items():
+            if alias not in self._places:
+                target = next((n for n in names if n in self._places), None)
+                if target is not None:
+                    self._places[alias] = self._places[target]
+
+        self._points.clear()
+        return self
+
+    def lookup(self, term: str) -> Optional[Tuple[float, float]]:
+        return self._places.get(normalize_place(term))
+
+
+def _load_aliases() -> Dict[str, List[str]]:
+    try:
+        with open(ALIASES_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f).get('mall_aliases', {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Failed to load search aliases: {e}")
+        return {}
+
+
+def build_gazetteer(hdb_info: Iterable[Dict], records: Iterable) -> Gazetteer:
+    """
+    hdb_info: static HDB carpark info rows (address, lat, lng)
+    records: snapshot CarparkRecords; non-HDB developments are indexed by name
+    """
+    gazetteer = Gazetteer()
+    for info in hdb_info:
+        lat, lng, address = info['lat'], info['lng'], info['address']
+        street = hdb_street_name(address)
+        if street:
+            gazetteer.add(street, lat, lng, 'street')
+        area = _extract_area_from_address(address)
+        if area != 'HDB':
+            gazetteer.add(area, lat, lng, 'area')
+
+    for record in records:
+        if record.agency == 'HDB':
+            continue
+        gazetteer.add(record.development, record.latitude, record.longitude, 'development')
+        if record.has_specific_pricing and record.pricing.get('name'):
+            gazetteer.add(record.pricing['name'], record.latitude, record.longitude, 'development')
+
+    gazetteer.add_aliases(_load_aliases())
+    return gazetteer.build()
+
+
+# (snapshot.positions, gazetteer) — positions is shared across snapshots with the same layout
+_current: Optional[Tuple[Dict, Gazetteer]] = None
+_build_lock = threading.Lock()
+
+
+def gazetteer_for(snapshot) -> Gazetteer:
+    """Gazetteer for `snapshot`, rebuilt only when its set of carparks changes."""
+    global _current
+    current = _current
+    if current is not None and current[0] is snapshot.positions:
+        return current[1]
+
+    with _build_lock:
+        if _current is None or _current[0] is not snapshot.positions:
+            gazetteer = build_gazetteer(load_hdb_carpark_info().values(), snapshot.records)
+            _current = (snapshot.positions, gazetteer)
+            logger.info(f"🗺️ Built gazetteer: {len(gazetteer)} place names")
+        return _current[1]
@@ -1,19 +1,48 @@
 """
 Server-side geocoding service.
-Converts place names and addresses to WGS84 coordinates using Google Geocoding API.
+Converts place names and addresses to WGS84 coordinates using Google Geocoding API,
+and answers reverse lookups near an HDB block from the local address data when
+that block's postal code is known (the frontend shows it).
 """
 
-import requests
+import asyncio
+import re
+import threading
 from app import cache
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from flask import current_app
 from app.logging_utils import log_info
+from app.services.async_upstream import async_upstream_client
+from app.services.hdb_service import load_hdb_carpark_info
+from app.services.upstream_client import upstream_client
+from app.utils.singleflight import async_singleflight, singleflight
+from app.utils.spatial_index import GridIndex
+from app.utils.svy21 import wgs84_to_svy21
+
+METRES_PER_DEGREE = 111320.0  # Latitude everywhere; longitude too, this close to the equator
+
+# Carpark descriptions that follow the block and street in HDB addresses
+_CARPARK_SUFFIX_RE = re.compile(
+    r'\s+(?:BASEMENT|SURFACE|MULTI[- ]STOREY|MSCP|CAR ?PARK|CARPARK)\b.*$'
+)
+
+# (GridIndex, results) over the HDB carparks with a postal code, built on first reverse lookup
+_hdb_address_index = None
+_hdb_address_lock = threading.Lock()
+
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GEOCODE_TTL = 604800  # 7 days
+REVERSE_GEOCODE_TTL = 604800  # 7 days
+
+_NO_ADDRESS = {'address': None, 'postalCode': None}
+
 
 # Simple in-process cache for geocoding results
 def skip_none(resp):
     return resp is not None
 
-@cache.memoize(timeout=604800,response_filter=skip_none)
+@cache.memoize(timeout=GEOCODE_TTL,response_filter=skip_none)
+@singleflight  # Concurrent misses for one term share one Google call
 def geocode_place(term: str) -> Optional[Tuple[float, float]]:
     """
     Geocode a place name or address to (lat, lng).
@@ -22,27 +51,183 @@ def geocode_place(term: str) -> Optional[Tuple[float, float]]:
     Returns (lat, lng) tuple or None if geocoding fails.
     """
 
-    api_key = current_app.config.get('GOOGLE_MAPS_API_KEY')
+    api_key = _google_api_key()
     if not api_key:
-        current_app.logger.warning("⚠️ GOOGLE_MAPS_API_KEY not configured — geocoding unavailable")
         return None
 
-    query = f"{term.strip()}, Singapore"
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
-
     try:
-        response = requests.get(url, params={"address": query, "key": api_key}, timeout=5)
-        data = response.json()
+        response = upstream_client.get('google', GEOCODE_URL, params=_geocode_params(term, api_key))
+        return _location_from_response(term, response.json())
+    except Exception as e:
+        current_app.logger.error(f"❌ Geocoding error for '{term}': {e}")
+        return None
 
-        if data.get("status") == "OK" and data.get("results"):
-            location = data["results"][0]["geometry"]["location"]
-            result = (location["lat"], location["lng"])
-            log_info(f"📍 Geocoded '{term}' → {result}")
-            return result
 
-        current_app.logger.warning(f"⚠️ Geocoding failed for '{term}': {data.get('status')}")
+@async_singleflight
+async def geocode_place_async(term: str) -> Optional[Tuple[float, float]]:
+    """geocode_place for the async app: non-blocking, and shares geocode_place's cache entries."""
+    # Cache calls go to a thread: with Redis each is a network round trip
+    # (make_cache_key too, it reads the memoize version)
+    key = await asyncio.to_thread(geocode_place.make_cache_key, geocode_place.uncached, term)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return cached
+
+    api_key = _google_api_key()
+    if not api_key:
         return None
 
+    try:
+        response = await async_upstream_client.get('google', GEOCODE_URL, params=_geocode_params(term, api_key))
+        result = _location_from_response(term, response.json())
     except Exception as e:
         current_app.logger.error(f"❌ Geocoding error for '{term}': {e}")
         return None
+    if result is not None:
+        await asyncio.to_thread(cache.set, key, result, timeout=GEOCODE_TTL)
+    return result
+
+
+def _google_api_key() -> Optional[str]:
+    api_key = current_app.config.get('GOOGLE_MAPS_API_KEY')
+    if not api_key:
+        current_app.logger.warning("⚠️ GOOGLE_MAPS_API_KEY not configured — geocoding unavailable")
+    return api_key
+
+
+def _geocode_params(term: str, api_key: str) -> Dict[str, str]:
+    return {"address": f"{term.strip()}, Singapore", "key": api_key}
+
+
+def _location_from_response(term: str, data: Dict) -> Optional[Tuple[float, float]]:
+    if data.get("status") == "OK" and data.get("results"):
+        location = data["results"][0]["geometry"]["location"]
+        result = (location["lat"], location["lng"])
+        log_info(f"📍 Geocoded '{term}' → {result}")
+        return result
+
+    current_app.logger.warning(f"⚠️ Geocoding failed for '{term}': {data.get('status')}")
+    return None
+
+
+def reverse_geocode(lat: float, lng: float) -> Dict:
+    """
+    Address + postal code for (lat, lng), which callers quantize first.
+    Next to an HDB block with a known postal code the answer comes from local
+    data; Google elsewhere.
+    """
+    local = nearest_hdb_address(lat, lng, current_app.config['REVERSE_GEOCODE_LOCAL_M'])
+    if local is not None:
+        return local
+    return _reverse_geocode_google(lat, lng)
+
+
+async def reverse_geocode_async(lat: float, lng: float) -> Dict:
+    """reverse_geocode for the async app; shares its cache entries."""
+    # On a thread: the first lookup builds the HDB address index
+    local = await asyncio.to_thread(
+        nearest_hdb_address, lat, lng, current_app.config['REVERSE_GEOCODE_LOCAL_M']
+    )
+    if local is not None:
+        return local
+
+    key = await asyncio.to_thread(
+        _reverse_geocode_google.make_cache_key, _reverse_geocode_google.uncached, lat, lng
+    )
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return cached
+
+    api_key = current_app.config.get('GOOGLE_MAPS_API_KEY')
+    if not api_key:
+        return dict(_NO_ADDRESS)
+    try:
+        response = await async_upstream_client.get('google', GEOCODE_URL, params=_reverse_params(lat, lng, api_key))
+        result = _address_from_response(response.json())
+    except Exception as e:
+        current_app.logger.error(f"Reverse geocoding error: {e}")
+        return dict(_NO_ADDRESS)
+    if _has_address(result):
+        await asyncio.to_thread(cache.set, key, result, timeout=REVERSE_GEOCODE_TTL)
+    return result
+
+
+def _has_address(result):
+    return result.get('address') is not None
+
+
+@cache.memoize(timeout=REVERSE_GEOCODE_TTL, response_filter=_has_address)
+def _reverse_geocode_google(lat, lng):
+    """Address + postal code for (lat, lng) from Google; failures aren't cached."""
+    api_key = current_app.config.get('GOOGLE_MAPS_API_KEY')
+    if not api_key:
+        return dict(_NO_ADDRESS)
+
+    try:
+        response = upstream_client.get('google', GEOCODE_URL, params=_reverse_params(lat, lng, api_key))
+        return _address_from_response(response.json())
+    except Exception as e:
+        current_app.logger.error(f"Reverse geocoding error: {e}")
+        return dict(_NO_ADDRESS)
+
+
+def _reverse_params(lat: float, lng: float, api_key: str) -> Dict[str, str]:
+    return {"latlng": f"{lat},{lng}", "key": api_key}
+
+
+def _address_from_response(data: Dict) -> Dict:
+    if data.get("status") != "OK" or not data.get("results"):
+        return dict(_NO_ADDRESS)
+
+    address = data["results"][0].get("formatted_address")
+    postal_code = None
+    for result in data["results"]:
+        for component in result.get("address_components", []):
+            if "postal_code" in component.get("types", []):
+                postal_code = component["long_name"]
+                break
+        if postal_code:
+            break
+
+    return {'address': address, 'postalCode': postal_code}
+
+
+def quantize_coordinates(lat: float, lng: float, grid_m: float) -> Tuple[float, float]:
+    """Snap (lat, lng) to the centre of its grid_m cell, so nearby lookups share a cache entry."""
+    step = grid_m / METRES_PER_DEGREE
+    return round(round(lat / step) * step, 6), round(round(lng / step) * step, 6)
+
+
+def _format_hdb_address(address: str) -> str:
+    """'BLK 808 FRENCH ROAD MSCP' -> 'Blk 808 French Road, Singapore'."""
+    street = _CARPARK_SUFFIX_RE.sub('', address.upper()).strip()
+    return f"{street.title().replace(' To ', ' to ')}, Singapore"
+
+
+def _get_hdb_address_index() -> Tuple[GridIndex, List[Dict]]:
+    global _hdb_address_index
+    if _hdb_address_index is None:
+        with _hdb_address_lock:
+            if _hdb_address_index is None:
+                # Blocks without a postal code are left to Google, which returns one
+                info = [
+                    i for i in load_hdb_carpark_info().values()
+                    if i.get('northing') is not None and i.get('easting') is not None and i.get('postal_code')
+                ]
+                index = GridIndex([(i['northing'], i['easting']) for i in info], cell_size_m=100.0)
+                _hdb_address_index = (index, [
+                    {'address': _format_hdb_address(i['address']), 'postalCode': str(i['postal_code'])}
+                    for i in info
+                ])
+    return _hdb_address_index
+
+
+def nearest_hdb_address(lat: float, lng: float, max_distance_m: float) -> Optional[Dict]:
+    """
+    Address + postal code of the nearest HDB block within max_distance_m of
+    (lat, lng), or None (also when no block there has a postal code).
+    """
+    index, results = _get_hdb_address_index()
+    northing, easting = wgs84_to_svy21(lat, lng)
+    positions, _ = index.query_radius(northing, easting, max_distance_m)
+    return dict(results[positions[0]]) if len(positions) else None
@@ -2,17 +2,26 @@
 HDB Carpark Service - Fetches HDB carpark data from data.gov.sg API
 """
 
+import asyncio
 import json
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 from flask import current_app
 from app import cache
 from app.logging_utils import log_info
+from app.services.async_upstream import async_upstream_client
+from app.services.snapshot_service import mark_source_refreshed
+from app.services.upstream_client import upstream_client
+from app.utils.singleflight import async_singleflight, singleflight
 from sgdata import SGDataClient, LotType
+from sgdata.models.carpark import CarparkAvailabilityResponse
 
 # Cache for HDB carpark info (static data)
 _hdb_info_cache = None
 
+# (api_key, client) — reused across refreshes to keep the connection alive
+_sgdata_client = None
+
 def load_hdb_carpark_info() -> Dict[str, Dict]:
     """Load static HDB carpark information with coordinates from JSON file"""
     global _hdb_info_cache
@@ -40,49 +49,115 @@ def load_hdb_carpark_info() -> Dict[str, Dict]:
         current_app.logger.error(f"❌ Failed to load HDB carpark info: {e}")
         return {}
 
-@cache.memoize(timeout=120)
+HDB_AVAILABILITY_TTL = 120
+HDB_REFRESH_INTERVAL = 90  # Background refresh, ahead of the TTL
+
+# The endpoint SGDataClient.get_carpark_availability calls, for the async fetch
+HDB_AVAILABILITY_URL = f"{SGDataClient.BASE_URL}/transport/carpark-availability"
+
+
+@cache.memoize(timeout=HDB_AVAILABILITY_TTL)
+@singleflight  # Concurrent misses share one fetch
 def fetch_hdb_availability() -> Dict[str, Dict]:
     """Fetch live HDB carpark availability from data.gov.sg"""
-    
+    availability = _fetch_hdb_availability()
+    # Even an empty result is cached, so stamp it as the current HDB version
+    mark_source_refreshed('hdb', timeout=HDB_AVAILABILITY_TTL)
+    return availability
+
+
+def _fetch_hdb_availability() -> Dict[str, Dict]:
     try:
         api_key = current_app.config.get('DATA_GOV_API_KEY')
         
         if not api_key:
             current_app.logger.warning("⚠️ DATA_GOV_API_KEY not configured")
             return {}
-        client = SGDataClient(api_key=api_key)
-        
-        response = client.get_carpark_availability()
+        client = _get_sgdata_client(api_key)
+        with upstream_client.timed('data_gov'):
+            response = client.get_carpark_availability()
+
+        return _availability_by_carpark(response)
 
-        if not response.carparks:
-            current_app.logger.warning("⚠️ No carparks in HDB carpark availability response")
+    except Exception as e:
+        current_app.logger.error(f"❌ Failed to fetch HDB availability: {e}")
+        return {}
+
+
+@async_singleflight
+async def fetch_hdb_availability_async() -> Dict[str, Dict]:
+    """fetch_hdb_availability for the async app; reads and fills the same cache entry."""
+    # Cache calls go to a thread: with Redis each is a network round trip
+    # (make_cache_key too, it reads the memoize version)
+    key = await asyncio.to_thread(fetch_hdb_availability.make_cache_key, fetch_hdb_availability.uncached)
+    availability = await asyncio.to_thread(cache.get, key)
+    if availability is None:
+        availability = await _fetch_hdb_availability_async()
+        await asyncio.to_thread(cache.set, key, availability, timeout=HDB_AVAILABILITY_TTL)
+        await asyncio.to_thread(mark_source_refreshed, 'hdb', timeout=HDB_AVAILABILITY_TTL)
+    return availability
+
+
+async def _fetch_hdb_availability_async() -> Dict[str, Dict]:
+    try:
+        api_key = current_app.config.get('DATA_GOV_API_KEY')
+
+        if not api_key:
+            current_app.logger.warning("⚠️ DATA_GOV_API_KEY not configured")
             return {}
+        response = await async_upstream_client.get(
+            'data_gov', HDB_AVAILABILITY_URL,
+            headers={'api-key': api_key, 'Accept': 'application/json'},
+        )
+        response.raise_for_status()
+
+        # On a thread: decoding and indexing ~2,000 carparks takes ~100 ms
+        return await asyncio.to_thread(
+            lambda: _availability_by_carpark(CarparkAvailabilityResponse.from_dict(response.json()))
+        )
 
-        # Convert to dict keyed by carpark_number
-        availability = {}
-        for cp in response.carparks:
-            carpark_no = cp.carpark_number
-            if not carpark_no:
-                continue
-
-            car_lot = cp.car_lots
-            availability[carpark_no] = {
-                'total_lots': car_lot.total_lots if car_lot else 0,
-                'lots_available': car_lot.available_lots if car_lot else 0,
-                'update_datetime': cp.updated_at.isoformat()
-            }
-        
-        log_info(f"✅ Fetched availability for {len(availability)} HDB carparks")
-        return availability
-        
     except Exception as e:
         current_app.logger.error(f"❌ Failed to fetch HDB availability: {e}")
         return {}
 
-def get_hdb_carparks() -> List[Dict]:
+
+def _availability_by_carpark(response: CarparkAvailabilityResponse) -> Dict[str, Dict]:
+    """Convert an availability response to a dict keyed by carpark_number."""
+    if not response.carparks:
+        current_app.logger.warning("⚠️ No carparks in HDB carpark availability response")
+        return {}
+
+    availability = {}
+    for cp in response.carparks:
+        carpark_no = cp.carpark_number
+        if not carpark_no:
+            continue
+
+        car_lot = cp.car_lots
+        availability[carpark_no] = {
+            'total_lots': car_lot.total_lots if car_lot else 0,
+            'lots_available': car_lot.available_lots if car_lot else 0,
+            'update_datetime': cp.updated_at.isoformat()
+        }
+
+    log_info(f"✅ Fetched availability for {len(availability)} HDB carparks")
+    return availability
+
+def _get_sgdata_client(api_key: str) -> SGDataClient:
+    """One SGDataClient per API key, on the shared pooled/retrying data.gov.sg session."""
+    global _sgdata_client
+    if _sgdata_client is None or _sgdata_client[0] != api_key:
+        client = SGDataClient(api_key=api_key, timeout=upstream_client.timeout('data_gov'))
+        upstream_client.mount(client.session, 'data_gov')
+        _sgdata_client = (api_key, client)
+    return _sgdata_client[1]
+
+
+def get_hdb_carparks(availability: Optional[Dict[str, Dict]] = None) -> List[Dict]:
     """
     Get complete HDB carpark data by merging static info with live availability.
     Returns data in format compatible with LTA API structure.
+    Pass `availability` when it has already been fetched (the async app does).
     """
     
     # Load static info
@@ -91,7 +166,8 @@ def get_hdb_carparks() -> List[Dict]:
         return []
     
     # Fetch live availability
-    availability = fetch_hdb_availability()
+    if availability is None:
+        availability = fetch_hdb_availability()
     
     # Merge both datasets
     result = []
@@ -4,7 +4,7 @@ Pricing service for managing carpark rate data.
 import json
 import logging
 import os
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +13,8 @@ class PricingService:
     
     def __init__(self):
         self.pricing_data: Dict[str, Dict] = {}
+        # (carpark_id, development_name) -> (pricing record, has_specific_pricing)
+        self._resolution_index: Dict[Tuple[str, str], Tuple[Optional[Dict], bool]] = {}
         self._load_pricing_data()
     
     def _load_pricing_data(self):
@@ -44,16 +46,49 @@ class PricingService:
         """
         return carpark_id.lower().replace('@', '').replace(' ', '').replace('_', '').strip()
     
+    def resolve(self, carpark_id: str, development_name: str = '') -> Tuple[Optional[Dict], bool]:
+        """
+        Return (pricing record, has_specific_pricing) for a carpark.
+        A single dict probe for indexed identities; unseen ones are resolved once and added.
+        """
+        key = (carpark_id, development_name or '')
+        resolved = self._resolution_index.get(key)
+        if resolved is None:
+            resolved = self._resolve_uncached(carpark_id, development_name)
+            self._resolution_index[key] = resolved
+        return resolved
+
+    def build_resolution_index(self, identities: Iterable[Tuple[str, str]]) -> int:
+        """
+        Pre-resolve (carpark_id, development_name) pairs not yet in the index.
+        Call when the carpark set changes. Returns the number of new entries.
+        """
+        added = 0
+        for carpark_id, development_name in identities:
+            key = (carpark_id, development_name or '')
+            if key not in self._resolution_index:
+                self._resolution_index[key] = self._resolve_uncached(carpark_id, development_name)
+                added += 1
+        return added
+
     def get_pricing_info(self, carpark_id: str, development_name: str = '') -> Optional[Dict]:
         """
         Get pricing info for a carpark using ID or name matching.
         Automatically detects HDB carparks and applies HDB rates.
         Falls back to default rates if no match found.
         """
-        # Check if this is an HDB carpark
+        return self.resolve(carpark_id, development_name)[0]
+
+    def _resolve_uncached(self, carpark_id: str, development_name: str = '') -> Tuple[Optional[Dict], bool]:
+        """Full matching: HDB detection, exact ID, exact name, then partial-name scan."""
+        # HDB carparks have specific pricing
         if self._is_hdb_carpark(carpark_id, development_name):
-            return self.pricing_data.get('hdb')
-        
+            return self.pricing_data.get('hdb'), True
+
+        pricing = self._match_pricing(carpark_id, development_name)
+        return pricing, pricing is not None and pricing.get('name') != 'Standard Carpark'
+
+    def _match_pricing(self, carpark_id: str, development_name: str = '') -> Optional[Dict]:
         # Try exact ID match first
         normalized_id = self._normalize_carpark_id(carpark_id)
         if normalized_id in self.pricing_data:
@@ -105,12 +140,7 @@ class PricingService:
     
     def has_pricing(self, carpark_id: str, development_name: str = '') -> bool:
         """Check if pricing data exists for carpark (excluding default)."""
-        # HDB carparks have specific pricing
-        if self._is_hdb_carpark(carpark_id, development_name):
-            return True
-        
-        pricing = self.get_pricing_info(carpark_id, development_name)
-        return pricing is not None and pricing.get('name') != 'Standard Carpark'
+        return self.resolve(carpark_id, development_name)[1]
 
 # Singleton instance
 pricing_service = PricingService()
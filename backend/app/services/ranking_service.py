@@ -0,0 +1,113 @@
+"""
+Ranking Service - Orders search candidates by cost or by a weighted score.
+
+Costs come from the tariff engine's precomputed cost curves, so every carpark
+inside the radius is ranked, not just a distance-ordered prefix. Tariffs the
+engine can't parse (AI-only) have no curve: they rank after every carpark with
+a known cost, and score zero on the cost component.
+"""
+
+import math
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.services.snapshot_service import CarparkSnapshot
+from app.services.tariff_engine import DAY_TYPES, select_rate_string, tariff_engine
+
+SORT_MODES = ('distance', 'cost', 'score')
+
+# Lots beyond this many don't make a carpark any more attractive
+LOTS_SATURATION = 50
+
+
+def tariff_rows(snapshot: CarparkSnapshot, day_type: str) -> np.ndarray:
+    """Cost-curve row of every record for `day_type` (-1 = no curve), cached on the snapshot."""
+    rows = snapshot.cost_rows.get(day_type)
+    if rows is None:
+        curve_rows = tariff_engine.curves.rows
+        rows = np.array([
+            curve_rows.get(select_rate_string(r.pricing, day_type) or '', -1) if r.has_pricing and r.pricing else -1
+            for r in snapshot.records
+        ], dtype=np.int32)
+        snapshot.cost_rows[day_type] = rows
+    return rows
+
+
+def costs_at(snapshot: CarparkSnapshot, positions: np.ndarray, duration_hours: float, day_type: str) -> np.ndarray:
+    """Local cost of each position for the stay (NaN where there is no cost curve)."""
+    if not (math.isfinite(duration_hours) and duration_hours > 0):
+        raise ValueError(f'duration_hours must be finite and positive, got {duration_hours!r}')
+    if day_type not in DAY_TYPES:
+        day_type = 'weekday'
+    rows = tariff_rows(snapshot, day_type)[positions]
+    column = tariff_engine.curves.column(duration_hours)
+    costs = np.full(len(positions), np.nan)
+    known = rows >= 0
+    if len(column):
+        costs[known] = column[rows[known]]
+    return costs
+
+
+def _normalized_closeness(values: np.ndarray) -> np.ndarray:
+    """1 for the smallest value, 0 for the largest (and for NaN)."""
+    known = ~np.isnan(values)
+    result = np.zeros(len(values))
+    if not known.any():
+        return result
+    low, high = values[known].min(), values[known].max()
+    span = high - low
+    result[known] = 1.0 if span == 0 else 1.0 - (values[known] - low) / span
+    return result
+
+
+def rank(
+    snapshot: CarparkSnapshot,
+    positions: np.ndarray,
+    distances: np.ndarray,
+    sort: str,
+    duration_hours: Optional[float] = None,
+    day_type: str = 'weekday',
+    weights: Optional[Dict[str, float]] = None,
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """
+    Reorder distance-ordered candidates by `sort`. Returns (positions, distances,
+    scores); scores is None unless sort == 'score'. Ties keep distance order.
+
+    cost:  cheapest first for the stay; needs duration_hours.
+    score: weighted mix of closeness, available car lots and cheapness, each
+           scaled to [0, 1] over the candidates (higher is better). Without a
+           duration the cost weight is dropped.
+    """
+    if sort == 'distance' or not len(positions):
+        return positions, distances, None
+
+    costs = None
+    if duration_hours is not None:
+        costs = costs_at(snapshot, positions, duration_hours, day_type)
+
+    if sort == 'cost':
+        # NaN sorts last; lexsort keeps distance order among equal costs
+        order = np.lexsort((np.arange(len(positions)), np.nan_to_num(costs, nan=np.inf)))
+        return positions[order], distances[order], None
+
+    weights = dict(weights or {})
+    lots = snapshot.car_lots[positions]
+    components = {
+        'distance': _normalized_closeness(distances.astype(np.float64)),
+        'lots': np.clip(lots, 0, LOTS_SATURATION) / LOTS_SATURATION,
+    }
+    if costs is not None:
+        components['cost'] = _normalized_closeness(costs)
+    else:
+        weights.pop('cost', None)
+
+    total_weight = sum(weights.get(k, 0.0) for k in components)
+    scores = np.zeros(len(positions))
+    if total_weight > 0:
+        for name, values in components.items():
+            scores += weights.get(name, 0.0) * values
+        scores /= total_weight
+
+    order = np.argsort(-scores, kind='stable')
+    return positions[order], distances[order], scores[order]
@@ -0,0 +1,271 @@
+"""
+Refresh Service - Background refresh of the upstream feeds (stale-while-revalidate).
+
+Requests read the LTA and HDB feeds through their @cache.memoize functions. This
+scheduler re-fetches each feed before its cache entry expires and writes the
+result straight into the memoize slot, so no request waits on an upstream call.
+If a refresh fails, the last good copy is written back with a fresh TTL and
+served (stale) until the upstream recovers.
+
+Every worker runs its own scheduler thread; a short cache lock makes sure only
+one of them calls a given upstream per refresh. Under the async app the same
+scheduler runs as a task on the event loop instead (start_async).
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app import cache
+from app.services.snapshot_service import (
+    extend_source_version,
+    mark_source_refreshed,
+    source_fetched_at,
+)
+
+TICK_SECONDS = 5
+RETRY_BACKOFF_SECONDS = 30  # After a failed refresh, before any worker retries
+
+_REFRESH_LOCK_KEY = 'refresh:lock:{}'
+
+
+class Feed:
+    """One upstream dataset and how to refresh its memoized cache entry."""
+
+    def __init__(
+        self,
+        source: str,
+        memoized: Callable,
+        fetch: Callable[[], Any],
+        ttl: int,
+        interval: int,
+        is_valid: Callable[[Any], bool] = lambda data: data is not None,
+        afetch: Optional[Callable[[], Awaitable[Any]]] = None,
+    ):
+        self.source = source
+        self.memoized = memoized  # The @cache.memoize function requests call
+        self.fetch = fetch  # Raw upstream fetch, no caching
+        self.afetch = afetch  # Coroutine version of fetch, for the async app
+        self.ttl = ttl
+        self.interval = interval
+        self.is_valid = is_valid
+        self.last_good = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def cache_key(self) -> str:
+        return self.memoized.make_cache_key(self.memoized.uncached)
+
+    def age(self) -> Optional[float]:
+        """Seconds since this feed last produced new data (None if never)."""
+        fetched_at = source_fetched_at(self.source)
+        return None if fetched_at is None else time.time() - fetched_at
+
+
+class RefreshScheduler:
+    """Keeps every registered feed warm from a daemon thread."""
+
+    def __init__(self):
+        self._feeds: List[Feed] = []
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    @property
+    def feeds(self) -> List[Feed]:
+        if not self._feeds:
+            self._feeds = _default_feeds()
+        return self._feeds
+
+    def start(self, app) -> None:
+        """Start the scheduler; its first tick is the startup cache warm-up."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app,), name='feed-refresh', daemon=True
+        )
+        self._thread.start()
+
+    def start_async(self, app) -> None:
+        """Start the scheduler as a task on the running event loop (the async app's)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run_async(app), name='feed-refresh')
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _run(self, app) -> None:
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    self.tick()
+                except Exception as e:
+                    app.logger.error(f"❌ Feed refresh tick failed: {e}")
+            self._stop.wait(TICK_SECONDS)
+
+    async def _run_async(self, app) -> None:
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    await self.tick_async(app)
+                except Exception as e:
+                    app.logger.error(f"❌ Feed refresh tick failed: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+    def tick(self) -> None:
+        """Refresh every feed that is due, then make sure this worker's snapshot is current."""
+        from app.services.carpark_service import get_snapshot
+
+        for feed in self._due():
+            self.refresh(feed)
+
+        # Cheap when nothing moved; otherwise rebuilds here instead of in a request
+        get_snapshot()
+
+    async def tick_async(self, app) -> None:
+        """
+        tick() without blocking the loop: due feeds refresh concurrently, and
+        the cache calls (network round trips with Redis) and the snapshot
+        build run on threads.
+        """
+        due = await asyncio.to_thread(self._due)
+        await asyncio.gather(*(self.refresh_async(feed) for feed in due))
+        await asyncio.to_thread(_refresh_snapshot, app)
+
+    def refresh(self, feed: Feed) -> bool:
+        """Fetch one feed into its memoize slot. Returns False if another worker holds it or it failed."""
+        if not self._acquire(feed):
+            return False
+
+        try:
+            data = feed.fetch()
+            if not feed.is_valid(data):
+                raise ValueError('empty response')
+        except Exception as e:
+            self._fail(feed, e)
+            return False
+
+        self._store(feed, data)
+        return True
+
+    async def refresh_async(self, feed: Feed) -> bool:
+        """refresh() through the feed's coroutine fetch."""
+        if not await asyncio.to_thread(self._acquire, feed):
+            return False
+
+        try:
+            data = await feed.afetch()
+            if not feed.is_valid(data):
+                raise ValueError('empty response')
+        except Exception as e:
+            await asyncio.to_thread(self._fail, feed, e)
+            return False
+
+        await asyncio.to_thread(self._store, feed, data)
+        return True
+
+    def _due(self) -> List[Feed]:
+        due = []
+        for feed in self.feeds:
+            age = feed.age()
+            if age is None or age >= feed.interval:
+                due.append(feed)
+        return due
+
+    def _acquire(self, feed: Feed) -> bool:
+        return cache.add(_REFRESH_LOCK_KEY.format(feed.source), 1, timeout=RETRY_BACKOFF_SECONDS)
+
+    def _fail(self, feed: Feed, error: Exception) -> None:
+        from flask import current_app
+
+        feed.last_error = str(error)
+        current_app.logger.warning(f"⚠️ {feed.source} refresh failed, serving last good copy: {error}")
+        self._serve_stale(feed)
+        # Lock stays until RETRY_BACKOFF_SECONDS so workers don't hammer a failing upstream
+
+    def _store(self, feed: Feed, data: Any) -> None:
+        from app.logging_utils import log_info
+
+        # Data first, then the version: a reader never sees a new version with old data
+        cache.set(feed.cache_key, data, timeout=feed.ttl)
+        mark_source_refreshed(feed.source, timeout=feed.ttl)
+        feed.last_good = data
+        feed.last_error = None
+        cache.delete(_REFRESH_LOCK_KEY.format(feed.source))
+        log_info(f"🔄 Refreshed {feed.source} feed")
+
+    def _serve_stale(self, feed: Feed) -> None:
+        last_good = cache.get(feed.cache_key)
+        if last_good is None or not feed.is_valid(last_good):
+            last_good = feed.last_good
+        if last_good is None:
+            return
+        cache.set(feed.cache_key, last_good, timeout=feed.ttl)
+        extend_source_version(feed.source, timeout=feed.ttl)
+
+    def seconds_until_refresh(self) -> Optional[int]:
+        """Seconds until the next feed is due to refresh (None if any feed has no data yet)."""
+        remaining = []
+        for feed in self.feeds:
+            age = feed.age()
+            if age is None:
+                return None
+            remaining.append(feed.interval - age)
+        return max(0, int(min(remaining)))
+
+    def status(self) -> Dict[str, Dict]:
+        """Age and health of each dataset, for /health."""
+        status = {}
+        for feed in self.feeds:
+            age = feed.age()
+            status[feed.source] = {
+                'age_seconds': None if age is None else round(age, 1),
+                'stale': age is None or age > feed.ttl,
+                'last_error': feed.last_error,
+            }
+        return status
+
+
+def _refresh_snapshot(app) -> None:
+    from app.services.carpark_service import get_snapshot
+
+    with app.app_context():
+        get_snapshot()
+
+
+def _default_feeds() -> List[Feed]:
+    from app.services.carpark_service import (
+        LTA_CARPARKS_TTL,
+        LTA_REFRESH_INTERVAL,
+        _fetch_lta_carparks,
+        _fetch_lta_carparks_async,
+        fetch_all_carparks,
+    )
+    from app.services.hdb_service import (
+        HDB_AVAILABILITY_TTL,
+        HDB_REFRESH_INTERVAL,
+        _fetch_hdb_availability,
+        _fetch_hdb_availability_async,
+        fetch_hdb_availability,
+    )
+
+    return [
+        Feed('lta', fetch_all_carparks, _fetch_lta_carparks,
+             ttl=LTA_CARPARKS_TTL, interval=LTA_REFRESH_INTERVAL,
+             afetch=_fetch_lta_carparks_async),
+        # _fetch_hdb_availability logs and returns {} on failure
+        Feed('hdb', fetch_hdb_availability, _fetch_hdb_availability,
+             ttl=HDB_AVAILABILITY_TTL, interval=HDB_REFRESH_INTERVAL,
+             is_valid=bool, afetch=_fetch_hdb_availability_async),
+    ]
+
+
+# Singleton instance
+refresh_scheduler = RefreshScheduler()
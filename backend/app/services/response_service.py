@@ -0,0 +1,119 @@
+"""
+Response Service - Encodes carpark lists to JSON with cached static fragments.
+
+Most of a carpark's JSON (ID, address, coordinates, verbose pricing text) only
+changes when the snapshot is rebuilt, so the encoded static part of each
+carpark is cached on its snapshot, per field projection. A response then only
+encodes the per-request fields (lots, distance, cost) and splices them in.
+
+Uses orjson when installed, falling back to the standard json module.
+"""
+
+import json
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from app.services.snapshot_service import CARPARK_FIELDS, LOT_FIELDS, CarparkSnapshot
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+# Fields fixed for the lifetime of a snapshot; everything else is per request
+STATIC_FIELDS = tuple(f for f in CARPARK_FIELDS if f not in LOT_FIELDS)
+
+# Fields a request may add on top of the snapshot fields
+REQUEST_FIELDS = ('distance', 'score', 'calculated_cost', 'cost_breakdown', 'ai_explanation', 'ai_confidence')
+
+PROJECTABLE_FIELDS = frozenset(CARPARK_FIELDS + REQUEST_FIELDS)
+
+# cost_breakdown of a cost that failed to calculate (Claude erroring or unreachable);
+# unlike "no rate for this day" these are transient, so such responses aren't cached
+FAILED_COST_BREAKDOWNS = frozenset(('Calculation error', 'AI service unavailable'))
+
+# Distinct projections cached per snapshot; others are encoded without caching
+MAX_CACHED_PROJECTIONS = 8
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def parse_fields(fields: Optional[str]) -> Optional[FrozenSet[str]]:
+    """
+    Parse a `fields=` query value into a projection (None = every field).
+    carpark_num is always included. Raises ValueError on unknown fields.
+    """
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(',') if f.strip()}
+    unknown = requested - PROJECTABLE_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return frozenset(requested | {'carpark_num'})
+
+
+def costs_complete(carparks: Iterable[Dict]) -> bool:
+    """False if any carpark's cost failed to calculate (see FAILED_COST_BREAKDOWNS)."""
+    return not any(cp.get('cost_breakdown') in FAILED_COST_BREAKDOWNS for cp in carparks)
+
+
+def _static_fragments(snapshot: CarparkSnapshot, projection: Optional[FrozenSet[str]]) -> Optional[Dict[str, bytes]]:
+    """This snapshot's fragment cache for `projection`: carpark_num -> b'"k":v,...'."""
+    cache = snapshot.fragment_cache
+    fragments = cache.get(projection)
+    if fragments is None and len(cache) < MAX_CACHED_PROJECTIONS:
+        fragments = cache.setdefault(projection, {})
+    return fragments
+
+
+def _encode_static(row: Dict, static_fields: Iterable[str]) -> bytes:
+    # Encode as an object, then drop the braces so it can be spliced
+    return dumps({f: row[f] for f in static_fields if f in row})[1:-1]
+
+
+def encode_carparks(
+    snapshot: CarparkSnapshot, rows: List[Dict], projection: Optional[FrozenSet[str]] = None
+) -> bytes:
+    """Encode response rows (from CarparkRecord.to_dict) as a JSON array."""
+    if projection is None:
+        static_fields = STATIC_FIELDS
+    else:
+        static_fields = tuple(f for f in STATIC_FIELDS if f in projection)
+    fragments = _static_fragments(snapshot, projection)
+
+    parts = []
+    for row in rows:
+        carpark_num = row['carpark_num']
+        static = fragments.get(carpark_num) if fragments is not None else None
+        if static is None:
+            static = _encode_static(row, static_fields)
+            if fragments is not None and snapshot.get(carpark_num) is not None:
+                fragments[carpark_num] = static
+
+        dynamic = {
+            k: v for k, v in row.items()
+            if k not in STATIC_FIELDS and (projection is None or k in projection)
+        }
+        if dynamic:
+            static_sep = static + b',' if static else static
+            parts.append(b'{' + static_sep + dumps(dynamic)[1:-1] + b'}')
+        else:
+            parts.append(b'{' + static + b'}')
+
+    return b'[' + b','.join(parts) + b']'
+
+
+def encode_response(
+    snapshot: CarparkSnapshot,
+    rows: List[Dict],
+    projection: Optional[FrozenSet[str]] = None,
+    **envelope,
+) -> bytes:
+    """JSON object with the encoded rows under "carparks" plus the `envelope` fields."""
+    body = b'{"carparks":' + encode_carparks(snapshot, rows, projection)
+    for key, value in envelope.items():
+        body += b',' + dumps(key) + b':' + dumps(value)
+    return body + b'}'
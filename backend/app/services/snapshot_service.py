@@ -0,0 +1,310 @@
+"""
+Snapshot Service - Versioned, read-only carpark table shared by all requests.
+
+The consolidated, transformed and priced carpark list only changes when one of
+the upstream feeds (LTA DataMall, data.gov.sg HDB availability) refreshes.
+Each feed stamps a source version into the cache whenever it fetches new data;
+the snapshot is rebuilt only when that pair of versions changes.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app import cache
+from app.utils.singleflight import SingleFlight
+from app.utils.spatial_index import GridIndex
+
+logger = logging.getLogger(__name__)
+
+# Upstream feeds that contribute to a snapshot, in a fixed order
+SOURCES = ('lta', 'hdb')
+
+# Lot counts diffed between successive snapshots, in column order
+LOT_FIELDS = ('car_lots', 'motorcycle_lots', 'heavy_vehicle_lots')
+
+# Every field of a carpark as served to the frontend
+CARPARK_FIELDS = (
+    'carpark_num', 'area', 'development', 'address',
+    'latitude', 'longitude', 'northing', 'easting',
+) + LOT_FIELDS + ('has_pricing', 'has_specific_pricing', 'pricing', 'agency')
+
+# Deltas kept for /carparks/changes (about an hour of HDB refreshes)
+CHANGE_HISTORY = 32
+
+# A snapshot built while a feed had no version (its fetch failed or its cache
+# entry expired) is reused this long before a request retries the build
+INCOMPLETE_RETRY_SECONDS = 30
+
+_BUILD_KEY = 'snapshot-build'
+
+_SOURCE_VERSION_KEY = 'snapshot:source-version:{}'
+_SOURCE_FETCHED_AT_KEY = 'snapshot:source-fetched-at:{}'
+
+
+def mark_source_refreshed(source: str, timeout: int) -> str:
+    """Record that `source` produced new data. Call from the (cache-miss) fetch path."""
+    token = uuid.uuid4().hex[:12]
+    cache.set(_SOURCE_VERSION_KEY.format(source), token, timeout=timeout)
+    # Kept without expiry so the dataset age is still known while serving stale data
+    cache.set(_SOURCE_FETCHED_AT_KEY.format(source), time.time(), timeout=0)
+    return token
+
+
+def extend_source_version(source: str, timeout: int) -> str:
+    """Keep the current version of `source` alive (stale data re-served), without a rebuild."""
+    key = _SOURCE_VERSION_KEY.format(source)
+    token = cache.get(key) or uuid.uuid4().hex[:12]
+    cache.set(key, token, timeout=timeout)
+    return token
+
+
+def source_fetched_at(source: str) -> Optional[float]:
+    """Unix time `source` last produced new data, shared by all workers."""
+    return cache.get(_SOURCE_FETCHED_AT_KEY.format(source))
+
+
+def source_versions() -> Tuple[Optional[str], ...]:
+    """Current version token of every source (None if unknown or expired)."""
+    return tuple(cache.get_many(*[_SOURCE_VERSION_KEY.format(s) for s in SOURCES]))
+
+
+class CarparkRecord:
+    """
+    One carpark in a snapshot. Slotted, so a few thousand of them stay small;
+    `pricing` is shared with the pricing service, never copied. Dicts are only
+    made by to_dict(), when a response is built.
+    """
+
+    __slots__ = CARPARK_FIELDS
+
+    def __init__(self, **fields):
+        for name in CARPARK_FIELDS:
+            setattr(self, name, fields[name])
+
+    def to_dict(self, **extra) -> Dict:
+        """Fresh response dict (safe to enrich), plus any per-request `extra` fields."""
+        row = {name: getattr(self, name) for name in CARPARK_FIELDS}
+        row.update(extra)
+        return row
+
+    def __repr__(self) -> str:
+        return f'CarparkRecord({self.carpark_num!r}, {self.development!r})'
+
+
+class CarparkSnapshot:
+    """One immutable build of the carpark table. Treat `records` as read-only."""
+
+    def __init__(
+        self,
+        version: str,
+        source_key: Tuple,
+        records: List[CarparkRecord],
+        previous: Optional['CarparkSnapshot'] = None,
+    ):
+        self.version = version
+        self.source_key = source_key
+        self.records = records
+        self.built_at = time.time()
+
+        # Identity + position of every row; availability refreshes usually keep it
+        self.layout = tuple((r.carpark_num, r.northing, r.easting) for r in records)
+        if previous is not None and previous.layout == self.layout:
+            self.index = previous.index
+            self.positions = previous.positions
+        else:
+            # Carpark set changed (or first build) — rebuild the spatial and ID indexes
+            self.index = GridIndex([(n, e) for _, n, e in self.layout])
+            self.positions = {carpark_num: i for i, (carpark_num, _, _) in enumerate(self.layout)}
+
+        # Dynamic columns, aligned with `records` / index positions
+        self.lots = np.array(
+            [(r.car_lots, r.motorcycle_lots, r.heavy_vehicle_lots) for r in records], dtype=np.int64
+        ).reshape(-1, len(LOT_FIELDS))
+        self.car_lots = self.lots[:, 0]
+
+        # Encoded response fragments for this version, filled by response_service
+        self.fragment_cache: Dict = {}
+        # day_type -> cost-curve row per record, filled by ranking_service
+        self.cost_rows: Dict = {}
+
+        # Lot changes since the previous build (None for the first build)
+        self.delta = SnapshotDelta.between(previous, self) if previous is not None else None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, carpark_num: str) -> Optional[CarparkRecord]:
+        """The record for `carpark_num` (shared, read-only), or None."""
+        i = self.positions.get(carpark_num)
+        return None if i is None else self.records[i]
+
+
+class SnapshotDelta:
+    """Lot counts that changed from one snapshot version to the next."""
+
+    def __init__(
+        self,
+        from_version: str,
+        to_version: str,
+        changes: Dict[str, Tuple[int, ...]],
+        removed: Tuple[str, ...] = (),
+    ):
+        self.from_version = from_version
+        self.to_version = to_version
+        self.changes = changes  # carpark_num -> lots in LOT_FIELDS order
+        self.removed = removed
+
+    @classmethod
+    def between(cls, old: CarparkSnapshot, new: CarparkSnapshot) -> 'SnapshotDelta':
+        if old.layout == new.layout:
+            # Same rows in the same order — compare the lot columns directly
+            changed = np.flatnonzero((old.lots != new.lots).any(axis=1))
+            removed = ()
+        else:
+            old_positions = old.positions
+            changed = [
+                i for i, (carpark_num, _, _) in enumerate(new.layout)
+                if carpark_num not in old_positions
+                or (old.lots[old_positions[carpark_num]] != new.lots[i]).any()
+            ]
+            removed = tuple(c for c in old_positions if c not in new.positions)
+
+        rows = new.lots[changed].tolist()
+        changes = {new.layout[i][0]: tuple(r) for i, r in zip(np.asarray(changed).tolist(), rows)}
+        return cls(old.version, new.version, changes, removed)
+
+
+class SnapshotStore:
+    """Holds the current snapshot and rebuilds it when the source versions move."""
+
+    def __init__(self, history: int = CHANGE_HISTORY):
+        self._current: Optional[CarparkSnapshot] = None
+        self._checked_at = 0.0  # Monotonic time _current was built or last confirmed
+        self._lock = threading.Lock()  # Guards publishing; never held across a build
+        self._builds = SingleFlight()
+        self._deltas = deque(maxlen=history)
+        self._listeners: List[Callable[[CarparkSnapshot], None]] = []
+
+    @property
+    def current(self) -> Optional[CarparkSnapshot]:
+        return self._current
+
+    def get(
+        self,
+        source_key: Tuple,
+        builder: Callable[[], Tuple[Tuple, List[CarparkRecord]]],
+    ) -> CarparkSnapshot:
+        """
+        Return the current snapshot if it was built from `source_key`,
+        otherwise run `builder` (which fetches sources and returns the
+        post-fetch source key and carpark records) and publish the result.
+
+        One build runs at a time, outside the lock. Callers that arrive while
+        it runs get the previous snapshot, or wait for the build if there is
+        none yet.
+        """
+        snapshot = self._current
+        if self._is_fresh(snapshot, source_key):
+            return snapshot
+        if snapshot is not None and self._builds.in_flight(_BUILD_KEY):
+            return snapshot
+        return self._builds.do(_BUILD_KEY, self._rebuild, source_key, builder)
+
+    def _rebuild(self, source_key: Tuple, builder: Callable) -> CarparkSnapshot:
+        # The previous build may have finished between the caller's check and this one
+        previous = self._current
+        if self._is_fresh(previous, source_key):
+            return previous
+
+        built_key, records = builder()
+        snapshot = CarparkSnapshot(_make_version(built_key), built_key, records, previous=previous)
+        delta = snapshot.delta
+        if delta is not None and built_key == previous.source_key and not (delta.changes or delta.removed):
+            # A retry of an incomplete build found nothing new: keep the version clients hold
+            self._checked_at = time.monotonic()
+            return previous
+
+        with self._lock:
+            if delta is not None:
+                self._deltas.append(delta)
+            self._current = snapshot
+            self._checked_at = time.monotonic()
+            # Still under the lock, so listeners see publishes in order
+            for listener in self._listeners:
+                try:
+                    listener(snapshot)
+                except Exception:
+                    logger.exception('Snapshot listener failed')
+        return snapshot
+
+    def _is_fresh(self, snapshot: Optional[CarparkSnapshot], source_key: Tuple) -> bool:
+        if snapshot is None or snapshot.source_key != source_key:
+            return False
+        # Built without a feed that had no version: reuse it until that feed
+        # has one again (the key moves) or the retry is due
+        return None not in source_key or time.monotonic() - self._checked_at < INCOMPLETE_RETRY_SECONDS
+
+    def peek(self, source_key: Tuple) -> Optional[CarparkSnapshot]:
+        """The current snapshot if it was built from `source_key`, else None (no rebuild)."""
+        snapshot = self._current
+        return snapshot if self._is_fresh(snapshot, source_key) else None
+
+    def add_listener(self, listener: Callable[[CarparkSnapshot], None]) -> None:
+        """Call `listener(snapshot)` after every publish. It must be quick and non-blocking."""
+        self._listeners.append(listener)
+
+    def changes_since(
+        self, version: str
+    ) -> Optional[Tuple[CarparkSnapshot, Dict[str, Tuple[int, ...]], Tuple[str, ...]]]:
+        """
+        Merge the deltas from `version` up to the current snapshot.
+        Returns (snapshot, changes, removed), or None if `version` is unknown
+        to this worker (too old, or never seen) and the client must reload.
+        """
+        with self._lock:
+            snapshot = self._current
+            deltas = list(self._deltas)
+        if snapshot is None:
+            return None
+        if version == snapshot.version:
+            return snapshot, {}, ()
+
+        start = next((i for i, d in enumerate(deltas) if d.from_version == version), None)
+        if start is None:
+            return None
+
+        changes: Dict[str, Tuple[int, ...]] = {}
+        removed = set()
+        for delta in deltas[start:]:
+            for carpark_num in delta.removed:
+                changes.pop(carpark_num, None)
+                removed.add(carpark_num)
+            for carpark_num, lots in delta.changes.items():
+                changes[carpark_num] = lots  # Latest value wins
+                removed.discard(carpark_num)
+        return snapshot, changes, tuple(removed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._current = None
+            self._checked_at = 0.0
+            self._deltas.clear()
+
+
+def _make_version(source_key: Tuple) -> str:
+    """Derive a version id shared by every worker that sees the same source tokens."""
+    if None in source_key:
+        # A feed failed or its version expired — version is local to this build
+        return 'local-' + uuid.uuid4().hex[:8]
+    return hashlib.sha1('|'.join(source_key).encode()).hexdigest()[:12]
+
+
+# Singleton instance
+snapshot_store = SnapshotStore()
@@ -0,0 +1,162 @@
+"""
+Stream Service - Fans lot-count changes out to Server-Sent Events subscribers.
+
+The broker listens to snapshot publishes. Each publish carries a delta of the
+carparks whose lots changed, and subscribers register for specific carpark
+numbers, so a publish costs O(changes x interested subscribers) - the search
+pipeline never runs for a connected client.
+
+The broker lives in each worker process and there is no cross-process
+pub/sub: a client only hears about the snapshots its own worker publishes.
+Every worker rebuilds from the same shared source versions (the refresh
+scheduler ticks in every worker), so it does hear about every refresh, but
+up to a scheduler tick later than a client on the worker that refreshed.
+Version ids only match across workers while both feeds have a version.
+
+Under gunicorn's gthread worker each open stream holds one worker thread, so
+streams are capped per worker (MAX_STREAMS_PER_WORKER); over the cap the
+endpoint answers 503 with Retry-After and the rest of the threads stay free
+for ordinary requests.
+"""
+
+import json
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from app.services.snapshot_service import LOT_FIELDS, CarparkSnapshot, snapshot_store
+
+MAX_STREAM_IDS = 200
+HEARTBEAT_SECONDS = 15  # Keeps proxies from closing idle streams; detects disconnects
+STREAM_RETRY_AFTER_SECONDS = 30  # Suggested wait when this worker has no stream slot free
+
+
+class Subscription:
+    """One connected client: the carparks it watches and the changes not yet sent."""
+
+    def __init__(self, carpark_nums: Iterable[str]):
+        self.carpark_nums = frozenset(carpark_nums)
+        self.version: Optional[str] = None
+        self._pending: Dict[str, Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def push(self, version: str, carpark_num: str, lots: Tuple[int, ...]) -> None:
+        with self._lock:
+            self._pending[carpark_num] = lots  # Coalesce: a slow client only gets the latest
+            self.version = version
+        self._ready.set()
+
+    def wait(self, timeout: float) -> Tuple[Optional[str], Dict[str, Tuple[int, ...]]]:
+        """Block until changes arrive (or timeout); return (version, changes) and reset."""
+        self._ready.wait(timeout)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._ready.clear()
+            return self.version, pending
+
+
+class ChangeBroker:
+    """Index of subscriptions by carpark number, fed by snapshot publishes."""
+
+    def __init__(self):
+        self._by_carpark: Dict[str, Set[Subscription]] = {}
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, carpark_nums: Iterable[str], limit: Optional[int] = None) -> Optional[Subscription]:
+        """Register a subscription, or return None if `limit` subscriptions are already open."""
+        subscription = Subscription(carpark_nums)
+        with self._lock:
+            if limit is not None and len(self._subscriptions) >= limit:
+                return None
+            self._subscriptions.add(subscription)
+            for carpark_num in subscription.carpark_nums:
+                self._by_carpark.setdefault(carpark_num, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            for carpark_num in subscription.carpark_nums:
+                subscribers = self._by_carpark.get(carpark_num)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._by_carpark[carpark_num]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def publish(self, version: str, changes: Dict[str, Tuple[int, ...]]) -> int:
+        """Deliver changes to interested subscribers. Returns the number of deliveries."""
+        with self._lock:
+            if not self._by_carpark:
+                return 0
+            # Walk whichever side is smaller: changed carparks or watched carparks
+            if len(changes) <= len(self._by_carpark):
+                targets = [
+                    (carpark_num, lots, tuple(self._by_carpark[carpark_num]))
+                    for carpark_num, lots in changes.items()
+                    if carpark_num in self._by_carpark
+                ]
+            else:
+                targets = [
+                    (carpark_num, changes[carpark_num], tuple(subscribers))
+                    for carpark_num, subscribers in self._by_carpark.items()
+                    if carpark_num in changes
+                ]
+
+        deliveries = 0
+        for carpark_num, lots, subscribers in targets:
+            for subscription in subscribers:
+                subscription.push(version, carpark_num, lots)
+                deliveries += 1
+        return deliveries
+
+    def on_snapshot(self, snapshot: CarparkSnapshot) -> None:
+        if snapshot.delta is not None and snapshot.delta.changes:
+            self.publish(snapshot.version, snapshot.delta.changes)
+
+
+def current_lots(snapshot: CarparkSnapshot, carpark_nums: Iterable[str]) -> Dict[str, Tuple[int, ...]]:
+    """Lot counts of the given carparks in `snapshot` (unknown numbers are skipped)."""
+    positions = snapshot.positions
+    return {
+        carpark_num: tuple(snapshot.lots[positions[carpark_num]].tolist())
+        for carpark_num in carpark_nums
+        if carpark_num in positions
+    }
+
+
+def format_event(event: str, version: str, changes: Dict[str, Tuple[int, ...]]) -> str:
+    data = [
+        {'carpark_num': carpark_num, **dict(zip(LOT_FIELDS, lots))}
+        for carpark_num, lots in changes.items()
+    ]
+    return f"event: {event}\nid: {version}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(
+    broker: ChangeBroker, subscription: Subscription, snapshot: CarparkSnapshot
+) -> Iterator[str]:
+    """
+    SSE body: a `snapshot` event with the current lots, then a `lots` event per
+    publish that touched a watched carpark. Unsubscribes when the client goes away.
+    """
+    try:
+        yield format_event('snapshot', snapshot.version, current_lots(snapshot, subscription.carpark_nums))
+        while True:
+            version, changes = subscription.wait(HEARTBEAT_SECONDS)
+            if changes:
+                yield format_event('lots', version, changes)
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+# Singleton instance, fed by this worker's snapshot store
+change_broker = ChangeBroker()
+snapshot_store.add_listener(change_broker.on_snapshot)
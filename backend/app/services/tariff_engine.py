@@ -0,0 +1,602 @@
+"""
+Local tariff engine - parses published rate strings into structured tariff
+rules and evaluates parking costs in-process.
+
+Rate strings in carpark_rates.json are free text, e.g.
+"$1.07 for 1st hr; $0.27 for sub. 15mins" or "7am-6pm: $2.50 per ½ hr".
+Like the AI calculator, only the daytime window is evaluated. Strings the
+parser does not fully understand parse to None so callers can fall back to
+the AI path.
+
+At load time every parsed tariff is also evaluated over a duration grid
+(CostCurves), so costs are table lookups rather than tariff walks.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.services.pricing_service import pricing_service
+
+logger = logging.getLogger(__name__)
+
+DAY_TYPES = ('weekday', 'saturday', 'sunday')
+
+# "Assume daytime rates": evaluate the time window covering midday
+DAYTIME_REFERENCE_MIN = 12 * 60
+MINUTES_PER_DAY = 24 * 60
+
+# Durations precomputed for every tariff: 0.5h to 24h in 15-minute steps
+DURATION_GRID_START_H = 0.5
+DURATION_GRID_END_H = 24.0
+DURATION_GRID_STEP_H = 0.25
+# Off-grid durations (custom input) computed on demand and kept per duration
+MAX_EXTRA_DURATIONS = 32
+# Longest stay priced; longer ones are priced as this (far longer ones overflow float32)
+MAX_DURATION_H = 7 * 24.0
+
+_SAME_AS_WEEKDAY = {'same as wkdays', 'same as weekdays', 'same as wkday', 'same as weekday'}
+_SAME_AS_SATURDAY = {'same as saturday', 'same as sat'}
+_EMPTY_RATES = {'', '-'}
+
+
+def _resolve_rate(rate: Optional[str], pricing: Dict) -> str:
+    """Follow "Same as ..." references and treat '-' as no rate."""
+    rate = (rate or '').strip()
+    key = rate.lower().rstrip('.')
+    if key in _SAME_AS_WEEKDAY:
+        return _resolve_rate(pricing.get('weekday_rate'), pricing)
+    if key in _SAME_AS_SATURDAY:
+        return _resolve_rate(pricing.get('saturday_rate'), pricing)
+    return '' if rate in _EMPTY_RATES else rate
+
+
+def canonical_rate_string(rate_string: str) -> str:
+    """
+    Formatting-insensitive form of a rate string, used as the cost cache key:
+    case, dash variants, spacing and trailing full stops don't change a tariff.
+    """
+    text = rate_string.lower().replace('–', '-').replace('—', '-')
+    text = re.sub(r'\s*([;,|])\s*', r'\1 ', text)
+    text = re.sub(r'\s+:', ':', text)
+    text = re.sub(r'\s*-\s*', '-', text)
+    return re.sub(r'\s+', ' ', text).strip().rstrip('.').strip()
+
+
+def select_rate_string(pricing: Dict, day_type: str) -> Optional[str]:
+    """Select appropriate rate string based on day type."""
+    if day_type == "saturday":
+        return _resolve_rate(pricing.get("saturday_rate"), pricing) or _resolve_rate(pricing.get("weekday_rate"), pricing)
+    elif day_type == "sunday":
+        return _resolve_rate(pricing.get("sunday_rate"), pricing) or _resolve_rate(pricing.get("weekday_rate"), pricing)
+    else:
+        # Weekday - check if there's time-based variation
+        rate1 = _resolve_rate(pricing.get("weekday_rate"), pricing)
+        rate2 = _resolve_rate(pricing.get("weekday_rate_after_hours"), pricing)
+        if rate2:
+            return f"{rate1} | After hours: {rate2}"
+        return rate1
+
+
+class TariffTier(NamedTuple):
+    """Charge for minutes [start_min, end_min). block_min None = flat charge on entering the tier."""
+    start_min: int
+    end_min: Optional[int]
+    price: float
+    block_min: Optional[float]
+
+
+class Tariff:
+    """Ordered tiers covering a stay from minute 0, plus an optional 24h cap."""
+
+    __slots__ = ('tiers', 'cap', 'per_minute')
+
+    def __init__(self, tiers: List[TariffTier], cap: Optional[float] = None, per_minute: bool = False):
+        self.tiers = tuple(tiers)
+        self.cap = cap
+        self.per_minute = per_minute
+
+    def __repr__(self) -> str:
+        return f"Tariff(tiers={list(self.tiers)}, cap={self.cap}, per_minute={self.per_minute})"
+
+    def _charges(self, minutes: float) -> List[Tuple[TariffTier, float, float]]:
+        """(tier, units charged, amount) for each tier the stay reaches."""
+        charges = []
+        for tier in self.tiers:
+            if tier.start_min > 0 and minutes <= tier.start_min:
+                break
+            end = minutes if tier.end_min is None else min(minutes, tier.end_min)
+            if tier.block_min is None:
+                charges.append((tier, 1, tier.price))
+            elif self.per_minute:
+                units = end - tier.start_min
+                charges.append((tier, units, units * tier.price / tier.block_min))
+            else:
+                units = math.ceil((end - tier.start_min) / tier.block_min - 1e-9)
+                charges.append((tier, units, units * tier.price))
+        return charges
+
+    def cost(self, duration_hours: float) -> float:
+        minutes = round(duration_hours * 60, 6)
+        if self.cap is None or minutes <= MINUTES_PER_DAY:
+            total = sum(amount for _, _, amount in self._charges(minutes))
+            if self.cap is not None:
+                total = min(total, self.cap)
+        else:
+            # Cap applies per 24h
+            days, rest = divmod(minutes, MINUTES_PER_DAY)
+            day_cost = min(self.cap, sum(a for _, _, a in self._charges(MINUTES_PER_DAY)))
+            rest_cost = min(self.cap, sum(a for _, _, a in self._charges(rest))) if rest else 0.0
+            total = days * day_cost + rest_cost
+        return round(total + 1e-9, 2)
+
+    def breakdown(self, duration_hours: float) -> str:
+        minutes = round(duration_hours * 60, 6)
+        parts = []
+        for tier, units, amount in self._charges(min(minutes, MINUTES_PER_DAY)):
+            if tier.block_min is None:
+                if tier.end_min is None:
+                    parts.append(f"${amount:.2f} per entry" if amount else "Free")
+                else:
+                    label = _span_label(tier.end_min - tier.start_min)
+                    parts.append(f"First {label} ${amount:.2f}" if amount else f"First {label} free")
+            elif self.per_minute:
+                parts.append(f"{units:g} mins × {_money(tier.price)}/{_span_label(tier.block_min)} = ${amount:.2f}")
+            else:
+                parts.append(f"{units} × {_money(tier.price)} per {_span_label(tier.block_min)} = ${amount:.2f}")
+
+        text = " + ".join(parts)
+        total = self.cost(duration_hours)
+        if self.cap is not None and total < round(sum(a for _, _, a in self._charges(minutes)), 2):
+            text += f" (capped at ${self.cap:.2f} per day)"
+        return f"{text} → ${total:.2f} for {duration_hours:g} hrs"
+
+
+def _money(amount: float) -> str:
+    """$1.20, but keep sub-cent per-minute rates such as $0.035."""
+    text = f"{amount:.3f}"
+    return f"${text}" if not text.endswith('0') else f"${amount:.2f}"
+
+
+def _span_label(minutes: float) -> str:
+    if minutes == 1:
+        return "min"
+    if minutes == 30:
+        return "½ hr"
+    if minutes == 60:
+        return "hr"
+    if minutes % 60 == 0:
+        return f"{int(minutes // 60)} hrs"
+    return f"{minutes:g} mins"
+
+
+def clamp_duration(duration_hours: float) -> float:
+    """`duration_hours` capped at MAX_DURATION_H (callers reject non-finite values first)."""
+    return min(duration_hours, MAX_DURATION_H)
+
+
+class CostCurves:
+    """
+    Cost of each tariff at every grid duration: one float32 row per rate string.
+
+    Tariffs are step functions (per hour, per ½ hr, ...), so values between
+    grid points are not interpolated; an off-grid duration gets its own column,
+    evaluated exactly for every tariff once and then reused.
+    """
+
+    def __init__(self, tariffs: Dict[str, 'Tariff']):
+        self.rows: Dict[str, int] = {s: i for i, s in enumerate(tariffs)}
+        self._tariffs = list(tariffs.values())
+        self.durations = np.arange(
+            DURATION_GRID_START_H, DURATION_GRID_END_H + DURATION_GRID_STEP_H / 2, DURATION_GRID_STEP_H
+        )
+        self.costs = np.array(
+            [[t.cost(d) for d in self.durations.tolist()] for t in self._tariffs],
+            dtype=np.float32,
+        ).reshape(len(self._tariffs), len(self.durations))
+        self._extra: 'OrderedDict[float, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tariffs)
+
+    def column(self, duration_hours: float) -> np.ndarray:
+        """Costs of every tariff (indexed by row) for one duration (capped at MAX_DURATION_H)."""
+        if not math.isfinite(duration_hours):
+            raise ValueError(f'duration_hours must be finite, got {duration_hours!r}')
+        duration_hours = clamp_duration(duration_hours)
+        step = (duration_hours - DURATION_GRID_START_H) / DURATION_GRID_STEP_H
+        if 0 <= step < len(self.durations) and abs(step - round(step)) < 1e-9:
+            return self.costs[:, int(round(step))]
+
+        with self._lock:
+            column = self._extra.get(duration_hours)
+            if column is not None:
+                self._extra.move_to_end(duration_hours)
+                return column
+        column = np.array([t.cost(duration_hours) for t in self._tariffs], dtype=np.float32)
+        with self._lock:
+            self._extra[duration_hours] = column
+            while len(self._extra) > MAX_EXTRA_DURATIONS:
+                self._extra.popitem(last=False)
+        return column
+
+    def cost(self, rate_string: str, duration_hours: float) -> Optional[float]:
+        """Cost for one rate string, or None if it has no curve."""
+        row = self.rows.get(rate_string)
+        if row is None:
+            return None
+        return round(float(self.column(duration_hours)[row]), 2)
+
+
+# --- Parsing -------------------------------------------------------------------
+
+_PRICE = r'\$\s*(\d+(?:\.\d+)?)'
+_SPAN = r'(\d+(?:\.\d+)?\s*)?(half hr|hr|min)'
+_TIME = r'(?:(?<![\d.$])\d{4}(?!\d)|\d{1,2}(?:[.:]\d{2})?\s*(?:am|pm|mn)|12 midnight|midnight|noon)'
+
+_WINDOW_RE = re.compile(
+    rf'(?P<start>{_TIME})\s*(?:-|to)\s*(?P<end>{_TIME})'
+    rf'|(?:aft|after|from)\s+(?P<after>{_TIME})'
+    rf'|(?P<onwards>{_TIME})\s+onwards'
+)
+_TRAILING_AFTER_RE = re.compile(rf'(\$[^;,$]*?)\s+(?:aft|after)\s+({_TIME})(?=\s*(?:$|[;,.]))')
+_TRAILING_FREE_RE = re.compile(rf'\bfree\s*:?\s+({_TIME}\s*-\s*{_TIME})')
+
+_DAY_TOKENS_RE = re.compile(
+    r'\b(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun|ph|eve|weekends?|holidays?|'
+    r'monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b'
+)
+_UNSUPPORTED_RE = re.compile(
+    r'same as|closed|season|coupon|todo|not in use|valet|island|charged an additional|'
+    r'chargeable|per car|multiple entries|available at|surcharge|tenants'
+)
+
+_CAP_RES = (
+    re.compile(rf'capped at {_PRICE}(?: per 24 ?hr)?'),
+    re.compile(rf'max(?:imum)?\.?(?: per day| ?/ ?day)?:?\s*(?:of )?{_PRICE}(?: per (?:entry|day))?'),
+    re.compile(rf'per day {_PRICE}'),
+)
+_PER_MINUTE_RE = re.compile(r'per min (?:charging|basis)')
+
+_FREE_RE = re.compile(r'^free(?: parking)?$')
+_FREE_FIRST_RES = (
+    re.compile(rf'^free (?:for )?first {_SPAN}$'),
+    re.compile(rf'^first {_SPAN}:? free$'),
+)
+_FIRST_PRICE_RES = (
+    re.compile(rf'^{_PRICE} (?:for )?first {_SPAN}$'),
+    re.compile(rf'^first {_SPAN}:? {_PRICE}$'),
+    re.compile(rf'^first {_SPAN} at {_PRICE}$'),
+)
+_ORDINAL_RE = re.compile(
+    rf'^(\d+)(?:nd|rd|th) hr(?P<onwards> onwards)?:? {_PRICE}(?: per {_SPAN})?$'
+)
+_ENTRY_RE = re.compile(rf'^{_PRICE} (?:per entry|flat)$')
+_SUB_RES = (
+    re.compile(rf'^{_PRICE} (?:for |per )?sub {_SPAN}$'),
+    re.compile(rf'^sub {_SPAN} at {_PRICE}$'),
+    re.compile(rf'^sub {_PRICE} per {_SPAN}$'),
+)
+_RATE_RE = re.compile(
+    rf'^{_PRICE} (?:per|for) {_SPAN}'
+    rf'(?: (?:for )?first {_SPAN}(?P<first>)'
+    rf'| (?P<after>after|thereafter|onwards)'
+    rf'| (?:for )?sub(?: {_SPAN})?(?P<sub>))?$'
+)
+
+
+class _UnparsedRate(Exception):
+    pass
+
+
+def _span_minutes(count: Optional[str], unit: str) -> float:
+    n = float(count) if count else 1.0
+    if unit == 'hr':
+        return n * 60
+    if unit == 'half hr':
+        return n * 30
+    return n
+
+
+def _time_minutes(token: str) -> int:
+    token = token.strip()
+    if token in ('midnight', '12 midnight'):
+        return 0
+    if token == 'noon':
+        return 12 * 60
+    if re.fullmatch(r'\d{4}', token):
+        return (int(token[:2]) * 60 + int(token[2:])) % MINUTES_PER_DAY
+    m = re.fullmatch(r'(\d{1,2})(?:[.:](\d{2}))?\s*(am|pm|mn)', token)
+    hour, minute, suffix = int(m.group(1)) % 12, int(m.group(2) or 0), m.group(3)
+    if suffix == 'pm':
+        hour += 12
+    return hour * 60 + minute
+
+
+def _window_contains(start: int, end: int, minute: int) -> bool:
+    if start == end:
+        return True  # e.g. "0700-0700" — whole day
+    if start < end:
+        return start <= minute < end
+    return minute >= start or minute < end  # overnight window
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace('–', '-')
+    text = re.sub(r'(\d)\s*½', r'\1.5', text)
+    text = re.sub(r'½|(?<![\d.])1/2(?!\d)', ' half ', text)
+    text = re.sub(r'\*.*$', '', text)  # footnotes
+    text = re.sub(r'half[ -]an?[ -]hour|half[ -]hour', 'half hr', text)
+    text = re.sub(r'(?<![a-z])(?:hours?|hrs?)(?![a-z])', 'hr', text)
+    text = re.sub(r'(?<![a-z])(?:minutes?|mins?)(?![a-z])', 'min', text)
+    text = re.sub(r'(\d)\s*-\s*hr', r'\1 hr', text)
+    text = re.sub(r'\b(?:next )?sub(?:se?qu?e?nt(?:ly)?)?\b\.?', 'sub ', text)
+    text = re.sub(r'\b1st\b', 'first', text)
+    text = re.sub(r'daily\s*\(([^)]*)\)', r'\1', text)
+    # Notes in brackets, except caps and per-minute charging which change the price
+    text = re.sub(r'\(([^)]*)\)', lambda m: m.group(0) if re.search(r'cap|max|per min', m.group(1)) else ' ', text)
+    text = re.sub(r'\b(?:(?:the )?(?:next|following) day|daily|all day|weekdays|wkdays|or part thereof|the|block)\b', '', text)
+    text = re.sub(r'\bfor for\b', 'for', text)
+    text = re.sub(r'12\s*(?:mn|midnight)\b', '12mn', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _split_segments(text: str) -> List[Tuple[Optional[Tuple[int, int]], str]]:
+    """Split into (window, body) pairs; window None means no time qualifier."""
+    text = _TRAILING_AFTER_RE.sub(r'after \2: \1', text)
+    text = _TRAILING_FREE_RE.sub(r'\1: free', text)
+    segments = []
+    last_end, window = 0, None
+    for m in _WINDOW_RE.finditer(text):
+        segments.append((window, text[last_end:m.start()]))
+        if m.group('after') or m.group('onwards'):
+            window = (_time_minutes(m.group('after') or m.group('onwards')), MINUTES_PER_DAY)
+        else:
+            window = (_time_minutes(m.group('start')), _time_minutes(m.group('end')))
+        last_end = m.end()
+    segments.append((window, text[last_end:]))
+    return [(w, body) for w, body in segments if w is not None or re.search(r'[a-z$]', body)]
+
+
+def _split_clauses(body: str) -> List[str]:
+    parts = re.split(r';|,| and |\.(?=\s|$)', body)
+    clauses = []
+    for part in parts:
+        part = re.sub(r'\s*/\s*', ' per ', part)
+        part = re.sub(r'\bper per\b', 'per', part)
+        part = part.strip(" :-.()\t")
+        part = re.sub(r'\s+', ' ', part)
+        if part:
+            clauses.append(part)
+    return clauses
+
+
+class _TierBuilder:
+    def __init__(self):
+        self.tiers: List[TariffTier] = []
+        self.cursor = 0.0
+        self.open_ended = False
+
+    def bounded(self, length: float, price: float, block: Optional[float]):
+        if self.open_ended:
+            raise _UnparsedRate('bounded tier after open-ended tier')
+        self.tiers.append(TariffTier(self.cursor, self.cursor + length, price, block))
+        self.cursor += length
+
+    def open(self, price: float, block: Optional[float]):
+        if self.open_ended:
+            raise _UnparsedRate('two open-ended tiers')
+        self.tiers.append(TariffTier(self.cursor, None, price, block))
+        self.open_ended = True
+
+    def first_block_from_open_rate(self):
+        """"$2.57 per hr; $1.28 for sub ½ hr" — the leading rate is really a first block."""
+        if len(self.tiers) != 1 or not self.open_ended or self.tiers[0].block_min is None:
+            raise _UnparsedRate('subsequent rate without a first block')
+        first = self.tiers.pop()
+        self.open_ended = False
+        self.cursor = 0.0
+        self.bounded(first.block_min, first.price, None)
+
+
+def _parse_clause(clause: str, builder: _TierBuilder):
+    if _FREE_RE.match(clause):
+        if builder.tiers:
+            raise _UnparsedRate(clause)
+        builder.open(0.0, None)
+        return
+
+    for regex in _FREE_FIRST_RES:
+        m = regex.match(clause)
+        if m:
+            if builder.tiers:
+                raise _UnparsedRate(clause)
+            builder.bounded(_span_minutes(*m.groups()), 0.0, None)
+            return
+
+    for i, regex in enumerate(_FIRST_PRICE_RES):
+        m = regex.match(clause)
+        if m:
+            if builder.tiers:
+                raise _UnparsedRate(clause)
+            if i == 0:
+                price, count, unit = m.groups()
+            else:
+                count, unit, price = m.groups()
+            builder.bounded(_span_minutes(count, unit), float(price), None)
+            return
+
+    m = _ORDINAL_RE.match(clause)
+    if m:
+        ordinal, _, price, count, unit = m.groups()
+        if (int(ordinal) - 1) * 60 != builder.cursor:
+            raise _UnparsedRate(clause)
+        block = _span_minutes(count, unit) if unit else None
+        if m.group('onwards'):
+            builder.open(float(price), block or 60)
+        else:
+            builder.bounded(60, float(price), block)
+        return
+
+    m = _ENTRY_RE.match(clause)
+    if m:
+        if builder.tiers:
+            raise _UnparsedRate(clause)
+        builder.open(float(m.group(1)), None)
+        return
+
+    for i, regex in enumerate(_SUB_RES):
+        m = regex.match(clause)
+        if m:
+            if i == 1:
+                count, unit, price = m.groups()
+            else:
+                price, count, unit = m.groups()
+            if builder.cursor == 0:
+                builder.first_block_from_open_rate()
+            builder.open(float(price), _span_minutes(count, unit))
+            return
+
+    m = _RATE_RE.match(clause)
+    if m:
+        price, count, unit = float(m.group(1)), m.group(2), m.group(3)
+        block = _span_minutes(count, unit)
+        if m.group('first') is not None:
+            if builder.tiers:
+                raise _UnparsedRate(clause)
+            builder.bounded(_span_minutes(m.group(4), m.group(5)), price, block)
+        elif m.group('after'):
+            if builder.cursor == 0:
+                raise _UnparsedRate(clause)
+            builder.open(price, block)
+        elif m.group('sub') is not None:
+            if builder.cursor == 0:
+                builder.first_block_from_open_rate()
+            sub_span = _span_minutes(m.group(6), m.group(7)) if m.group(7) else block
+            if sub_span == block:
+                builder.open(price, block)
+            else:
+                builder.bounded(sub_span, price, block)
+        else:
+            # Plain rate: opening rate, or the rate after a first block
+            builder.open(price, block)
+        return
+
+    raise _UnparsedRate(clause)
+
+
+def parse_rate_string(rate_string: str) -> Optional[Tariff]:
+    """Parse the daytime tariff out of a rate string, or None if not fully understood."""
+    if not rate_string:
+        return None
+
+    # Daytime assumption: ignore the weekday after-hours part
+    text = re.split(r'\|\s*after hours:', rate_string, flags=re.IGNORECASE)[0]
+    text = _normalize(text)
+    if not text or _DAY_TOKENS_RE.search(text) or _UNSUPPORTED_RE.search(text):
+        return None
+
+    # A per-minute note covers the whole tariff, even when it trails a later time segment
+    per_minute = bool(_PER_MINUTE_RE.search(text))
+
+    try:
+        segments = _split_segments(text)
+        # Prefer an explicit range covering midday, then an open "after X" window, then no window
+        for accept in (
+            lambda w: w is not None and w[1] != MINUTES_PER_DAY,
+            lambda w: w is not None and w[1] == MINUTES_PER_DAY,
+            lambda w: w is None,
+        ):
+            daytime = [
+                body for w, body in segments
+                if accept(w) and (w is None or _window_contains(*w, DAYTIME_REFERENCE_MIN))
+            ]
+            if daytime:
+                break
+        if len(daytime) != 1:
+            return None
+        body = daytime[0]
+
+        cap = None
+        for regex in _CAP_RES:
+            m = regex.search(body)
+            if m:
+                cap = float(m.group(1))
+                body = body[:m.start()] + body[m.end():]
+                break
+        body = re.sub(r'\([^)]*\)', '', body)
+
+        builder = _TierBuilder()
+        for clause in _split_clauses(body):
+            _parse_clause(clause, builder)
+        if not builder.open_ended:
+            return None
+        return Tariff(builder.tiers, cap=cap, per_minute=per_minute)
+    except _UnparsedRate:
+        return None
+
+
+class TariffEngine:
+    """Parsed tariffs for every rate string in carpark_rates.json, built at load time."""
+
+    def __init__(self):
+        self._tariffs: Dict[str, Optional[Tariff]] = {}
+        self._load_tariffs()
+        self.curves = CostCurves({s: t for s, t in self._tariffs.items() if t is not None})
+
+    def _load_tariffs(self):
+        for pricing in pricing_service.pricing_data.values():
+            for day_type in DAY_TYPES:
+                self.get_tariff(select_rate_string(pricing, day_type) or '')
+        logger.info("Tariff engine: %s", self.coverage())
+
+    def get_tariff(self, rate_string: str) -> Optional[Tariff]:
+        try:
+            return self._tariffs[rate_string]
+        except KeyError:
+            tariff = parse_rate_string(rate_string)
+            self._tariffs[rate_string] = tariff
+            return tariff
+
+    def calculate(self, rate_string: str, duration_hours: float) -> Optional[Dict]:
+        """Cost result in the calculator's result format, or None if the rate isn't parseable."""
+        tariff = self.get_tariff(rate_string)
+        if tariff is None:
+            return None
+        cost = self.curves.cost(rate_string, duration_hours)
+        return {
+            "calculated_cost": tariff.cost(duration_hours) if cost is None else cost,
+            "cost_breakdown": _breakdown(tariff, duration_hours),
+            "ai_explanation": None,
+            "ai_confidence": "high",
+        }
+
+    def coverage(self) -> Dict:
+        """Parse coverage over the distinct rate strings seen so far."""
+        rate_strings = [s for s in self._tariffs if s]
+        parsed = sum(1 for s in rate_strings if self._tariffs[s] is not None)
+        return {
+            "distinct_rate_strings": len(rate_strings),
+            "parsed": parsed,
+            "unparsed": len(rate_strings) - parsed,
+            "coverage": round(parsed / len(rate_strings), 3) if rate_strings else 0.0,
+        }
+
+    def unparsed_rate_strings(self) -> List[str]:
+        return sorted(s for s, t in self._tariffs.items() if s and t is None)
+
+
+@lru_cache(maxsize=4096)
+def _breakdown(tariff: Tariff, duration_hours: float) -> str:
+    return tariff.breakdown(duration_hours)
+
+
+# Singleton instance
+tariff_engine = TariffEngine()
@@ -0,0 +1,134 @@
+"""
+Upstream Client - Pooled, retrying HTTP sessions shared by every upstream call.
+
+One requests.Session per upstream (LTA DataMall, data.gov.sg, Google Maps)
+keeps TLS connections alive between calls, so refreshes and geocoding misses
+don't pay a handshake each time. The feed sessions (background refreshes)
+retry idempotent GETs on connection errors and 429/5xx with exponential
+backoff; Google, which a request waits on, gets one try under a total
+deadline instead. Every call's latency is recorded per upstream for /health.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.timeout import Timeout
+
+from app.constants import REQUEST_TIMEOUT
+
+CONNECT_TIMEOUT = 3.05  # Slightly above a TCP retransmit window
+
+# upstream -> (read timeout seconds, retries, total deadline seconds or None)
+UPSTREAMS: Dict[str, Tuple[float, int, Optional[float]]] = {
+    'lta': (REQUEST_TIMEOUT, 2, None),
+    'data_gov': (REQUEST_TIMEOUT, 2, None),
+    # On the request path for geocoding misses: one try, 5 s end to end
+    'google': (5, 0, 5),
+}
+
+POOL_MAXSIZE = 16  # Concurrent connections kept per host
+LATENCY_SAMPLES = 200
+
+
+def _make_adapter(retries: int) -> HTTPAdapter:
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # Hand the last response back to the caller
+    )
+    return HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+
+
+class UpstreamStats:
+    """Recent call latencies and error count for one upstream."""
+
+    def __init__(self):
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+        self.calls = 0
+        self.errors = 0
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {'calls': self.calls, 'errors': self.errors, 'p50_ms': None, 'p95_ms': None}
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1),
+            'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        }
+
+
+class UpstreamClient:
+    """Per-upstream sessions, timeouts and latency stats."""
+
+    def __init__(self):
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, UpstreamStats] = {name: UpstreamStats() for name in UPSTREAMS}
+        self._lock = threading.Lock()
+
+    def session(self, upstream: str) -> requests.Session:
+        session = self._sessions.get(upstream)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(upstream)
+                if session is None:
+                    session = requests.Session()
+                    self.mount(session, upstream)
+                    self._sessions[upstream] = session
+        return session
+
+    def mount(self, session: requests.Session, upstream: str) -> requests.Session:
+        """Give an existing session (e.g. an SDK's) this upstream's pooling and retries."""
+        adapter = _make_adapter(UPSTREAMS[upstream][1])
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def timeout(self, upstream: str):
+        """(connect, read) timeouts, or a Timeout bounded in total for upstreams with a deadline."""
+        read, _, deadline = UPSTREAMS[upstream]
+        if deadline is not None:
+            return Timeout(total=deadline, connect=CONNECT_TIMEOUT, read=read)
+        return CONNECT_TIMEOUT, read
+
+    def deadline(self, upstream: str) -> Optional[float]:
+        """Total seconds a call to `upstream` may take, retries included (None: per-try timeouts only)."""
+        return UPSTREAMS[upstream][2]
+
+    @contextmanager
+    def timed(self, upstream: str) -> Iterator[None]:
+        """Record the latency (and failure) of one logical call, retries included."""
+        stats = self._stats[upstream]
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.calls += 1
+            stats.samples.append(time.perf_counter() - start)
+
+    def get(self, upstream: str, url: str, timeout=None, **kwargs) -> requests.Response:
+        with self.timed(upstream):
+            return self.session(upstream).get(url, timeout=timeout or self.timeout(upstream), **kwargs)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: stats.summary() for name, stats in self._stats.items()}
+
+
+# Singleton instance
+upstream_client = UpstreamClient()
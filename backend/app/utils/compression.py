@@ -0,0 +1,118 @@
+"""
+Response compression with content negotiation and a cache of compressed bodies.
+
+Bodies are cached under the response's ETag (snapshot version + normalized
+query) and encoding, so a hot search is compressed once per refresh rather than
+once per request. A digest of the body guards each entry, in case the same
+ETag ever produces a different body (e.g. an AI cost that failed earlier).
+
+Brotli is used when the `brotli` package is installed, gzip otherwise.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024  # Smaller bodies aren't worth the CPU or the header
+CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# Cached bodies are reused until the next refresh, so spend CPU on ratio
+_ENCODERS: Dict[str, Callable[[bytes], bytes]] = {
+    'gzip': lambda body: gzip.compress(body, compresslevel=9, mtime=0),
+}
+if brotli is not None:
+    _ENCODERS['br'] = lambda body: brotli.compress(body, quality=9)
+
+# Server preference when the client accepts several equally
+_PREFERENCE = [e for e in ('br', 'gzip') if e in _ENCODERS]
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies, bounded by total compressed size."""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[bytes, bytes]]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str], digest: bytes) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != digest:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[str, str], digest: bytes, compressed: bytes) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (digest, compressed)
+            self._size += len(compressed)
+            while self._size > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+compressed_bodies = CompressedBodyCache()
+
+
+def negotiate_encoding(req=None) -> Optional[str]:
+    """Best encoding the client accepts (honouring q-values), or None for identity."""
+    best = (request if req is None else req).accept_encodings.best_match(_PREFERENCE)
+    return best if best in _ENCODERS else None
+
+
+def compress_body(body: bytes, encoding: Optional[str], cache_key: Optional[str] = None) -> Optional[bytes]:
+    """`body` compressed with `encoding`, or None if it should go out as is."""
+    if encoding is None or len(body) < MIN_COMPRESS_BYTES:
+        return None
+
+    compressed = None
+    if cache_key is not None:
+        digest = hashlib.sha1(body).digest()
+        compressed = compressed_bodies.get((cache_key, encoding), digest)
+    if compressed is None:
+        compressed = _ENCODERS[encoding](body)
+        if cache_key is not None:
+            compressed_bodies.put((cache_key, encoding), digest, compressed)
+    return compressed
+
+
+def compress_response(response: Response, cache_key: Optional[str] = None) -> Response:
+    """
+    Compress `response` for this request's Accept-Encoding. With a `cache_key`
+    (normally the ETag), the compressed body is cached and reused.
+    """
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+
+    encoding = negotiate_encoding()
+    compressed = compress_body(response.get_data(), encoding, cache_key)
+    if compressed is None:
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,67 @@
+"""
+HTTP caching helpers: ETags from a data version plus the normalized query,
+early 304 answers for If-None-Match, and Cache-Control headers. Responses
+with degraded data (a failed cost calculation) go out with no_store instead,
+so they never hold an ETag that a later 304 would vouch for.
+
+Helpers read Flask's `request` unless given another werkzeug-style request
+(the async app passes Quart's).
+"""
+
+import hashlib
+from typing import Iterable, Optional
+
+from flask import Response, request
+
+# Query params compared as numbers, so "1.30" and "1.3" share an ETag
+NUMERIC_PARAMS = ('lat', 'lng', 'radius', 'duration')
+
+
+def normalized_query(exclude: Iterable[str] = (), req=None) -> str:
+    """Canonical form of the request's query string (sorted, trimmed, case-folded search)."""
+    args = (request if req is None else req).args
+    items = []
+    for key in sorted(set(args) - set(exclude)):
+        for value in args.getlist(key):
+            value = value.strip()
+            if key == 'search':
+                value = ' '.join(value.lower().split())
+            elif key in NUMERIC_PARAMS:
+                try:
+                    value = repr(float(value))
+                except ValueError:
+                    pass
+            items.append(f'{key}={value}')
+    return '&'.join(items)
+
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()[:20]
+
+
+def not_modified(etag: str, max_age: Optional[int] = None, req=None, response_class=Response):
+    """A 304 response if the client already holds `etag`, else None."""
+    if not (request if req is None else req).if_none_match.contains_weak(etag):
+        return None
+    return with_cache_headers(response_class(status=304), etag, max_age)
+
+
+def with_cache_headers(response, etag: str, max_age: Optional[int] = None):
+    """
+    Weak ETag (the body varies by Content-Encoding, the data doesn't) and
+    Cache-Control. max_age None means "store, but revalidate every time".
+    """
+    response.set_etag(etag, weak=True)
+    response.cache_control.public = True
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = max_age
+    return response
+
+
+def without_caching(response):
+    """Cache-Control: no-store and no ETag, for a response that must not be reused."""
+    response.headers.pop('ETag', None)
+    response.cache_control.no_store = True
+    return response
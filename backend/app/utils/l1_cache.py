@@ -0,0 +1,249 @@
+"""
+Two-level cache backend: an in-process L1 in front of Redis.
+
+Values that serialize to at least `l1_min_bytes` (the LTA feed, HDB
+availability) are written to Redis together with a small version token under
+a sibling key, in one MULTI. A worker keeps the deserialized value in L1; later
+reads fetch only the token and, while it still matches, serve the L1 copy, so
+the large value is transferred and unpickled once per change instead of once
+per read. A write from any worker replaces the token, and every other worker
+drops its copy on its next read. Smaller values skip L1 and cost the same
+single round trip as with RedisCache.
+
+Values served from L1 are shared between requests, so treat cached values as
+read-only (the app's already are).
+
+Enable with CACHE_TYPE = 'app.utils.l1_cache.L1RedisCache' and
+  CACHE_L1_MAX_BYTES: bound on L1, in serialized bytes of the values held
+  CACHE_L1_POLICY:    eviction policy: 'lru', 'lfu' or 'fifo'
+  CACHE_L1_MIN_BYTES: smallest value worth holding in L1
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from flask_caching.backends.rediscache import RedisCache
+
+EVICTION_POLICIES = ('lru', 'lfu', 'fifo')
+
+_VERSION_SUFFIX = ':l1v'
+
+
+class _Entry:
+    __slots__ = ('token', 'value', 'size', 'hits')
+
+    def __init__(self, token: bytes, value: Any, size: int):
+        self.token = token
+        self.value = value
+        self.size = size
+        self.hits = 0
+
+
+class L1Store:
+    """Size-bounded map of key -> (version token, value) with a pluggable eviction policy."""
+
+    def __init__(self, max_bytes: int, policy: str = 'lru'):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"L1 eviction policy must be one of: {', '.join(EVICTION_POLICIES)}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0  # Reads answered from L1 after a token check
+        self.loads = 0  # Values (re)loaded from Redis into L1
+        self.evictions = 0
+
+    def token(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else entry.token
+
+    def hit(self, key: str, token: bytes) -> Optional[_Entry]:
+        """The entry for `key` if it is still at version `token`, counting the hit."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.token != token:
+                return None
+            entry.hits += 1
+            if self.policy == 'lru':
+                self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, token: bytes, value: Any, size: int) -> None:
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = _Entry(token, value, size)
+            self._size += size
+            self.loads += 1
+            while self._size > self.max_bytes:
+                self._remove(self._victim(key))
+                self.evictions += 1
+
+    def discard(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
+
+    def _victim(self, new_key: str) -> str:
+        """Entry to evict to make room for `new_key` (which fits alone, so others remain)."""
+        if self.policy == 'lfu':
+            # Linear scan (L1 only holds large values, so there are few entries); ties go to the oldest
+            return min((k for k in self._entries if k != new_key), key=lambda k: self._entries[k].hits)
+        return next(iter(self._entries))  # lru: least recently used; fifo: oldest
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+class L1RedisCache(RedisCache):
+    """RedisCache whose large values are held in process and revalidated by version token."""
+
+    def __init__(
+        self,
+        *args,
+        l1_max_bytes: int = 64 * 1024 * 1024,
+        l1_policy: str = 'lru',
+        l1_min_bytes: int = 8 * 1024,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.l1 = L1Store(l1_max_bytes, l1_policy)
+        self.l1_min_bytes = l1_min_bytes
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            l1_max_bytes=config.get('CACHE_L1_MAX_BYTES', 64 * 1024 * 1024),
+            l1_policy=config.get('CACHE_L1_POLICY', 'lru'),
+            l1_min_bytes=config.get('CACHE_L1_MIN_BYTES', 8 * 1024),
+        )
+        return super().factory(app, config, args, kwargs)
+
+    def _name(self, key: str) -> str:
+        return self.key_prefix + key
+
+    def _version_name(self, key: str) -> str:
+        return self.key_prefix + key + _VERSION_SUFFIX
+
+    def get(self, key: str) -> Any:
+        return self.get_many(key)[0]
+
+    def get_many(self, *keys: str) -> List[Any]:
+        # One MGET: just the token for keys held in L1, token and value for the rest
+        held = {key: self.l1.token(key) for key in keys}
+        names = []
+        for key in keys:
+            names.append(self._version_name(key))
+            if held[key] is None:
+                names.append(self._name(key))
+        replies = iter(self._read_client.mget(names))
+
+        values: Dict[str, Any] = {}
+        stale = []
+        for key in keys:
+            token = next(replies)
+            if held[key] is None:
+                values[key] = self._load(key, token, next(replies))
+                continue
+            entry = self.l1.hit(key, token) if token is not None else None
+            if entry is not None:
+                values[key] = entry.value
+            else:
+                stale.append(key)
+
+        if stale:
+            # Changed or expired since L1 loaded it: fetch token and value together
+            names = [name for key in stale for name in (self._version_name(key), self._name(key))]
+            replies = iter(self._read_client.mget(names))
+            for key in stale:
+                values[key] = self._load(key, next(replies), next(replies))
+        return [values[key] for key in keys]
+
+    def _load(self, key: str, token: Optional[bytes], raw: Optional[bytes]) -> Any:
+        value = self.serializer.loads(raw)
+        if token is not None and raw is not None:
+            self.l1.put(key, token, value, len(raw))
+        else:
+            self.l1.discard(key)
+        return value
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        timeout = self._normalize_timeout(timeout)
+        dump = self.serializer.dumps(value)
+        token = uuid.uuid4().hex[:12].encode() if len(dump) >= self.l1_min_bytes else None
+
+        # MULTI, so a reader's MGET never pairs a new token with the old value
+        pipe = self._write_client.pipeline(transaction=True)
+        self._pipe_set(pipe, self._name(key), dump, timeout)
+        if token is not None:
+            self._pipe_set(pipe, self._version_name(key), token, timeout)
+        else:
+            pipe.delete(self._version_name(key))
+        result = pipe.execute()[0]
+
+        if token is not None:
+            self.l1.put(key, token, value, len(dump))
+        else:
+            self.l1.discard(key)
+        return result
+
+    @staticmethod
+    def _pipe_set(pipe, name: str, dump: bytes, timeout: int) -> None:
+        if timeout == -1:
+            pipe.set(name=name, value=dump)
+        else:
+            pipe.setex(name=name, value=dump, time=timeout)
+
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> List[Any]:
+        return [key for key, value in mapping.items() if self.set(key, value, timeout)]
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        created = super().add(key, value, timeout)
+        if created:
+            # A leftover token would vouch for other workers' copies of an older value
+            self._write_client.delete(self._version_name(key))
+            self.l1.discard(key)
+        return created
+
+    def delete(self, key: str) -> bool:
+        self.l1.discard(key)
+        return bool(self._write_client.delete(self._name(key), self._version_name(key)))
+
+    def delete_many(self, *keys: str) -> List[Any]:
+        if not keys:
+            return []
+        self.l1.discard(*keys)
+        self._write_client.delete(*[n for key in keys for n in (self._name(key), self._version_name(key))])
+        return [key for key in keys if not self.has(key)]
+
+    def clear(self) -> bool:
+        self.l1.clear()
+        return super().clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.l1.stats()
@@ -0,0 +1,139 @@
+"""
+Request coalescing ("singleflight"): at most one in-flight call per key in this
+process. Callers that arrive while a call is running wait for it and share its
+result (or its exception) instead of starting their own.
+
+Place @singleflight *under* @cache.memoize, so cache hits never touch it and
+only the concurrent misses are coalesced:
+
+    @cache.memoize(timeout=...)
+    @singleflight
+    def fetch(...): ...
+
+async_singleflight does the same for coroutines sharing one event loop.
+"""
+
+import asyncio
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Per-key deduplication of concurrent calls."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0  # Calls that ran
+        self.shared = 0  # Calls answered by another caller's result
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the key before waking waiters; the next miss starts a new call
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call for `key` is running now."""
+        with self._lock:
+            return key in self._calls
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'executed': self.executed, 'shared': self.shared, 'in_flight': len(self._calls)}
+
+
+flights = SingleFlight()
+
+
+def singleflight(fn: Callable) -> Callable:
+    """Coalesce concurrent calls to `fn` with equal arguments (which must be hashable)."""
+    name = f'{fn.__module__}.{fn.__qualname__}'
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        return flights.do(key, fn, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop (no locking needed)."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        call = self._calls.get(key)
+        if call is not None:
+            self.shared += 1
+            # Shielded, so a cancelled waiter doesn't cancel the shared call
+            return await asyncio.shield(call)
+
+        call = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.executed += 1
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            call.exception()  # Retrieved here, so an unwaited failure isn't logged twice
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call for `key` is running now."""
+        return key in self._calls
+
+
+async_flights = AsyncSingleFlight()
+
+
+def async_singleflight(fn: Callable) -> Callable:
+    """Coalesce concurrent awaits of coroutine function `fn` with equal arguments."""
+    name = f'{fn.__module__}.{fn.__qualname__}'
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        return await async_flights.do(key, fn, *args, **kwargs)
+
+    return wrapper
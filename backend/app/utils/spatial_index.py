@@ -0,0 +1,90 @@
+"""
+Uniform grid index over SVY21 (northing, easting) points.
+
+SVY21 coordinates are planar metres, so a fixed-size square grid is enough:
+a radius query only gathers the cells overlapping the query's bounding square,
+then measures, masks and orders those candidates as NumPy column operations.
+"""
+
+from math import floor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_CELL_SIZE_M = 500.0
+
+_EMPTY_POSITIONS = np.empty(0, dtype=np.int64)
+
+
+class GridIndex:
+    """Static grid of point positions; rebuild it when the point set changes."""
+
+    def __init__(self, points: Sequence[Tuple[float, float]], cell_size_m: float = DEFAULT_CELL_SIZE_M):
+        self.cell_size_m = cell_size_m
+
+        # Columnar coordinates, position i == row i of the source list
+        coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.northings = coords[:, 0].copy()
+        self.eastings = coords[:, 1].copy()
+
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        for i, (n, e) in enumerate(zip(self.northings.tolist(), self.eastings.tolist())):
+            buckets.setdefault(self._cell(n, e), []).append(i)
+        self._cells = {cell: np.array(p, dtype=np.int64) for cell, p in buckets.items()}
+
+        # Occupied cell range, so very large radii don't walk empty cells
+        if self._cells:
+            self._min_cell = tuple(min(c[k] for c in self._cells) for k in (0, 1))
+            self._max_cell = tuple(max(c[k] for c in self._cells) for k in (0, 1))
+
+    def __len__(self) -> int:
+        return len(self.northings)
+
+    def _cell(self, northing: float, easting: float) -> Tuple[int, int]:
+        return floor(northing / self.cell_size_m), floor(easting / self.cell_size_m)
+
+    def distances_km(
+        self, northing: float, easting: float, positions: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Distance in km from the centre to each position (all points if positions is None)."""
+        if positions is None:
+            dn = self.northings - northing
+            de = self.eastings - easting
+        else:
+            dn = self.northings[positions] - northing
+            de = self.eastings[positions] - easting
+        # Same formula as svy21_distance_km, applied column-wise
+        return np.sqrt(dn ** 2 + de ** 2) / 1000
+
+    def query_radius(
+        self, northing: float, easting: float, radius_m: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (positions, distances_km) for every point within radius_m of the centre,
+        ordered by distance (ties keep position order).
+        """
+        if radius_m < 0 or not self._cells:
+            return _EMPTY_POSITIONS, np.empty(0)
+
+        min_n, min_e = self._cell(northing - radius_m, easting - radius_m)
+        max_n, max_e = self._cell(northing + radius_m, easting + radius_m)
+        min_n, min_e = max(min_n, self._min_cell[0]), max(min_e, self._min_cell[1])
+        max_n, max_e = min(max_n, self._max_cell[0]), min(max_e, self._max_cell[1])
+
+        cells = self._cells
+        parts = [
+            cells[(cn, ce)]
+            for cn in range(min_n, max_n + 1)
+            for ce in range(min_e, max_e + 1)
+            if (cn, ce) in cells
+        ]
+        if not parts:
+            return _EMPTY_POSITIONS, np.empty(0)
+
+        candidates = np.concatenate(parts)
+        distances = self.distances_km(northing, easting, candidates)
+        mask = distances * 1000 <= radius_m
+        candidates, distances = candidates[mask], distances[mask]
+
+        order = np.lexsort((candidates, distances))
+        return candidates[order], distances[order]
@@ -0,0 +1,4 @@
+from app.async_app import create_async_app
+
+# Async mode: uvicorn asgi:app (the sync app is run:app under gunicorn)
+app = create_async_app()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Load comparison of the two serving modes under slow upstreams. Every request
+is a /carparks search for a term nobody has searched before, so each one
+waits on Google (stubbed, UPSTREAM_SECONDS per call).
+
+  sync:  the Flask app on a 32-thread pool, like one gunicorn gthread worker
+         (Procfile: --worker-class gthread --threads 32)
+  async: the Quart app (app.async_app) on one uvicorn event loop
+
+Both servers run in this process and the load generator in a child process,
+all on localhost; absolute numbers depend on the machine, the ratio is what
+matters.
+No API keys or network needed.
+Run from the backend/ directory:
+    python3 scripts/bench_async_vs_sync.py [--latency 0.5] [--levels 50,200,1000]
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['BACKGROUND_REFRESH'] = 'False'
+os.environ['REDIS_URL'] = ''
+os.environ.setdefault('GOOGLE_MAPS_API_KEY', 'bench')
+
+import httpx
+import uvicorn
+from werkzeug.serving import BaseWSGIServer
+
+from app import create_app
+from app.async_app import create_async_app
+from app.services import carpark_service, hdb_service
+from app.services.async_upstream import async_upstream_client
+from app.services.upstream_client import upstream_client
+
+SYNC_THREADS = 32
+CENTRE = (1.3000, 103.8500)
+
+LTA_ROWS = [
+    {
+        'CarParkID': str(i), 'Area': 'Bench', 'Development': f'Bench Development {i}',
+        'Location': f'{CENTRE[0] + i * 0.001:.6f} {CENTRE[1]:.6f}',
+        'AvailableLots': 100, 'LotType': 'C', 'Agency': 'LTA',
+    }
+    for i in range(20)
+]
+
+GEOCODE_RESULT = {
+    'status': 'OK',
+    'results': [{'geometry': {'location': {'lat': CENTRE[0], 'lng': CENTRE[1]}}}],
+}
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles connections on a fixed thread pool."""
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def stub_upstreams(latency):
+    """Feeds answer at once; Google takes `latency` seconds in both clients."""
+
+    def google(name, url, **kwargs):
+        time.sleep(latency)
+        response = mock.Mock()
+        response.json.return_value = GEOCODE_RESULT
+        return response
+
+    async def lta_async():
+        return LTA_ROWS
+
+    async def hdb_async():
+        return {}
+
+    async def google_async(name, url, **kwargs):
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json=GEOCODE_RESULT)
+
+    return [
+        mock.patch.object(carpark_service, '_fetch_lta_carparks', lambda: LTA_ROWS),
+        mock.patch.object(hdb_service, '_fetch_hdb_availability', lambda: {}),
+        mock.patch.object(carpark_service, '_fetch_lta_carparks_async', lta_async),
+        mock.patch.object(hdb_service, '_fetch_hdb_availability_async', hdb_async),
+        mock.patch.object(upstream_client, 'get', google),
+        mock.patch.object(async_upstream_client, 'get', google_async),
+    ]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_sync_server():
+    app = create_app()
+    with app.app_context():
+        carpark_service.get_snapshot()  # Warm: only the geocode is slow
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # No per-request access log
+    server = PooledWSGIServer('127.0.0.1', free_port(), app, SYNC_THREADS)
+    server.socket.listen(4096)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server.shutdown
+
+
+def start_async_server():
+    port = free_port()
+    config = uvicorn.Config(create_async_app(), host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    httpx.get(f'http://127.0.0.1:{port}/carparks', timeout=30)  # Warm: only the geocode is slow
+
+    def stop():
+        server.should_exit = True
+
+    return f'http://127.0.0.1:{port}', stop
+
+
+async def get(host, port, target):
+    """Bare HTTP/1.1 GET on a fresh connection; returns the status code.
+    (httpx's pool costs more CPU than the servers at these concurrencies.)"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def load(base_url, concurrency, tag):
+    """`concurrency` simultaneous cold searches; returns (wall seconds, latencies, errors)."""
+    url = urlsplit(base_url)
+
+    async def one(i):
+        start = time.perf_counter()
+        status = await get(url.hostname, url.port, '/carparks?' + urlencode({'search': f'bench place {tag} {i}'}))
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(concurrency)), return_exceptions=True)
+    wall = time.perf_counter() - start
+
+    latencies = [r[0] for r in results if not isinstance(r, BaseException) and r[1] == 200]
+    return wall, latencies, len(results) - len(latencies)
+
+
+def run_load(base_url, concurrency, tag):
+    return asyncio.run(load(base_url, concurrency, tag))
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def main():
+    latency = float(sys.argv[sys.argv.index('--latency') + 1]) if '--latency' in sys.argv else 0.5
+    levels = (
+        [int(n) for n in sys.argv[sys.argv.index('--levels') + 1].split(',')]
+        if '--levels' in sys.argv else [50, 200, 1000]
+    )
+
+    patches = stub_upstreams(latency)
+    for p in patches:
+        p.start()
+    servers = {'sync': start_sync_server(), 'async': start_async_server()}
+
+    print(f'Google latency {latency:.2f}s; sync = {SYNC_THREADS} threads, async = 1 event loop')
+    print(f'{"mode":<6} {"concurrent":>10} {"wall s":>7} {"req/s":>7} {"p50 s":>6} {"p95 s":>6} {"max s":>6} {"errors":>7}')
+    # Spawned, so the client neither competes for this process's GIL nor inherits its threads
+    load_generator = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        for concurrency in levels:
+            for mode, (base_url, _) in servers.items():
+                future = load_generator.submit(run_load, base_url, concurrency, f'{mode}{concurrency}')
+                wall, latencies, errors = future.result()
+                print(
+                    f'{mode:<6} {concurrency:>10} {wall:>7.2f} {len(latencies) / wall:>7.1f} '
+                    f'{percentile(latencies, 50):>6.2f} {percentile(latencies, 95):>6.2f} '
+                    f'{max(latencies, default=float("nan")):>6.2f} {errors:>7}'
+                )
+    finally:
+        load_generator.shutdown()
+        for _, stop in servers.values():
+            stop()
+        for p in patches:
+            p.stop()
+
+
+if __name__ == '__main__':
+    main()
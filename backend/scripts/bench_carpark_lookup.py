@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-carpark lookup (/carparks/<carpark_num>) before and after the
+snapshot ID index:
+  - legacy: consolidate + transform the whole dataset, then scan for the ID
+  - scan:   linear scan of the prebuilt snapshot rows
+  - index:  hash probe into the snapshot's ID index
+Uses the HDB carparks (live availability if DATA_GOV_API_KEY is set, else
+static info only); no LTA calls are made.
+Run from the backend/ directory:
+    python3 scripts/bench_carpark_lookup.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['BACKGROUND_REFRESH'] = 'False'
+os.environ['REDIS_URL'] = ''
+
+from app import create_app
+from app.services import carpark_service
+from app.services.carpark_service import (
+    consolidate_carparks,
+    fetch_all_hdb_carparks,
+    transform_carpark,
+)
+from app.services.snapshot_service import (
+    mark_source_refreshed,
+    snapshot_store,
+    source_versions,
+)
+
+LOOKUPS = 200
+
+
+def timed(fn, ids):
+    start = time.perf_counter()
+    for carpark_num in ids:
+        fn(carpark_num)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    app = create_app()
+    client = app.test_client()
+    rng = random.Random(42)
+
+    with app.app_context():
+        hdb_carparks = fetch_all_hdb_carparks()
+
+        def legacy(carpark_num, snapshot=None):
+            # Pre-snapshot path: rebuilds every row, so there is no snapshot to use
+            for cp in consolidate_carparks(hdb_carparks):
+                if cp['CarParkID'] == carpark_num:
+                    return transform_carpark(cp).to_dict()
+            return None
+
+        # Publish a snapshot of the same rows, stamped so requests treat it as fresh
+        records = [transform_carpark(cp) for cp in consolidate_carparks(hdb_carparks)]
+        for source in ('lta', 'hdb'):
+            mark_source_refreshed(source, timeout=3600)
+        snapshot_store.clear()
+        published = snapshot_store.get(source_versions(), lambda: (source_versions(), records))
+
+        def scan(carpark_num, snapshot=None):
+            for record in (snapshot or published).records:
+                if record.carpark_num == carpark_num:
+                    return record.to_dict()
+            return None
+
+        ids = [rng.choice(records).carpark_num for _ in range(LOOKUPS)]
+        for carpark_num in ids[:20]:
+            assert legacy(carpark_num) == scan(carpark_num) == carpark_service.fetch_carpark_by_id(carpark_num)
+
+        print(f'{len(records)} carparks, {LOOKUPS} random lookups')
+        legacy_us = timed(legacy, ids[:20])
+        scan_us = timed(scan, ids)
+        index_us = timed(carpark_service.fetch_carpark_by_id, ids)
+        print(f'lookup  legacy {legacy_us:10.1f} us   scan {scan_us:8.1f} us   index {index_us:6.1f} us')
+
+    # Endpoint latency, swapping the route's lookup for the legacy and scan paths
+    from app.routes import carparks as carparks_routes
+    indexed = carparks_routes.fetch_carpark_by_id
+
+    def endpoint_us(lookup, sample):
+        carparks_routes.fetch_carpark_by_id = lookup
+        try:
+            return timed(lambda c: client.get(f'/carparks/{c}?duration=0'), sample)
+        finally:
+            carparks_routes.fetch_carpark_by_id = indexed
+
+    def in_context(fn):
+        def lookup(carpark_num, snapshot=None):
+            with app.app_context():
+                return fn(carpark_num, snapshot=snapshot)
+        return lookup
+
+    print(
+        f'endpoint legacy {endpoint_us(in_context(legacy), ids[:20]):8.1f} us   '
+        f'scan {endpoint_us(scan, ids):8.1f} us   '
+        f'index {endpoint_us(indexed, ids):6.1f} us'
+    )
+
+
+if __name__ == '__main__':
+    main()
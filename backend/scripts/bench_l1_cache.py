@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Compare Redis traffic and read time for the feed cache entries with and
+without the in-process L1 (app.utils.l1_cache). One backend plays the
+refreshing worker and writes an LTA-sized list and an HDB-sized dict; a second
+plays another worker and reads both on every snapshot rebuild, while the HDB
+entry changes every few reads (HDB refreshes more often than LTA).
+Needs a Redis server; keys are written under a throwaway prefix and removed.
+Run from the backend/ directory:
+    python3 scripts/bench_l1_cache.py [--redis redis://localhost:6379/15] [--reads 200]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import redis
+from flask_caching.backends.rediscache import RedisCache
+
+from app.utils.l1_cache import L1RedisCache
+
+KEY_PREFIX = 'bench-l1:'
+HDB_CHANGE_EVERY = 4  # Reads per HDB change
+
+LTA_FEED = [
+    {
+        'CarParkID': str(i), 'Area': 'Marina', 'Development': f'Development {i}',
+        'Location': f'1.{280000 + i} 103.{850000 + i}',
+        'AvailableLots': i % 500, 'LotType': 'C', 'Agency': 'LTA',
+    }
+    for i in range(2500)
+]
+
+
+def hdb_feed(generation):
+    return {
+        f'HDB{i}': {'total_lots': 400, 'lots_available': (i + generation) % 400,
+                    'update_datetime': '2024-01-01T10:00:00'}
+        for i in range(2200)
+    }
+
+
+class CountingRedis(redis.Redis):
+    """Counts bytes of every GET/MGET reply (what crosses the network to this worker)."""
+
+    bytes_read = 0
+
+    def get(self, name):
+        reply = super().get(name)
+        self.bytes_read += len(reply or b'')
+        return reply
+
+    def mget(self, keys, *args):
+        replies = super().mget(keys, *args)
+        self.bytes_read += sum(len(r) for r in replies if r)
+        return replies
+
+
+def run(backend_class, url, reads):
+    writer = backend_class(host=redis.Redis.from_url(url), key_prefix=KEY_PREFIX)
+    client = CountingRedis.from_url(url)
+    reader = backend_class(host=client, key_prefix=KEY_PREFIX)
+
+    writer.set('lta', LTA_FEED, timeout=300)
+    writer.set('hdb', hdb_feed(0), timeout=300)
+
+    start = time.perf_counter()
+    for i in range(reads):
+        if i and i % HDB_CHANGE_EVERY == 0:
+            writer.set('hdb', hdb_feed(i), timeout=300)
+        lta, hdb = reader.get_many('lta', 'hdb')
+        assert len(lta) == len(LTA_FEED) and hdb['HDB0']['lots_available'] == (i - i % HDB_CHANGE_EVERY) % 400
+    elapsed = time.perf_counter() - start
+
+    writer.delete_many('lta', 'hdb')
+    return client.bytes_read, elapsed
+
+
+def main():
+    url = sys.argv[sys.argv.index('--redis') + 1] if '--redis' in sys.argv else 'redis://localhost:6379/15'
+    reads = int(sys.argv[sys.argv.index('--reads') + 1]) if '--reads' in sys.argv else 200
+
+    print(f'{reads} reads of both feeds, HDB changing every {HDB_CHANGE_EVERY}')
+    print(f'{"backend":<14} {"KB from Redis":>14} {"KB/read":>8} {"ms/read":>8}')
+    for backend_class in (RedisCache, L1RedisCache):
+        bytes_read, elapsed = run(backend_class, url, reads)
+        print(
+            f'{backend_class.__name__:<14} {bytes_read / 1024:>14.0f} '
+            f'{bytes_read / 1024 / reads:>8.1f} {elapsed * 1000 / reads:>8.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark radius search: grid + NumPy index vs the linear svy21_distance_km scan.
+Uses the real HDB coordinates from hdb_carpark_info.json.
+Run from the backend/ directory:
+    python3 scripts/bench_radius_search.py
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.utils.spatial_index import GridIndex
+from app.utils.svy21 import svy21_distance_km
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../app/data/hdb_carpark_info.json')
+QUERIES = 2000
+RADII_M = (500, 1000, 2000, 5000)
+
+
+def linear_scan(points, centre_n, centre_e, radius_m):
+    hits = []
+    for i, (n, e) in enumerate(points):
+        d = svy21_distance_km(centre_n, centre_e, n, e)
+        if d * 1000 <= radius_m:
+            hits.append((d, i))
+    return hits
+
+
+def main():
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        carparks = json.load(f)
+    points = [(cp['northing'], cp['easting']) for cp in carparks if 'northing' in cp]
+
+    start = time.perf_counter()
+    index = GridIndex(points)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f'{len(points)} carparks, grid build {build_ms:.2f} ms')
+
+    rng = random.Random(42)
+    centres = [rng.choice(points) for _ in range(QUERIES)]
+    centres = [(n + rng.uniform(-300, 300), e + rng.uniform(-300, 300)) for n, e in centres]
+
+    for radius_m in RADII_M:
+        start = time.perf_counter()
+        expected = [sorted(linear_scan(points, n, e, radius_m)) for n, e in centres]
+        linear_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+        start = time.perf_counter()
+        actual = [index.query_radius(n, e, radius_m) for n, e in centres]
+        grid_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+        for (positions, distances), hits in zip(actual, expected):
+            # Same carparks in the same order; distances may differ in the last ulp
+            assert positions.tolist() == [i for _, i in hits], f'grid results differ at {radius_m}m'
+            assert all(abs(a - d) < 1e-12 for a, (d, _) in zip(distances.tolist(), hits))
+        avg_hits = sum(len(h) for h in expected) / QUERIES
+        print(
+            f'radius {radius_m:>5}m: linear {linear_us:8.1f} us/query, '
+            f'grid {grid_us:7.1f} us/query ({linear_us / grid_us:5.1f}x), '
+            f'{avg_hits:.0f} hits avg'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Measure a cold /carparks search with stubbed upstreams that inject latency.
+The LTA feed, the HDB feed and Google geocoding are fetched concurrently, so
+the request should take about as long as the slowest of them rather than
+their sum; an upstream slower than UPSTREAM_DEADLINE_SECONDS is left out and
+the request still answers at the deadline.
+No API keys or network needed.
+Run from the backend/ directory:
+    python3 scripts/bench_upstream_fanout.py
+"""
+
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['BACKGROUND_REFRESH'] = 'False'
+os.environ['REDIS_URL'] = ''
+os.environ.setdefault('GOOGLE_MAPS_API_KEY', 'bench')
+
+from app import cache, create_app
+from app.services import carpark_service, hdb_service
+from app.services.snapshot_service import snapshot_store
+from app.services.upstream_client import upstream_client
+
+SEARCH_TERM = 'fanout bench place'  # Not in the gazetteer, so it needs Google
+CENTRE = (1.3000, 103.8500)
+
+LTA_ROWS = [
+    {
+        'CarParkID': str(i), 'Area': 'Bench', 'Development': f'Bench Development {i}',
+        'Location': f'{CENTRE[0] + i * 0.001:.6f} {CENTRE[1]:.6f}',
+        'AvailableLots': 100, 'LotType': 'C', 'Agency': 'LTA',
+    }
+    for i in range(20)
+]
+
+
+def stub_upstreams(latency):
+    """Patch the three upstreams with fakes that sleep latency[name] seconds."""
+
+    def lta():
+        time.sleep(latency['lta'])
+        return LTA_ROWS
+
+    def hdb():
+        time.sleep(latency['hdb'])
+        return {}
+
+    def google(name, url, **kwargs):
+        time.sleep(latency['google'])
+        response = mock.Mock()
+        response.json.return_value = {
+            'status': 'OK',
+            'results': [{'geometry': {'location': {'lat': CENTRE[0], 'lng': CENTRE[1]}}}],
+        }
+        return response
+
+    return [
+        mock.patch.object(carpark_service, '_fetch_lta_carparks', lta),
+        mock.patch.object(hdb_service, '_fetch_hdb_availability', hdb),
+        mock.patch.object(upstream_client, 'get', google),
+    ]
+
+
+def cold_search(app, client, latency, deadline):
+    with app.app_context():
+        cache.clear()
+    snapshot_store.clear()
+    app.config['UPSTREAM_DEADLINE_SECONDS'] = deadline
+
+    patches = stub_upstreams(latency)
+    for p in patches:
+        p.start()
+    try:
+        start = time.perf_counter()
+        response = client.get('/carparks', query_string={'search': SEARCH_TERM})
+        elapsed = time.perf_counter() - start
+    finally:
+        # Let fetches that missed the deadline finish before un-patching
+        time.sleep(max(latency.values()))
+        for p in patches:
+            p.stop()
+
+    carparks = response.get_json()['carparks']
+    return elapsed, len(carparks)
+
+
+def main():
+    app = create_app()
+    client = app.test_client()
+
+    cases = [
+        ('all fast', {'lta': 0.05, 'hdb': 0.05, 'google': 0.05}, 5.0),
+        ('one slow upstream', {'lta': 1.0, 'hdb': 0.6, 'google': 0.8}, 5.0),
+        ('all slow', {'lta': 1.0, 'hdb': 1.0, 'google': 1.0}, 5.0),
+        ('HDB past deadline', {'lta': 0.5, 'hdb': 3.0, 'google': 0.5}, 1.5),
+    ]
+    print(f'{"case":<20} {"lta":>5} {"hdb":>5} {"google":>7} {"deadline":>9} {"sum":>6} {"max":>6} {"measured":>9} {"rows":>5}')
+    for name, latency, deadline in cases:
+        elapsed, rows = cold_search(app, client, latency, deadline)
+        print(
+            f'{name:<20} {latency["lta"]:>5.2f} {latency["hdb"]:>5.2f} {latency["google"]:>7.2f} '
+            f'{deadline:>9.1f} {sum(latency.values()):>6.2f} {max(latency.values()):>6.2f} '
+            f'{elapsed:>9.2f} {rows:>5}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Check POST /carparks/batch body validation: malformed ids, fields and
+durations (including JSON booleans, which Python treats as ints, and NaN /
+Infinity) get a 400, and well-formed bodies are served. Uses a small
+in-memory snapshot, so no upstream APIs are called.
+Run from the backend/ directory:
+    python3 scripts/check_batch_validation.py
+"""
+
+import os
+import sys
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['BACKGROUND_REFRESH'] = 'False'
+os.environ['REDIS_URL'] = ''
+
+from app import create_app
+from app.routes import carparks as carparks_routes
+from app.services.snapshot_service import CarparkRecord, SnapshotStore
+
+CARPARK_NUMS = ('A1', 'B2', 'C3')
+
+REJECTED = [
+    {},
+    {'ids': 'A1'},
+    {'ids': ['A1', 2]},
+    {'ids': ['A1'], 'duration': '2'},
+    {'ids': ['A1'], 'duration': True},
+    {'ids': ['A1'], 'duration': False},
+    {'ids': ['A1'], 'duration': float('nan')},
+    {'ids': ['A1'], 'duration': float('inf')},
+    {'ids': ['A1'], 'fields': ['carpark_num', 'no_such_field']},
+    {'ids': ['A1'], 'fields': ['carpark_num', 5]},
+    {'ids': ['A1'], 'fields': 5},
+    {'ids': ['A1'], 'fields': {}},
+]
+
+ACCEPTED = [
+    {'ids': ['A1', 'ZZ']},
+    {'ids': ['A1'], 'duration': 2},
+    {'ids': ['A1'], 'duration': 1e300},
+    {'ids': ['A1'], 'duration': 1.5, 'fields': ['carpark_num', 'car_lots']},
+    {'ids': ['A1'], 'fields': 'carpark_num,car_lots'},
+]
+
+
+def make_snapshot():
+    records = [
+        CarparkRecord(
+            carpark_num=c, area='', development=c, address=c,
+            latitude=1.3, longitude=103.8, northing=float(i), easting=float(i),
+            car_lots=10, motorcycle_lots=0, heavy_vehicle_lots=0,
+            has_pricing=False, has_specific_pricing=False, pricing=None, agency='HDB',
+        )
+        for i, c in enumerate(CARPARK_NUMS)
+    ]
+    return SnapshotStore().get(('a', 'b'), lambda: (('a', 'b'), records))
+
+
+def main():
+    client = create_app().test_client()
+    snapshot = make_snapshot()
+
+    with mock.patch.object(carparks_routes, 'get_snapshot', lambda: snapshot):
+        for body in REJECTED:
+            response = client.post('/carparks/batch', json=body)
+            assert response.status_code == 400, f'{body} was accepted'
+        for body in ACCEPTED:
+            response = client.post('/carparks/batch', json=body)
+            assert response.status_code == 200, f'{body} was rejected: {response.get_json()}'
+
+    print(f'✅ Batch: {len(REJECTED)} malformed bodies rejected, {len(ACCEPTED)} valid ones served')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Check request coalescing: N simultaneous cache misses for one key make exactly
+one upstream call, and every caller gets that call's result (or its error).
+Covers the bare SingleFlight, geocode_place and fetch_all_carparks, with the
+upstream replaced by a slow counting fake (no API keys or network needed).
+Run from the backend/ directory:
+    python3 scripts/check_singleflight.py
+"""
+
+import os
+import sys
+import threading
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['BACKGROUND_REFRESH'] = 'False'
+os.environ['REDIS_URL'] = ''
+os.environ.setdefault('GOOGLE_MAPS_API_KEY', 'check')
+
+from app import cache, create_app
+from app.services import carpark_service
+from app.services.geocoding_service import geocode_place
+from app.services.upstream_client import upstream_client
+from app.utils.singleflight import SingleFlight
+
+CALLERS = 50
+UPSTREAM_SECONDS = 0.3
+
+
+class CountingUpstream:
+    """Slow fake upstream that counts how often it is called."""
+
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.result = result
+        self.error = error
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(UPSTREAM_SECONDS)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_concurrently(app, fn):
+    """Call fn from CALLERS threads released together; returns (results, errors)."""
+    barrier = threading.Barrier(CALLERS)
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        with app.app_context():
+            barrier.wait()
+            try:
+                value = fn()
+                with lock:
+                    results.append(value)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(CALLERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def check_bare(app):
+    flights = SingleFlight()
+    upstream = CountingUpstream(result='value')
+    results, errors = run_concurrently(app, lambda: flights.do('key', upstream))
+    assert upstream.calls == 1, f'{upstream.calls} upstream calls'
+    assert results == ['value'] * CALLERS and not errors
+    print(f'✅ SingleFlight: {CALLERS} callers, {upstream.calls} call, {flights.stats()}')
+
+    failing = CountingUpstream(error=RuntimeError('upstream down'))
+    results, errors = run_concurrently(app, lambda: flights.do('key', failing))
+    assert failing.calls == 1 and len(errors) == CALLERS and not results
+    print(f'✅ SingleFlight error: {CALLERS} callers, {failing.calls} call, all saw the error')
+
+
+def check_geocode(app):
+    response = mock.Mock()
+    response.json.return_value = {
+        'status': 'OK',
+        'results': [{'geometry': {'location': {'lat': 1.3040, 'lng': 103.8318}}}],
+    }
+    upstream = CountingUpstream(result=response)
+    with mock.patch.object(upstream_client, 'get', upstream):
+        results, errors = run_concurrently(app, lambda: geocode_place('singleflight check'))
+        assert upstream.calls == 1, f'{upstream.calls} Google calls'
+        assert results == [(1.3040, 103.8318)] * CALLERS and not errors
+
+        # Later misses hit the memoize cache and never reach the upstream
+        run_concurrently(app, lambda: geocode_place('singleflight check'))
+        assert upstream.calls == 1
+    print(f'✅ geocode_place: {CALLERS} simultaneous misses, {upstream.calls} Google call')
+
+
+def check_lta_feed(app):
+    rows = [{'CarParkID': '1', 'Development': 'Check'}]
+    upstream = CountingUpstream(result=rows)
+    with mock.patch.object(carpark_service, '_fetch_lta_carparks', upstream):
+        results, errors = run_concurrently(app, carpark_service.fetch_all_carparks)
+    assert upstream.calls == 1, f'{upstream.calls} LTA fetches'
+    assert results == [rows] * CALLERS and not errors
+    print(f'✅ fetch_all_carparks: {CALLERS} simultaneous misses, {upstream.calls} LTA fetch')
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        cache.clear()
+    check_bare(app)
+    check_geocode(app)
+    check_lta_feed(app)
+
+
+if __name__ == '__main__':
+    main()
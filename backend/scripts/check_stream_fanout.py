@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Check the SSE change broker: every subscriber receives exactly the changes for
+the carparks it watches, and publish cost tracks changes x interested
+subscribers rather than total subscribers, and the per-worker stream cap
+holds. Also runs one stream end to end against a fake snapshot store (no
+upstream APIs needed).
+Run from the backend/ directory:
+    python3 scripts/check_stream_fanout.py
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.services.snapshot_service import CarparkRecord, SnapshotStore
+from app.services.stream_service import ChangeBroker, event_stream
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '../app/data/hdb_carpark_info.json')
+WATCHED_PER_CLIENT = 100
+
+
+def make_rows(carpark_nums, lots):
+    return [
+        CarparkRecord(
+            carpark_num=c, area='', development=c, address=c,
+            latitude=0.0, longitude=0.0, northing=float(i), easting=float(i),
+            car_lots=lots[c], motorcycle_lots=0, heavy_vehicle_lots=0,
+            has_pricing=False, has_specific_pricing=False, pricing=None, agency='HDB',
+        )
+        for i, c in enumerate(carpark_nums)
+    ]
+
+
+def check_deliveries(carpark_nums, rng):
+    broker = ChangeBroker()
+    subscriptions = [
+        broker.subscribe(rng.sample(carpark_nums, WATCHED_PER_CLIENT)) for _ in range(500)
+    ]
+    changes = {c: (rng.randint(0, 300), 0, 0) for c in rng.sample(carpark_nums, 300)}
+
+    deliveries = broker.publish('v2', changes)
+    expected_total = 0
+    for subscription in subscriptions:
+        version, received = subscription.wait(0)
+        expected = {c: lots for c, lots in changes.items() if c in subscription.carpark_nums}
+        assert received == expected, 'subscriber received the wrong changes'
+        assert not expected or version == 'v2'
+        expected_total += len(expected)
+    assert deliveries == expected_total
+    print(f'✅ 500 subscribers, 300 changes: {deliveries} deliveries, all exact')
+
+
+def bench_publish(carpark_nums, rng):
+    changes = {c: (1, 0, 0) for c in rng.sample(carpark_nums, 50)}
+    for clients in (10, 100, 1000, 5000):
+        broker = ChangeBroker()
+        for _ in range(clients):
+            broker.subscribe(rng.sample(carpark_nums, WATCHED_PER_CLIENT))
+        start = time.perf_counter()
+        deliveries = broker.publish('v', changes)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        print(f'{clients:>5} clients, 50 changes: {deliveries:>5} deliveries in {elapsed_us:8.1f} us '
+              f'({elapsed_us / max(deliveries, 1):.2f} us/delivery)')
+
+
+def check_cap(carpark_nums):
+    broker = ChangeBroker()
+    open_streams = [broker.subscribe(carpark_nums[:3], limit=2) for _ in range(2)]
+    assert None not in open_streams
+    assert broker.subscribe(carpark_nums[:3], limit=2) is None, 'subscribed past the cap'
+    broker.unsubscribe(open_streams[0])
+    assert broker.subscribe([], limit=2) is not None, 'slot not freed on unsubscribe'
+    assert broker.subscriber_count() == 2
+    print('✅ Cap: refused past the limit, slot freed on unsubscribe')
+
+
+def check_stream(carpark_nums):
+    store = SnapshotStore()
+    broker = ChangeBroker()
+    store.add_listener(broker.on_snapshot)
+
+    lots = {c: 10 for c in carpark_nums}
+    snapshot = store.get(('a', 'b'), lambda: (('a', 'b'), make_rows(carpark_nums, lots)))
+    watched = carpark_nums[:3]
+    subscription = broker.subscribe(watched)
+    stream = event_stream(broker, subscription, snapshot)
+
+    first = next(stream)
+    assert first.startswith('event: snapshot') and len(json.loads(first.split('data: ')[1])) == 3
+
+    lots[watched[1]] = 11
+    lots[carpark_nums[-1]] = 99  # Not watched
+    threading.Timer(0.05, lambda: store.get(
+        ('a', 'c'), lambda: (('a', 'c'), make_rows(carpark_nums, lots)))).start()
+    event = next(stream)
+    data = json.loads(event.split('data: ')[1])
+    assert event.startswith('event: lots') and data == [
+        {'carpark_num': watched[1], 'car_lots': 11, 'motorcycle_lots': 0, 'heavy_vehicle_lots': 0}
+    ], event
+
+    stream.close()  # Client disconnect
+    assert broker.subscriber_count() == 0
+    print('✅ Stream: snapshot event, one lots event for the watched change, unsubscribed on close')
+
+
+def main():
+    with open(DATA_PATH, 'r', encoding='utf-8') as f:
+        carpark_nums = [cp['car_park_no'] for cp in json.load(f)]
+    rng = random.Random(42)
+
+    check_deliveries(carpark_nums, rng)
+    bench_publish(carpark_nums, rng)
+    check_cap(carpark_nums)
+    check_stream(carpark_nums)
+
+
+if __name__ == '__main__':
+    main()
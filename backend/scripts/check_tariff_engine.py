@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Check the local tariff engine against a corpus of real rate strings from
+carpark_rates.json and report its parse coverage over the dataset.
+Run from the backend/ directory:
+    python3 scripts/check_tariff_engine.py [--unparsed]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.services.pricing_service import pricing_service
+from app.services.tariff_engine import DAY_TYPES, select_rate_string, tariff_engine
+
+# (rate string, duration in hours, expected cost) — hand-checked
+CORPUS = [
+    ('$0.60 per hour for first 2 hours, $1.20 per hour after', 1, 0.60),
+    ('$0.60 per hour for first 2 hours, $1.20 per hour after', 2.5, 2.40),
+    ('$0.60 per hour', 2.5, 1.80),
+    ('$1.20 per hour', 0.5, 1.20),
+    ('$2.14 per half hour', 1.25, 6.42),
+    ('$1.07 per half hour for the first 3 hours, $2.14 per half hour after', 4, 10.70),
+    ('$4/hr first 2hrs, $6/hr after', 3.5, 20.00),
+    ('$3.00 per hour for first 3 hours, $4.00 per hour after', 3, 9.00),
+    ('$3 per entry', 6, 3.00),
+    ('$2.14 / Entry', 1, 2.14),
+    ('$4.00 flat', 10, 4.00),
+    ('Free Parking', 3, 0.00),
+    ('$2.20 for 1st 2hrs; $1.10 for sub. hr', 2, 2.20),
+    ('$2.20 for 1st 2hrs; $1.10 for sub. hr', 3.5, 4.40),
+    ('$1.80 for 1st hr; $0.85 for ½ hr', 2, 3.50),
+    ('$2.50 for 1st 2hrs; $0.25 for sub. 10 mins', 3, 4.00),
+    ('$4.80 1st 2½ hrs or part thereof; $1.80 for sub. ½ hr or part thereof.', 3, 6.60),
+    ('1st hr: $1.20;  2nd hr: $0.70 per ½ hr; 3rd hr onwards: $1 per ½ hr', 3, 4.60),
+    ('$2 for 1st hr; $1 for sub. ½ hr', 1.5, 3.00),
+    ('6am-6pm: Free 1st hr; $0.50 for sub. ½ hr', 2, 1.00),
+    ('Daily: 1st hr: Free; $2 for sub. hr', 2.5, 4.00),
+    ('8am-5pm: $2.57 per hr; $1.28 for sub. ½hr.', 2, 5.13),
+    ('6am-6pm: $2.50 for 1st hr, sub $1.25 per 1/2 hr', 2, 5.00),
+    ('6.30am to 6.30pm - first 3 hours at $3.00 and subsequent half an hour at $1.50', 4, 6.00),
+    ('8am-11pm: $5 for 1st 3 hrs and $1.50 for subseqent ½ hr', 3.5, 6.50),
+    ('0700-1900:$1.29 for 1st hr, $0.43 /15 mins thereafter', 2, 3.01),
+    ('6am-9.59am: $0.54 for 1st hr; $0.16 for sub. 15mins. 10am-5.59pm: $1.07 for 1st hr; $0.27 for sub. 15mins.', 2, 2.15),
+    ('0000-0700: $0.75 / 30 mins (Capped at $4.28). 0700-2000: $0.75 / 30 mins (Capped at $4.28)', 2, 3.00),
+    ('0000-0700: $0.75 / 30 mins (Capped at $4.28). 0700-2000: $0.75 / 30 mins (Capped at $4.28)', 5, 4.28),
+    ('$0.035 per min. Capped at $35 per 24hrs.', 2, 4.20),
+    ('$0.035 per min. Capped at $35 per 24hrs.', 24, 35.00),
+    ('$0.04 per min      *Based on the per-minute rate of S$0.04, 24 hours of parking will be S$57.60.', 24, 57.60),
+    ('$0.50 /30 mins (Per Minute Charging)', 1.25, 1.25),
+    # Per-minute note trailing the night segment still applies to the daytime rate
+    ('0700-1700 : $1.00 per 30 mins; 1700-0700: $0.50 per 30 mins (Per Minute Charging)', 1.25, 2.50),
+    ('8.01am-6pm: $1.13 per ½ hr (per min basis)', 1.25, 2.83),
+    ('$1.65 per hr (Max. of $6.00 per entry)', 5, 6.00),
+    ('8am-5pm: $1.50 for 1st hr; $1 for sub. hr, per day $20)', 3, 3.50),
+    ('6am-6pm: $3.50 for 1st hr; $0.05 per min', 1.5, 5.00),
+    ('7am-1pm: $1.07 per hr; Aft 1pm: $3.21 per entry', 2, 2.14),
+    ('7am-12am: $1.20 per entry; Aft 12am: $2.40 per entry', 5, 1.20),
+    ('6am-12midnight: $2 per hr or part thereof. 12midnight- 6am: $2 per entry.', 2.25, 6.00),
+    ('Daily(7am-11pm): $1.20 for 1st hr or part thereof; $0.60 for sub. ½ hr or part thereof.', 2, 2.40),
+    ('$2.50/hr weekdays, $1.50/hr after 6pm', 2, 5.00),
+    ('Daily free: 7am-11pm', 4, 0.00),
+    ('$1.50 per hr | After hours: Aft 6pm: $3 per entry', 2, 3.00),
+]
+
+# Rate strings the engine must leave to the AI path
+UNPARSEABLE = [
+    'TODO: $X per hour',
+    'HDB coupon parking',
+    'Season Parking Only',
+    'Charges same as wkdays, but $3 per entry after 1pm',
+    'Mon-Thu: 7am-11.59pm: $7.50 for 1st 3 hrs; $5 per hr or part thereof',
+    '6am-6pm: $0.05 per min/$3 per hr',
+    '8am-6pm: $7 for 1st hr',
+]
+
+
+def check_corpus():
+    failures = 0
+    for rate_string, hours, expected in CORPUS:
+        result = tariff_engine.calculate(rate_string, hours)
+        actual = result['calculated_cost'] if result else None
+        if actual != expected:
+            failures += 1
+            print(f'❌ {rate_string!r} @ {hours}h: expected {expected}, got {actual}')
+    for rate_string in UNPARSEABLE:
+        if tariff_engine.get_tariff(rate_string) is not None:
+            failures += 1
+            print(f'❌ {rate_string!r} should not parse')
+    print(f'Corpus: {len(CORPUS) + len(UNPARSEABLE) - failures}/{len(CORPUS) + len(UNPARSEABLE)} passed')
+    return failures
+
+
+def report_coverage(show_unparsed):
+    # Coverage weighted by carpark entries, per day type
+    for day_type in DAY_TYPES:
+        rates = [select_rate_string(p, day_type) for p in pricing_service.pricing_data.values()]
+        rates = [r for r in rates if r]
+        parsed = sum(1 for r in rates if tariff_engine.get_tariff(r) is not None)
+        print(f'{day_type:>8}: {parsed}/{len(rates)} carpark rates parsed ({parsed / len(rates):.1%})')
+
+    print(f'Distinct rate strings: {tariff_engine.coverage()}')
+    if show_unparsed:
+        for rate_string in tariff_engine.unparsed_rate_strings():
+            print(f'  - {rate_string}')
+
+
+def main():
+    failures = check_corpus()
+    report_coverage('--unparsed' in sys.argv)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
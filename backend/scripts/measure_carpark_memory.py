@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Measure memory held by the carpark snapshot and allocations per /carparks
+request: dict rows copied per request (before) vs slotted CarparkRecords
+materialised once at the response boundary (after).
+Uses the HDB carparks (static info; live availability if DATA_GOV_API_KEY is
+set); no LTA or Google calls are made.
+Run from the backend/ directory:
+    python3 scripts/measure_carpark_memory.py
+"""
+
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['BACKGROUND_REFRESH'] = 'False'
+os.environ['REDIS_URL'] = ''
+
+from app import create_app
+from app.services.carpark_service import consolidate_carparks, fetch_all_hdb_carparks, transform_carpark
+from app.services.snapshot_service import snapshot_store
+from app.utils.svy21 import wgs84_to_svy21
+
+REQUESTS = 50
+RESULTS = 100
+COST_FIELDS = {'calculated_cost': 2.4, 'cost_breakdown': 'x', 'ai_explanation': None}
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return float('nan')
+
+
+def retained(build):
+    """(bytes, blocks) still allocated after build() returns, and the result."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    return sum(s.size_diff for s in stats), sum(s.count_diff for s in stats), result
+
+
+def per_request(handle, rng, n_rows):
+    """Peak bytes and blocks allocated while handling one request (averaged)."""
+    tracemalloc.start()
+    total_peak = 0
+    total_blocks = 0
+    for _ in range(REQUESTS):
+        positions = rng.sample(range(n_rows), RESULTS)
+        distances = [rng.random() for _ in positions]
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        rows = handle(positions, distances)
+        after = tracemalloc.take_snapshot()
+        total_peak += tracemalloc.get_traced_memory()[1] - base
+        total_blocks += sum(s.count_diff for s in after.compare_to(before, 'filename') if s.count_diff > 0)
+        del rows
+    tracemalloc.stop()
+    return total_peak / REQUESTS, total_blocks / REQUESTS
+
+
+def main():
+    app = create_app()
+    rng = random.Random(42)
+
+    with app.app_context():
+        consolidated = consolidate_carparks(fetch_all_hdb_carparks())
+
+        rss_start = rss_mb()
+        dict_bytes, dict_blocks, dict_rows = retained(
+            lambda: [transform_carpark(cp).to_dict() for cp in consolidated]
+        )
+        record_bytes, record_blocks, records = retained(
+            lambda: [transform_carpark(cp) for cp in consolidated]
+        )
+        print(f'{len(records)} carparks held by the snapshot')
+        print(f'  dict rows:      {dict_bytes / 1024:8.1f} KiB in {dict_blocks} blocks')
+        print(f'  CarparkRecords: {record_bytes / 1024:8.1f} KiB in {record_blocks} blocks')
+
+        # Before: copy the row for the distance, then copy again to add costs
+        def legacy(positions, distances):
+            rows = [{**dict_rows[i], 'distance': d} for i, d in zip(positions, distances)]
+            return [{**row, **COST_FIELDS} for row in rows]
+
+        # After: one dict per returned carpark, enriched in place
+        def current(positions, distances):
+            rows = [records[i].to_dict(distance=d) for i, d in zip(positions, distances)]
+            for row in rows:
+                row.update(COST_FIELDS)
+            return rows
+
+        assert legacy([0, 1], [0.5, 0.7]) == current([0, 1], [0.5, 0.7])
+        legacy_peak, legacy_blocks = per_request(legacy, random.Random(1), len(records))
+        current_peak, current_blocks = per_request(current, random.Random(1), len(records))
+        print(f'per request ({RESULTS} carparks with costs):')
+        print(f'  before: {legacy_peak / 1024:7.1f} KiB peak, {legacy_blocks:6.0f} blocks allocated')
+        print(f'  after:  {current_peak / 1024:7.1f} KiB peak, {current_blocks:6.0f} blocks allocated')
+
+        del dict_rows
+        print(f'RSS {rss_mb():.1f} MiB (started at {rss_start:.1f} MiB before building rows)')
+
+        # Sanity: a real snapshot of records serves a request end to end
+        snapshot_store.clear()
+        n, e = wgs84_to_svy21(1.35, 103.85)
+        snapshot = snapshot_store.get(('a', 'b'), lambda: (('a', 'b'), records))
+        positions, _ = snapshot.index.query_radius(n, e, 2000)
+        print(f'snapshot version {snapshot.version}: {len(positions)} carparks within 2 km of (1.35, 103.85)')
+
+
+if __name__ == '__main__':
+    main()
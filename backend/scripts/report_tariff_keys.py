@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Report how many distinct tariff keys carpark_rates.json contains. The cost
+cache is keyed on (canonical rate string, duration, day type), so this is the
+number of cost computations per duration, against one per carpark before.
+Run from the backend/ directory:
+    python3 scripts/report_tariff_keys.py [--top N]
+"""
+
+import os
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.services.pricing_service import pricing_service
+from app.services.tariff_engine import DAY_TYPES, canonical_rate_string, select_rate_string, tariff_engine
+
+
+def main():
+    top = int(sys.argv[sys.argv.index('--top') + 1]) if '--top' in sys.argv else 5
+    pricings = pricing_service.pricing_data
+    print(f'{len(pricings)} pricing entries in carpark_rates.json')
+    print(f'{"day type":<10} {"carparks":>9} {"raw strings":>12} {"tariff keys":>12} {"need AI":>8}')
+
+    all_keys = Counter()
+    total_carparks = total_keys = total_ai = 0
+    for day_type in DAY_TYPES:
+        raw = Counter()
+        keys = Counter()
+        examples = {}  # tariff key -> one of its raw strings
+        for pricing in pricings.values():
+            rate_string = select_rate_string(pricing, day_type)
+            if rate_string:
+                raw[rate_string] += 1
+                key = canonical_rate_string(rate_string)
+                keys[key] += 1
+                examples.setdefault(key, rate_string)
+        # Keys the local engine can't evaluate still cost one AI call each
+        need_ai = sum(1 for k in keys if tariff_engine.get_tariff(examples[k]) is None)
+        print(f'{day_type:<10} {sum(raw.values()):>9} {len(raw):>12} {len(keys):>12} {need_ai:>8}')
+
+        total_carparks += sum(raw.values())
+        total_keys += len(keys)
+        total_ai += need_ai
+        all_keys.update(keys)
+
+    print(f'{"total":<10} {total_carparks:>9} {"":>12} {total_keys:>12} {total_ai:>8}')
+    print(f'{len(all_keys)} distinct canonical rate strings across all day types')
+    print("(HDB carparks all resolve to the single 'hdb' entry, so ~2,200 of them share its keys)")
+
+    print('\nMost shared tariffs:')
+    for key, count in all_keys.most_common(top):
+        print(f'  {count:>4}  {key[:90]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Check that PricingService.resolve() (resolution index) returns exactly what the
+original get_pricing_info()/has_pricing() matching returned, for every carpark
+identity we know offline: all HDB carparks, every rate entry's ID and name,
+and the LTA feed when GOV_API_KEY is set.
+Run from the backend/ directory:
+    python3 scripts/verify_pricing_index.py
+"""
+
+import json
+import os
+import sys
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.services.pricing_service import PricingService
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../app/data')
+LTA_URL = 'https://datamall2.mytransport.sg/ltaodataservice/CarParkAvailabilityv2'
+
+
+def legacy_get_pricing_info(service, carpark_id, development_name=''):
+    """Pre-index matching logic, kept verbatim for comparison."""
+    if service._is_hdb_carpark(carpark_id, development_name):
+        return service.pricing_data.get('hdb')
+    normalized_id = service._normalize_carpark_id(carpark_id)
+    if normalized_id in service.pricing_data:
+        return service.pricing_data[normalized_id]
+    if development_name:
+        normalized_name = service._normalize_carpark_id(development_name)
+        if normalized_name in service.pricing_data:
+            return service.pricing_data[normalized_name]
+        for key, value in service.pricing_data.items():
+            if normalized_name in key or key in normalized_name:
+                return value
+    return service.pricing_data.get('default')
+
+
+def legacy_has_pricing(service, carpark_id, development_name=''):
+    if service._is_hdb_carpark(carpark_id, development_name):
+        return True
+    pricing = legacy_get_pricing_info(service, carpark_id, development_name)
+    return pricing is not None and pricing.get('name') != 'Standard Carpark'
+
+
+def known_identities():
+    with open(os.path.join(DATA_DIR, 'hdb_carpark_info.json'), 'r', encoding='utf-8') as f:
+        identities = [(cp['car_park_no'], cp['address']) for cp in json.load(f)]
+
+    with open(os.path.join(DATA_DIR, 'carpark_rates.json'), 'r', encoding='utf-8') as f:
+        for cp in json.load(f)['carparks']:
+            identities.append((cp['carpark_id'], cp['name']))
+            identities.append(('', cp['name']))
+            identities.append((cp['carpark_id'], ''))
+
+    api_key = os.getenv('GOV_API_KEY')
+    if api_key:
+        response = requests.get(LTA_URL, headers={'AccountKey': api_key}, timeout=10)
+        identities.extend((cp['CarParkID'], cp['Development']) for cp in response.json()['value'])
+
+    return identities
+
+
+def main():
+    service = PricingService()
+    identities = known_identities()
+    added = service.build_resolution_index(identities)
+    print(f'{len(identities)} identities, {added} index entries')
+
+    mismatches = 0
+    for carpark_id, development in identities:
+        expected = (
+            legacy_get_pricing_info(service, carpark_id, development),
+            legacy_has_pricing(service, carpark_id, development),
+        )
+        if service.resolve(carpark_id, development) != expected:
+            mismatches += 1
+            print(f'❌ {carpark_id!r} / {development!r}')
+
+    if mismatches:
+        print(f'❌ {mismatches} mismatches')
+        sys.exit(1)
+    print('✅ Resolution index matches legacy matching for all identities')
+
+
+if __name__ == '__main__':
+    main()